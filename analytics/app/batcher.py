@@ -0,0 +1,115 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, List, Optional
+
+
+class MicroBatcher:
+    """
+    Skuplja stavke iz reda u batch-eve (do max_batch stavki ili window_ms od
+    prve stavke) i predaje ih handler-u; najviše `concurrency` batch-eva je u
+    obradi istovremeno.
+
+    Red ima dva prioriteta (0 = visok, 1 = nizak) i ukupno najviše `maxsize`
+    stavki; batch uvek prvo uzima stavke višeg prioriteta.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], Awaitable[None]],
+        max_batch: int,
+        window_ms: float,
+        concurrency: int,
+        maxsize: int = 0,
+    ):
+        self._handler = handler
+        self._max_batch = max(1, max_batch)
+        self._window = window_ms / 1000.0
+        self._sem = asyncio.Semaphore(max(1, concurrency))
+        self._maxsize = maxsize
+        self._queues = (deque(), deque())
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._tasks = set()
+        self._collecting = False
+
+    def qsize(self) -> int:
+        return len(self._queues[0]) + len(self._queues[1])
+
+    def full(self) -> bool:
+        return 0 < self._maxsize <= self.qsize()
+
+    async def submit(self, item: Any, priority: int = 0):
+        """Dodaje stavku; čeka ako je red pun (backpressure)."""
+        while self.full():
+            self._not_full.clear()
+            await self._not_full.wait()
+        self._queues[priority].append(item)
+        self._not_empty.set()
+
+    def offer(self, item: Any, priority: int = 0) -> Optional[Any]:
+        """
+        Dodaje stavku bez čekanja. Kada je red pun, izbacuje najstariju stavku
+        nižeg prioriteta i vraća je; ako takve nema, vraća samu `item` (nije
+        dodata). Vraća None kada ništa nije izbačeno.
+        """
+        dropped = None
+        if self.full():
+            lower = self._queues[1] if priority == 0 else None
+            if not lower:
+                return item
+            dropped = lower.popleft()
+        self._queues[priority].append(item)
+        self._not_empty.set()
+        return dropped
+
+    def _pop(self) -> Any:
+        item = (self._queues[0] or self._queues[1]).popleft()
+        self._not_full.set()
+        return item
+
+    async def _get(self, timeout: Optional[float] = None) -> Any:
+        while not self.qsize():
+            self._not_empty.clear()
+            if timeout is None:
+                await self._not_empty.wait()
+            else:
+                await asyncio.wait_for(self._not_empty.wait(), timeout)
+        return self._pop()
+
+    async def join(self):
+        """Čeka da se red isprazni i da se završe svi batch-evi u obradi."""
+        while self.qsize() or self._collecting or self._tasks:
+            await asyncio.sleep(0.005)
+
+    async def run(self):
+        while True:
+            batch = [await self._get()]
+            self._collecting = True
+            deadline = time.monotonic() + self._window
+            while len(batch) < self._max_batch:
+                if self.qsize():
+                    batch.append(self._pop())
+                    continue
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await self._get(timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._sem.acquire()
+            task = asyncio.create_task(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            self._collecting = False
+
+    async def _dispatch(self, batch: List[Any]):
+        try:
+            await self._handler(batch)
+        except Exception as ex:
+            print(f"[analytics] ERROR handling batch of {len(batch)}: {ex}")
+        finally:
+            self._sem.release()
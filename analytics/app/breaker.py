@@ -0,0 +1,62 @@
+import time
+
+from app.metrics import BREAKER_STATE
+
+CLOSED, OPEN, HALF_OPEN = 0, 1, 2
+_STATE_NAMES = {CLOSED: "closed", OPEN: "open", HALF_OPEN: "half-open"}
+
+
+class CircuitBreakerOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Prekidač oko poziva modela. Posle `failure_threshold` uzastopnih
+    neuspelih (ili sporijih od `slow_call_sec`) poziva otvara se na `open_sec`
+    sekundi i pozivi se ne šalju. Zatim propušta jedan probni poziv
+    (half-open): uspeh ga zatvara, neuspeh ponovo otvara.
+    """
+
+    def __init__(self, failure_threshold: int, open_sec: float, slow_call_sec: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_sec = open_sec
+        self.slow_call_sec = slow_call_sec
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        BREAKER_STATE.set(CLOSED)
+
+    def allow(self, now: float = None) -> bool:
+        now = time.monotonic() if now is None else now
+        if self.state == OPEN and now - self._opened_at >= self.open_sec:
+            self._set(HALF_OPEN)
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record(self, ok: bool, latency_sec: float, now: float = None):
+        now = time.monotonic() if now is None else now
+        if self.slow_call_sec > 0 and latency_sec > self.slow_call_sec:
+            ok = False
+        if self.state == HALF_OPEN:
+            self._probe_in_flight = False
+        if ok:
+            self._failures = 0
+            if self.state != CLOSED:
+                self._set(CLOSED)
+            return
+        self._failures += 1
+        if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+            self._opened_at = now
+            if self.state != OPEN:
+                self._set(OPEN)
+
+    def _set(self, state: int):
+        print(f"[analytics] circuit breaker {_STATE_NAMES[self.state]} -> {_STATE_NAMES[state]}")
+        self.state = state
+        BREAKER_STATE.set(state)
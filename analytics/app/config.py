@@ -0,0 +1,76 @@
+import os
+
+# === Config iz ENV-a ===
+MQTT_HOST = os.getenv("MQTT_HOST", "localhost")
+MQTT_PORT = int(os.getenv("MQTT_PORT", "1883"))
+MQTT_IN_TOPIC = os.getenv("MQTT_IN_TOPIC", "iot/deliveries/events")
+# sirovi DeliveryEvent-i za feature store (weather/traffic/distanceKm po isporuci)
+MQTT_FEATURE_TOPIC = os.getenv("MQTT_FEATURE_TOPIC", "iot/deliveries/raw")
+FEATURE_STORE_MAX = int(os.getenv("FEATURE_STORE_MAX", "100000"))
+# da li se i sirove isporuke (ne samo DetectedEvent-i) šalju modelu
+SCORE_RAW_DELIVERIES = os.getenv("SCORE_RAW_DELIVERIES", "0").lower() in ("1", "true", "yes")
+MQTT_RECONNECT_SEC = float(os.getenv("MQTT_RECONNECT_SEC", "2"))
+
+# pipeline: veličina redova između faza i broj radnika po fazi
+PIPELINE_QUEUE_MAX = int(os.getenv("PIPELINE_QUEUE_MAX", "1000"))
+DECODE_CONCURRENCY = int(os.getenv("DECODE_CONCURRENCY", "1"))
+FEATURE_CONCURRENCY = int(os.getenv("FEATURE_CONCURRENCY", "1"))
+
+# http = poziv MLaaS servisa, embedded = isti model.pkl učitan u procesu Analytics-a
+ML_MODE = os.getenv("ML_MODE", "http").lower()
+ML_MODEL_PATH = os.getenv("ML_MODEL_PATH", "/app/model.pkl")
+# koliko često se proverava da li je model.pkl zamenjen (hot-reload)
+ML_MODEL_POLL_SEC = float(os.getenv("ML_MODEL_POLL_SEC", "5"))
+LATE_DECISION_THRESHOLD = float(os.getenv("LATE_DECISION_THRESHOLD", "0.5"))
+SLA_THRESHOLD_MIN = float(os.getenv("SLA_THRESHOLD_MIN", "30"))
+
+ML_URL = os.getenv("ML_URL", "http://localhost:9000/predict")
+# batch endpoint MLaaS-a; ako je prazno, batch se šalje kao paralelni /predict pozivi
+ML_BATCH_URL = os.getenv("ML_BATCH_URL", "")
+ML_TIMEOUT_SEC = float(os.getenv("ML_TIMEOUT_SEC", "3"))
+ML_BATCH_SIZE = int(os.getenv("ML_BATCH_SIZE", "32"))
+ML_BATCH_WINDOW_MS = float(os.getenv("ML_BATCH_WINDOW_MS", "20"))
+ML_CONCURRENCY = int(os.getenv("ML_CONCURRENCY", "4"))
+# verzija modela za keš predikcija: MLaaS /health (prazno = uz ML_URL) ili fajl u embedded režimu
+ML_HEALTH_URL = os.getenv("ML_HEALTH_URL", "") or ML_URL.rsplit("/", 1)[0] + "/health"
+ML_VERSION_POLL_SEC = float(os.getenv("ML_VERSION_POLL_SEC", "5"))
+
+# keš predikcija po (area, weather, traffic, hour, weekday, korpa distanceKm); 0 = isključen
+PRED_CACHE_MAX = int(os.getenv("PRED_CACHE_MAX", "50000"))
+PRED_CACHE_TTL_SEC = float(os.getenv("PRED_CACHE_TTL_SEC", "300"))
+PRED_CACHE_DISTANCE_BUCKET_KM = float(os.getenv("PRED_CACHE_DISTANCE_BUCKET_KM", "1.0"))
+
+# maksimalan broj događaja koji čekaju na batch (red ispred faze predikcije)
+INTAKE_QUEUE_MAX = int(os.getenv("INTAKE_QUEUE_MAX", "10000"))
+# pun red: 1 = odbacuje se niži prioritet / visok dobija fallback skor, 0 = čeka se (backpressure)
+INTAKE_SHED = os.getenv("INTAKE_SHED", "1").lower() in ("1", "true", "yes")
+
+# circuit breaker oko poziva modela
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_OPEN_SEC = float(os.getenv("BREAKER_OPEN_SEC", "10"))
+# poziv sporiji od ovoga se računa kao neuspeh (0 = isključeno)
+BREAKER_SLOW_CALL_SEC = float(os.getenv("BREAKER_SLOW_CALL_SEC", "1.0"))
+
+# fallback skor: stope kašnjenja po (city, traffic); prior dok nema dovoljno uzoraka
+FALLBACK_PRIOR_RATE = float(os.getenv("FALLBACK_PRIOR_RATE", "0.5"))
+FALLBACK_PRIOR_WEIGHT = float(os.getenv("FALLBACK_PRIOR_WEIGHT", "20"))
+
+NATS_URL = os.getenv("NATS_URL", "nats://localhost:4222")
+NATS_SUBJECT = os.getenv("NATS_SUBJECT", "analytics.risk")
+# red poruka ka NATS-u (čuva ih i tokom prekida konekcije) i veličina batch-a po flush-u
+NATS_BUFFER_MAX = int(os.getenv("NATS_BUFFER_MAX", "10000"))
+NATS_BATCH_SIZE = int(os.getenv("NATS_BATCH_SIZE", "64"))
+NATS_PUBLISH_TIMEOUT_SEC = float(os.getenv("NATS_PUBLISH_TIMEOUT_SEC", "2"))
+NATS_PUBLISH_RETRIES = int(os.getenv("NATS_PUBLISH_RETRIES", "2"))
+# bafer nats klijenta tokom reconnect-a (bajtovi)
+NATS_RECONNECT_BUFFER_BYTES = int(os.getenv("NATS_RECONNECT_BUFFER_BYTES", str(8 * 1024 * 1024)))
+# JetStream: objava sa PubAck potvrdom; najviše NATS_MAX_PENDING nepotvrđenih objava
+NATS_JETSTREAM = os.getenv("NATS_JETSTREAM", "0").lower() in ("1", "true", "yes")
+NATS_MAX_PENDING = int(os.getenv("NATS_MAX_PENDING", "256"))
+# ako je zadat, stream se kreira pri startu (subject NATS_SUBJECT)
+NATS_STREAM = os.getenv("NATS_STREAM", "")
+
+# Prometheus /metrics (0 = isključeno)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9101"))
+# histogrami faza po poruci (decode, timestamp_parse, feature_build) mere svaku N-tu poruku
+STAGE_SAMPLE_EVERY = max(1, int(os.getenv("STAGE_SAMPLE_EVERY", "16")))
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+
+from joblib import load
+
+from app.config import LATE_DECISION_THRESHOLD, ML_MODEL_PATH, ML_MODEL_POLL_SEC, SLA_THRESHOLD_MIN
+from deliveryml.encoder import CompiledEncoder
+from deliveryml.features import artifact_version, features_frame
+
+
+class _LoadedModel(NamedTuple):
+    model: Any
+    feature_names: List[str]
+    threshold_min: float
+    version: str
+    encoder: Optional[CompiledEncoder]
+
+
+class EmbeddedModel:
+    """
+    Isti model.pkl kao MLaaS, ali u procesu Analytics-a (bez HTTP poziva).
+
+    Fajl se proverava najviše jednom na ML_MODEL_POLL_SEC; kada se verzija
+    (mtime/veličina) promeni, novi artefakt se učitava u pozadinskoj niti i tek
+    posle uspešnog učitavanja zamenjuje referencu na model. Batch koji je već
+    krenuo završava se sa starim modelom, a neuspelo učitavanje (npr. fajl koji
+    se još upisuje) ostavlja stari model i pokušava ponovo sledeći put.
+    """
+
+    def __init__(self, path: str = ML_MODEL_PATH, poll_sec: float = ML_MODEL_POLL_SEC):
+        self.path = path
+        self.poll_sec = poll_sec
+        self._current: Optional[_LoadedModel] = None
+        self._next_check = 0.0
+        # jedna nit: predict_proba ne blokira event petlju, a učitavanje i predikcija se ne preklapaju
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedded-model")
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._current.version if self._current is not None else None
+
+    def _load(self) -> None:
+        version = artifact_version(self.path)
+        if self._current is not None and self._current.version == version:
+            return
+        bundle = load(self.path)
+        feature_names = bundle.get("feature_names_in")
+        if feature_names is None:
+            raise ValueError("model nema meta informaciju 'feature_names_in'")
+        old = self.version
+        self._current = _LoadedModel(
+            model=bundle["model"],
+            feature_names=list(feature_names),
+            threshold_min=float(bundle.get("threshold_min", SLA_THRESHOLD_MIN)),
+            version=version,
+            encoder=CompiledEncoder.from_pipeline(bundle["model"]),
+        )
+        print(f"[analytics] embedded model loaded from {self.path}: {old} -> {version}")
+
+    def maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.poll_sec
+        try:
+            self._load()
+        except Exception as ex:
+            if self._current is None:
+                raise
+            print(f"[analytics][WARN] model reload failed, keeping {self.version}: {ex}")
+
+    def predict(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        self.maybe_reload()
+        current = self._current
+        if current.encoder is not None:
+            probas = current.encoder.predict_proba(rows)[:, 1]
+        else:
+            probas = current.model.predict_proba(features_frame(rows, current.feature_names))[:, 1]
+        return [{
+            "late": int(p >= LATE_DECISION_THRESHOLD),
+            "proba_late": round(float(p), 3),
+            "threshold_min": current.threshold_min,
+            "model_version": current.version,
+        } for p in probas]
+
+    async def predict_batch(self, rows: List[Dict[str, Any]]) -> List[Union[Dict[str, Any], Exception]]:
+        """Isti ugovor kao MLClient.predict_batch: greška se vraća na mestu svake stavke."""
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self.predict, rows)
+        except Exception as ex:
+            return [ex] * len(rows)
+
+    async def refresh_version(self) -> Optional[str]:
+        """
+        Provera fajla i van predikcija (ista nit), da se nova verzija vidi i
+        kada svi upiti pogađaju keš predikcija.
+        """
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self.maybe_reload)
+        except Exception as ex:
+            print(f"[analytics][WARN] model version check failed: {ex}")
+        return self.version
+
+    async def aclose(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,58 @@
+import sys
+from typing import Any, Dict, Tuple
+
+from app.config import FALLBACK_PRIOR_RATE, FALLBACK_PRIOR_WEIGHT, LATE_DECISION_THRESHOLD, SLA_THRESHOLD_MIN
+
+
+class LateRates:
+    """
+    Istorijske stope kašnjenja (timeTakenMin > SLA_THRESHOLD_MIN) u memoriji,
+    po (city, traffic), sa glatkim prelazom ka stopi po traffic-u i globalnoj
+    stopi kada je uzorak mali. Puni se iz sirovih isporuka i služi kao jeftina
+    zamena za model kada je MLaaS nedostupan ili je red pun.
+    """
+
+    def __init__(self, prior_rate: float = FALLBACK_PRIOR_RATE, prior_weight: float = FALLBACK_PRIOR_WEIGHT):
+        self._prior_rate = prior_rate
+        self._w = prior_weight
+        # ključ -> [broj kasnih, ukupno]
+        self._by_city_traffic: Dict[Tuple[str, str], list] = {}
+        self._by_traffic: Dict[str, list] = {}
+        self._total = [0, 0]
+
+    def observe(self, delivery: Dict[str, Any]):
+        taken = delivery.get("timeTakenMin")
+        if taken is None:
+            return
+        late = 1 if float(taken) > SLA_THRESHOLD_MIN else 0
+        city = sys.intern(str(delivery.get("city") or "Unknown"))
+        traffic = sys.intern(str(delivery.get("traffic") or "Unknown"))
+        for counts in (
+            self._by_city_traffic.setdefault((city, traffic), [0, 0]),
+            self._by_traffic.setdefault(traffic, [0, 0]),
+            self._total,
+        ):
+            counts[0] += late
+            counts[1] += 1
+
+    def _smooth(self, counts, prior: float) -> float:
+        if not counts:
+            return prior
+        return (counts[0] + self._w * prior) / (counts[1] + self._w)
+
+    def rate(self, city: str, traffic: str) -> float:
+        p = self._smooth(self._total, self._prior_rate)
+        p = self._smooth(self._by_traffic.get(traffic), p)
+        return self._smooth(self._by_city_traffic.get((city, traffic)), p)
+
+    def predict(self, features: Dict[str, Any], reason: str) -> Dict[str, Any]:
+        """Predikcija u istom obliku kao MLaaS /predict, označena kao fallback."""
+        p = self.rate(features.get("area"), features.get("traffic"))
+        return {
+            "late": int(p >= LATE_DECISION_THRESHOLD),
+            "proba_late": round(p, 3),
+            "threshold_min": SLA_THRESHOLD_MIN,
+            "model_version": None,
+            "fallback": True,
+            "fallbackReason": reason,
+        }
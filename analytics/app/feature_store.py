@@ -0,0 +1,54 @@
+import sys
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+
+from app.metrics import FEATURE_EVICTIONS, FEATURE_HIT_RATIO, FEATURE_LOOKUPS, FEATURE_STORE_SIZE
+
+
+class DeliveryFeatures(NamedTuple):
+    city: str
+    weather: str
+    traffic: str
+    distanceKm: float
+
+
+class FeatureStore:
+    """
+    Poslednji kompaktan zapis po id-u isporuke, punjen sa iot/deliveries/raw.
+    Kategorije se intern-uju (ponavljaju se), a broj zapisa je ograničen (LRU).
+    Koristi se samo iz event petlje, bez zaključavanja.
+    """
+
+    def __init__(self, max_entries: int):
+        self._max = max(1, max_entries)
+        self._data: "OrderedDict[str, DeliveryFeatures]" = OrderedDict()
+        self.hits = 0
+        self.lookups = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def put(self, delivery: Dict[str, Any]):
+        delivery_id = delivery.get("id")
+        if not delivery_id:
+            return
+        self._data[delivery_id] = DeliveryFeatures(
+            sys.intern(str(delivery.get("city") or "Unknown")),
+            sys.intern(str(delivery.get("weather") or "Unknown")),
+            sys.intern(str(delivery.get("traffic") or "Unknown")),
+            float(delivery.get("distanceKm") or 0.0),
+        )
+        self._data.move_to_end(delivery_id)
+        if len(self._data) > self._max:
+            self._data.popitem(last=False)
+            FEATURE_EVICTIONS.inc()
+        FEATURE_STORE_SIZE.set(len(self._data))
+
+    def get(self, delivery_id: Optional[str]) -> Optional[DeliveryFeatures]:
+        rec = self._data.get(delivery_id) if delivery_id else None
+        self.lookups += 1
+        if rec is not None:
+            self.hits += 1
+        FEATURE_LOOKUPS.labels(result="hit" if rec is not None else "miss").inc()
+        FEATURE_HIT_RATIO.set(self.hits / self.lookups)
+        return rec
@@ -0,0 +1,48 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.feature_store import FeatureStore
+from deliveryml.features import parse_iso
+
+# ISO-8601 brzim putem (fromisoformat), ostali formati preko dateutil
+parse_timestamp = parse_iso
+
+
+def build_features(event: Dict[str, Any], store: FeatureStore, dt: Optional[datetime]) -> Dict[str, Any]:
+    """Feature-i za DetectedEvent: city/vreme iz događaja, ostalo iz feature store-a."""
+    hour, weekday = (dt.hour, dt.weekday()) if dt is not None else (12, 3)
+
+    # DetectedEvent nema weather/traffic, pa se spaja sa sirovom isporukom po id-u
+    rec = store.get(event.get("originalDeliveryId"))
+    if rec is not None:
+        return {
+            "area": event.get("city") or rec.city,
+            "weather": rec.weather,
+            "traffic": rec.traffic,
+            "distanceKm": rec.distanceKm,
+            "hour": hour,
+            "weekday": weekday,
+        }
+
+    # bez zapisa u store-u: city i actual (distanceKm ili timeTakenMin) iz samog događaja
+    return {
+        "area": event.get("city", "Unknown"),
+        "weather": "Clear",
+        "traffic": "Medium",
+        "distanceKm": float(event.get("actual", 1.0)) if event.get("field") == "distanceKm" else 10.0,
+        "hour": hour,
+        "weekday": weekday,
+    }
+
+
+def delivery_event(delivery: Dict[str, Any]) -> Dict[str, Any]:
+    """Sirova isporuka (iot/deliveries/raw) u oblik DetectedEvent-a bez pravila, za SCORE_RAW_DELIVERIES."""
+    return {
+        "rule": None,
+        "field": None,
+        "threshold": None,
+        "actual": None,
+        "city": delivery.get("city"),
+        "timestamp": delivery.get("deliveryTimestamp"),
+        "originalDeliveryId": delivery.get("id"),
+    }
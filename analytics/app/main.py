@@ -1,54 +1,70 @@
-import os, json, threading
-import paho.mqtt.client as mqtt
-import requests
-from dateutil import parser
-
-MQTT_HOST = os.getenv("MQTT_HOST", "mosquitto")
-MQTT_PORT = int(os.getenv("MQTT_PORT", "1883"))
-TOPIC_IN = os.getenv("MQTT_TOPIC_IN", "iot/deliveries/raw")
-
-MLAAS_URL = os.getenv("MLAAS_URL", "http://mlaas:9000/predict")
-
-def extract_features(msg_dict):
-    d = msg_dict.get("delivery", {})
-    ts = d.get("deliveryTimestamp")
-    if ts:
-        dt = parser.parse(ts)
-        hour = dt.hour
-        weekday = dt.weekday()
+import asyncio
+
+import aiomqtt
+
+from app.config import (
+    FEATURE_STORE_MAX, ML_BATCH_URL, ML_MODE, ML_MODEL_PATH, ML_URL, MQTT_FEATURE_TOPIC, MQTT_HOST, MQTT_IN_TOPIC,
+    MQTT_PORT, MQTT_RECONNECT_SEC, NATS_SUBJECT, PRED_CACHE_DISTANCE_BUCKET_KM, PRED_CACHE_MAX, PRED_CACHE_TTL_SEC,
+)
+from app.embedded import EmbeddedModel
+from app.feature_store import FeatureStore
+from app.metrics import start_metrics_server
+from app.mlclient import MLClient
+from app.pipeline import Pipeline
+from app.prediction_cache import PredictionCache
+from app.publisher import NatsPublisher
+
+
+async def mqtt_reader(pipeline: Pipeline):
+    """Async MQTT klijent: poruke idu direktno u red pipeline-a, uz ponovno povezivanje."""
+    while True:
+        try:
+            async with aiomqtt.Client(MQTT_HOST, MQTT_PORT, keepalive=60) as client:
+                await client.subscribe([(MQTT_IN_TOPIC, 1), (MQTT_FEATURE_TOPIC, 0)])
+                print(f"[analytics] MQTT connected, sub {MQTT_IN_TOPIC}, {MQTT_FEATURE_TOPIC}")
+                async for msg in client.messages:
+                    await pipeline.feed(msg.topic.value, msg.payload)
+        except aiomqtt.MqttError as ex:
+            print(f"[analytics][WARN] MQTT connection lost ({ex}), reconnecting in {MQTT_RECONNECT_SEC}s")
+            await asyncio.sleep(MQTT_RECONNECT_SEC)
+
+
+async def create_model():
+    if ML_MODE == "embedded":
+        ml = EmbeddedModel()
+        # prvo učitavanje odmah, da greška u artefaktu obori start a ne prvi batch
+        await asyncio.get_running_loop().run_in_executor(None, ml.maybe_reload)
+        print(f"[analytics] ML embedded {ML_MODEL_PATH} ({ml.version})")
     else:
-        hour, weekday = 12, 3
-
-    return {
-        "city": d.get("city", "Unknown"),
-        "weather": d.get("weather", "Unknown"),
-        "traffic": d.get("traffic", "Unknown"),
-        "distanceKm": float(d.get("distanceKm", 0.0)),
-        "hour": hour,
-        "weekday": weekday,
-    }
-
-def on_connect(client, userdata, flags, rc):
-    print(f"[Analytics] connected rc={rc}")
-    client.subscribe(TOPIC_IN, qos=1)
-
-def on_message(client, userdata, msg):
+        ml = MLClient()
+        print(f"[analytics] ML {ML_BATCH_URL or ML_URL}")
+    return ml
+
+
+async def run():
+    publisher = NatsPublisher(NATS_SUBJECT)
+    await publisher.connect()
+    ml = await create_model()
+    pipeline = Pipeline(
+        ml,
+        publisher,
+        FeatureStore(FEATURE_STORE_MAX),
+        PredictionCache(PRED_CACHE_MAX, PRED_CACHE_TTL_SEC, PRED_CACHE_DISTANCE_BUCKET_KM),
+    )
+    tasks = pipeline.start()
     try:
-        payload = json.loads(msg.payload.decode("utf-8"))
-        feats = extract_features(payload)
-        r = requests.post(MLAAS_URL, json=feats, timeout=5)
-        r.raise_for_status()
-        pred = r.json()
-        print(f"[Analytics] IN -> {feats}  |  PRED -> {pred}")
-    except Exception as e:
-        print(f"[Analytics][ERR] {e}")
+        await mqtt_reader(pipeline)
+    finally:
+        for t in tasks:
+            t.cancel()
+        await publisher.close()
+        await ml.aclose()
+
 
 def main():
-    client = mqtt.Client()
-    client.on_connect = on_connect
-    client.on_message = on_message
-    client.connect(MQTT_HOST, MQTT_PORT, keepalive=60)
-    client.loop_forever()
+    start_metrics_server()
+    asyncio.run(run())
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,85 @@
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, start_http_server
+
+from app.config import METRICS_PORT
+
+registry = CollectorRegistry()
+
+FEATURE_LOOKUPS = Counter(
+    "analytics_feature_store_lookups_total", "Lookup-ovi u feature store po rezultatu", ["result"], registry=registry
+)
+FEATURE_HIT_RATIO = Gauge("analytics_feature_store_hit_ratio", "Udeo pogodaka u feature store-u", registry=registry)
+FEATURE_STORE_SIZE = Gauge("analytics_feature_store_entries", "Broj zapisa u feature store-u", registry=registry)
+FEATURE_EVICTIONS = Counter(
+    "analytics_feature_store_evictions_total", "Zapisi izbačeni zbog limita veličine", registry=registry
+)
+
+PRED_CACHE_LOOKUPS = Counter(
+    "analytics_prediction_cache_lookups_total", "Lookup-ovi u keš predikcija po rezultatu", ["result"], registry=registry
+)
+PRED_CACHE_HIT_RATIO = Gauge("analytics_prediction_cache_hit_ratio", "Udeo pogodaka u kešu predikcija", registry=registry)
+PRED_CACHE_SIZE = Gauge("analytics_prediction_cache_entries", "Broj zapisa u kešu predikcija", registry=registry)
+PRED_CACHE_SAVED_SECONDS = Counter(
+    "analytics_prediction_cache_saved_seconds_total",
+    "Procena ušteđenog vremena (latencija MLaaS poziva koji je doneo keširanu predikciju)",
+    registry=registry,
+)
+PRED_CACHE_INVALIDATIONS = Counter(
+    "analytics_prediction_cache_invalidations_total", "Brisanja keša zbog nove verzije modela", registry=registry
+)
+
+NATS_PUBLISHED = Counter(
+    "analytics_nats_published_total", "Objave na NATS po rezultatu (ok/error/unconfirmed)", ["result"], registry=registry
+)
+NATS_PENDING = Gauge("analytics_nats_pending_acks", "JetStream objave koje čekaju potvrdu", registry=registry)
+NATS_CONNECTED = Gauge("analytics_nats_connected", "1 ako je NATS konekcija aktivna", registry=registry)
+
+BREAKER_STATE = Gauge(
+    "analytics_breaker_state", "Stanje circuit breaker-a (0=closed, 1=open, 2=half-open)", registry=registry
+)
+EVENTS_SHED = Counter(
+    "analytics_events_shed_total", "Događaji odbačeni zbog punog reda po prioritetu", ["priority"], registry=registry
+)
+FALLBACK_SCORES = Counter(
+    "analytics_fallback_scores_total", "Predikcije iz fallback heuristike po razlogu", ["reason"], registry=registry
+)
+
+
+# --- faze pipeline-a ---
+# deca sa labelom se prave jednom, pa je merenje na vrućem putu samo perf_counter + observe
+STAGE_SECONDS = Histogram(
+    "analytics_stage_seconds",
+    "Trajanje faze pipeline-a (model_call i nats_publish po batch-u / objavi)",
+    ["stage"],
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+             0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+    registry=registry,
+)
+STAGE_DECODE = STAGE_SECONDS.labels(stage="decode")
+STAGE_TIMESTAMP_PARSE = STAGE_SECONDS.labels(stage="timestamp_parse")
+STAGE_FEATURE_BUILD = STAGE_SECONDS.labels(stage="feature_build")
+STAGE_MODEL_CALL = STAGE_SECONDS.labels(stage="model_call")
+STAGE_NATS_PUBLISH = STAGE_SECONDS.labels(stage="nats_publish")
+
+QUEUE_DEPTH = Gauge(
+    "analytics_queue_depth", "Broj stavki u redu ispred faze (čita se pri scrape-u)", ["queue"], registry=registry
+)
+
+EVENTS_IN = Counter("analytics_events_in_total", "Primljene MQTT poruke po vrsti", ["kind"], registry=registry)
+EVENTS_OUT = Counter(
+    "analytics_events_out_total", "Rezultati predati za objavu po izvoru predikcije", ["source"], registry=registry
+)
+EVENTS_DROPPED = Counter(
+    "analytics_events_dropped_total", "Odbačeni događaji po razlogu", ["reason"], registry=registry
+)
+E2E_LAG = Histogram(
+    "analytics_e2e_lag_seconds",
+    "Kašnjenje od 'timestamp' događaja do potvrđene objave na NATS",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 3600.0),
+    registry=registry,
+)
+
+
+def start_metrics_server():
+    if METRICS_PORT > 0:
+        start_http_server(METRICS_PORT, registry=registry)
+        print(f"[analytics] metrics on :{METRICS_PORT}/metrics")
@@ -0,0 +1,53 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Union
+
+import httpx
+
+from app.config import ML_BATCH_URL, ML_CONCURRENCY, ML_HEALTH_URL, ML_TIMEOUT_SEC, ML_URL
+
+
+class MLClient:
+    """Async klijent ka MLaaS-u sa pool-om keep-alive konekcija."""
+
+    def __init__(self):
+        self._http = httpx.AsyncClient(
+            timeout=ML_TIMEOUT_SEC,
+            limits=httpx.Limits(
+                max_connections=ML_CONCURRENCY,
+                max_keepalive_connections=ML_CONCURRENCY,
+            ),
+        )
+        # poslednji model_version sa /health (refresh_version)
+        self.version: Optional[str] = None
+
+    async def predict_batch(self, rows: List[Dict[str, Any]]) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Predikcije istim redosledom kao `rows`. Greška pojedinačnog poziva
+        vraća se kao Exception na mestu te stavke.
+        """
+        if ML_BATCH_URL:
+            try:
+                resp = await self._http.post(ML_BATCH_URL, json=rows)
+                resp.raise_for_status()
+                return resp.json()["predictions"]
+            except Exception as ex:
+                return [ex] * len(rows)
+        return await asyncio.gather(*(self._predict_one(r) for r in rows), return_exceptions=True)
+
+    async def _predict_one(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        resp = await self._http.post(ML_URL, json=row)
+        resp.raise_for_status()
+        return resp.json()
+
+    async def refresh_version(self) -> Optional[str]:
+        """model_version sa MLaaS /health; greška zadržava poslednju poznatu verziju."""
+        try:
+            resp = await self._http.get(ML_HEALTH_URL)
+            resp.raise_for_status()
+            self.version = resp.json().get("model_version") or self.version
+        except Exception as ex:
+            print(f"[analytics][WARN] model version check failed ({ML_HEALTH_URL}): {ex}")
+        return self.version
+
+    async def aclose(self):
+        await self._http.aclose()
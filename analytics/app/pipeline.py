@@ -0,0 +1,269 @@
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.batcher import MicroBatcher
+from app.breaker import CircuitBreaker
+from app.config import (
+    BREAKER_FAILURE_THRESHOLD, BREAKER_OPEN_SEC, BREAKER_SLOW_CALL_SEC, DECODE_CONCURRENCY, FEATURE_CONCURRENCY,
+    INTAKE_QUEUE_MAX, INTAKE_SHED, ML_BATCH_SIZE, ML_BATCH_WINDOW_MS, ML_CONCURRENCY, ML_VERSION_POLL_SEC,
+    MQTT_FEATURE_TOPIC, NATS_SUBJECT, PIPELINE_QUEUE_MAX, SCORE_RAW_DELIVERIES, STAGE_SAMPLE_EVERY,
+)
+from app.fallback import LateRates
+from app.feature_store import FeatureStore
+from app.features import build_features, delivery_event, parse_timestamp
+from app.metrics import (
+    EVENTS_DROPPED, EVENTS_IN, EVENTS_OUT, EVENTS_SHED, FALLBACK_SCORES, QUEUE_DEPTH, STAGE_DECODE,
+    STAGE_FEATURE_BUILD, STAGE_MODEL_CALL, STAGE_TIMESTAMP_PARSE,
+)
+from app.prediction_cache import PredictionCache
+
+# prioriteti u redu ispred modela: događaji sa prekršajem pre sirovih isporuka
+PRIORITY_VIOLATION, PRIORITY_RAW = 0, 1
+
+_IN_RAW = EVENTS_IN.labels(kind="raw")
+_IN_EVENT = EVENTS_IN.labels(kind="event")
+_OUT_MODEL = EVENTS_OUT.labels(source="model")
+_OUT_CACHE = EVENTS_OUT.labels(source="cache")
+_OUT_FALLBACK = EVENTS_OUT.labels(source="fallback")
+
+
+class Pipeline:
+    """
+    Analytics u jednoj asyncio petlji:
+
+      MQTT -> [decode_q] -> decode -> [feature_q] -> feature build
+           -> [MicroBatcher] -> predikcija -> [NatsPublisher] -> NATS
+
+    Svi redovi su ograničeni, pa spora faza usporava prethodne umesto da
+    memorija raste. Broj radnika po fazi je podesiv (*_CONCURRENCY).
+
+    Red ispred modela (INTAKE_SHED) ne blokira: kada je pun, odbacuju se
+    sirove isporuke, a događaji sa prekršajem dobijaju fallback skor (LateRates).
+    Isti skor se koristi dok je circuit breaker otvoren ili kada poziv modela
+    ne uspe, pa se događaj ne gubi i propusnost ostaje ista.
+    """
+
+    def __init__(
+        self,
+        ml,
+        publisher,
+        features: FeatureStore,
+        pred_cache: PredictionCache,
+        score_raw: bool = SCORE_RAW_DELIVERIES,
+        shed: bool = INTAKE_SHED,
+        batch_size: int = ML_BATCH_SIZE,
+        concurrency: int = ML_CONCURRENCY,
+        log_events: bool = True,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self._score_raw = score_raw
+        self._shed_enabled = shed
+        self._log_events = log_events
+        self._ml = ml
+        self._publisher = publisher
+        self._features = features
+        self._pred_cache = pred_cache
+        self._late_rates = LateRates()
+        self._breaker = breaker or CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_OPEN_SEC, BREAKER_SLOW_CALL_SEC)
+        self._decode_q: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_MAX)
+        self._feature_q: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_MAX)
+        self._batcher = MicroBatcher(
+            self.score_batch,
+            max_batch=batch_size,
+            window_ms=ML_BATCH_WINDOW_MS,
+            concurrency=concurrency,
+            maxsize=INTAKE_QUEUE_MAX,
+        )
+        self._batch_size = batch_size
+        self._concurrency = concurrency
+        self._tasks: List[asyncio.Task] = []
+        # brojači za uzorkovanje histograma faza po poruci
+        self._decoded = 0
+        self._built = 0
+
+    def start(self) -> List[asyncio.Task]:
+        for name, size in (
+            ("decode", self._decode_q.qsize),
+            ("features", self._feature_q.qsize),
+            ("predict", self._batcher.qsize),
+            ("publish", self._publisher.qsize),
+        ):
+            QUEUE_DEPTH.labels(queue=name).set_function(size)
+        self._tasks = [asyncio.create_task(self._batcher.run())]
+        self._tasks += [asyncio.create_task(self._decode_worker()) for _ in range(max(1, DECODE_CONCURRENCY))]
+        self._tasks += [asyncio.create_task(self._feature_worker()) for _ in range(max(1, FEATURE_CONCURRENCY))]
+        if self._pred_cache.enabled:
+            self._tasks.append(asyncio.create_task(self._version_watcher()))
+        print(f"[analytics] pipeline: decode x{DECODE_CONCURRENCY}, features x{FEATURE_CONCURRENCY}, "
+              f"ML batch<={self._batch_size} window={ML_BATCH_WINDOW_MS}ms x{self._concurrency}, "
+              f"queues<={PIPELINE_QUEUE_MAX}")
+        return self._tasks
+
+    async def feed(self, topic: str, payload: bytes):
+        """Ulaz pipeline-a (MQTT poruka); čeka ako je red pun."""
+        await self._decode_q.put((topic, payload))
+
+    async def join(self):
+        """Čeka da sve predato kroz feed() prođe faze do objave (za replay)."""
+        await self._decode_q.join()
+        await self._feature_q.join()
+        await self._batcher.join()
+
+    # --- faze ---
+    async def _decode_worker(self):
+        while True:
+            topic, payload = await self._decode_q.get()
+            try:
+                self._decoded += 1
+                if self._decoded % STAGE_SAMPLE_EVERY:
+                    event = json.loads(payload)
+                else:
+                    t0 = time.perf_counter()
+                    event = json.loads(payload)
+                    STAGE_DECODE.observe(time.perf_counter() - t0)
+                if topic == MQTT_FEATURE_TOPIC:
+                    _IN_RAW.inc()
+                    delivery = event.get("delivery") or {}
+                    self._features.put(delivery)
+                    self._late_rates.observe(delivery)
+                    if not self._score_raw:
+                        continue
+                    event = delivery_event(delivery)
+                else:
+                    _IN_EVENT.inc()
+                await self._feature_q.put(event)
+            except Exception as ex:
+                EVENTS_DROPPED.labels(reason="decode_error").inc()
+                print(f"[analytics] ERROR decoding message on {topic}: {ex}")
+            finally:
+                self._decode_q.task_done()
+
+    async def _feature_worker(self):
+        while True:
+            event = await self._feature_q.get()
+            try:
+                self._built += 1
+                if self._built % STAGE_SAMPLE_EVERY:
+                    dt = parse_timestamp(event.get("timestamp"))
+                    features = build_features(event, self._features, dt)
+                else:
+                    t0 = time.perf_counter()
+                    dt = parse_timestamp(event.get("timestamp"))
+                    t1 = time.perf_counter()
+                    features = build_features(event, self._features, dt)
+                    STAGE_TIMESTAMP_PARSE.observe(t1 - t0)
+                    STAGE_FEATURE_BUILD.observe(time.perf_counter() - t1)
+
+                item = (event, features, dt.timestamp() if dt is not None else None)
+                priority = PRIORITY_VIOLATION if event.get("rule") else PRIORITY_RAW
+                if not self._shed_enabled:
+                    await self._batcher.submit(item, priority)
+                    continue
+                dropped = self._batcher.offer(item, priority)
+                if dropped is not None:
+                    await self._shed(*dropped)
+            except Exception as ex:
+                EVENTS_DROPPED.labels(reason="feature_error").inc()
+                print(f"[analytics] ERROR building features: {ex}")
+            finally:
+                self._feature_q.task_done()
+
+    async def _shed(self, event: Dict[str, Any], features: Dict[str, Any], event_ts: Optional[float]):
+        if not event.get("rule"):
+            EVENTS_SHED.labels(priority="raw").inc()
+            EVENTS_DROPPED.labels(reason="shed").inc()
+            return
+        # prekršaj se ne odbacuje: umesto modela dobija fallback skor
+        EVENTS_SHED.labels(priority="violation").inc()
+        FALLBACK_SCORES.labels(reason="shed").inc()
+        _OUT_FALLBACK.inc()
+        await self._publish(event, features, event_ts, self._late_rates.predict(features, "shed"))
+
+    async def _version_watcher(self):
+        """Keš predikcija se briše čim model prijavi novu verziju, i kada nema promašaja."""
+        while True:
+            await self._ml.refresh_version()
+            self._pred_cache.observe_version(self._ml.version)
+            await asyncio.sleep(ML_VERSION_POLL_SEC)
+
+    async def score_batch(self, batch: List[Tuple[Dict[str, Any], Dict[str, Any], Optional[float]]]):
+        if self._pred_cache.enabled:
+            self._pred_cache.observe_version(self._ml.version)
+        preds: List[Any] = [self._pred_cache.get(features) for _, features, _ in batch]
+        cached = len(batch) - sum(p is None for p in preds)
+        if cached:
+            _OUT_CACHE.inc(cached)
+
+        # promašaji sa istim ključem keša u istom batch-u idu ka modelu jednom
+        misses: Dict[Any, List[int]] = {}
+        for i, pred in enumerate(preds):
+            if pred is None:
+                key = self._pred_cache.key(batch[i][1]) if self._pred_cache.enabled else i
+                misses.setdefault(key, []).append(i)
+        if misses:
+            groups = list(misses.values())
+            rows = [batch[idx[0]][1] for idx in groups]
+            if self._breaker.allow():
+                t0 = time.perf_counter()
+                try:
+                    fetched = await self._ml.predict_batch(rows)
+                except Exception as ex:
+                    fetched = [ex] * len(rows)
+                latency = time.perf_counter() - t0
+                STAGE_MODEL_CALL.observe(latency)
+                errors = [p for p in fetched if isinstance(p, Exception)]
+                self._breaker.record(not errors, latency)
+                if errors:
+                    print(f"[analytics] ERROR model call failed for {len(errors)}/{len(rows)}, using fallback: {errors[0]}")
+            else:
+                fetched = [None] * len(rows)
+                latency = 0.0
+            for idx, pred in zip(groups, fetched):
+                if pred is None or isinstance(pred, Exception):
+                    reason = "breaker_open" if pred is None else "model_error"
+                    FALLBACK_SCORES.labels(reason=reason).inc(len(idx))
+                    pred = self._late_rates.predict(batch[idx[0]][1], reason)
+                    _OUT_FALLBACK.inc(len(idx))
+                else:
+                    self._pred_cache.put(batch[idx[0]][1], pred, latency)
+                    _OUT_MODEL.inc(len(idx))
+                for i in idx:
+                    preds[i] = pred
+
+        for (event, features, event_ts), pred in zip(batch, preds):
+            await self._publish(event, features, event_ts, pred)
+
+    async def _publish(self, event: Dict[str, Any], features: Dict[str, Any], event_ts: Optional[float],
+                       pred: Dict[str, Any]):
+        out_msg = {
+            "eventType": "analytics.risk",
+            "source": "analytics",
+            "violationRule": event.get("rule"),
+            "violationField": event.get("field"),
+            "threshold": event.get("threshold"),
+            "actual": event.get("actual"),
+            "city": event.get("city"),
+            "features": features,
+            "prediction": pred,
+            "fallback": bool(pred.get("fallback", False)),
+            "originalDeliveryId": event.get("originalDeliveryId"),
+            "ts": int(time.time() * 1000),
+        }
+
+        await self._publisher.publish(json.dumps(out_msg).encode("utf-8"), event_ts)
+        if not self._log_events:
+            return
+        if event.get("rule"):
+            print(f"[analytics] ⚠️ VIOLATION DETECTED: {event.get('rule')} in {event.get('city')} | {event.get('field')}={event.get('actual')} > {event.get('threshold')}")
+        print(f"[analytics] 🤖 ML PREDICTION: {pred}")
+        print(f"[analytics] 📤 NATS queued -> {NATS_SUBJECT}")
+
+    def queue_depths(self) -> Dict[str, int]:
+        return {
+            "decode": self._decode_q.qsize(),
+            "features": self._feature_q.qsize(),
+            "predict": self._batcher.qsize(),
+            "publish": self._publisher.qsize(),
+        }
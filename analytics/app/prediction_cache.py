@@ -0,0 +1,83 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.metrics import (
+    PRED_CACHE_HIT_RATIO, PRED_CACHE_INVALIDATIONS, PRED_CACHE_LOOKUPS, PRED_CACHE_SAVED_SECONDS, PRED_CACHE_SIZE,
+)
+
+
+class PredictionCache:
+    """
+    LRU + TTL keš MLaaS predikcija po diskretizovanom vektoru feature-a
+    (area, weather, traffic, hour, weekday, korpa distanceKm). Briše se ceo kada
+    model prijavi novu verziju: Pipeline je proverava pre lookup-a i na
+    ML_VERSION_POLL_SEC (MLaaS /health ili fajl embedded modela), a i odgovor
+    sa novom verzijom pri upisu promašaja. TTL je gornja granica zastarelosti.
+    """
+
+    def __init__(self, max_entries: int, ttl_sec: float, distance_bucket_km: float):
+        self._max = max_entries
+        self._ttl = ttl_sec
+        self._bucket = distance_bucket_km
+        # ključ -> (predikcija, vreme isteka, latencija poziva koji ju je doneo)
+        self._data: "OrderedDict[Tuple, Tuple[Dict[str, Any], float, float]]" = OrderedDict()
+        self.model_version: Optional[str] = None
+        self.hits = 0
+        self.lookups = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._max > 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def key(self, f: Dict[str, Any]) -> Tuple:
+        dist = float(f.get("distanceKm") or 0.0)
+        dist_bucket = int(dist // self._bucket) if self._bucket > 0 else dist
+        return (f.get("area"), f.get("weather"), f.get("traffic"), f.get("hour"), f.get("weekday"), dist_bucket)
+
+    def get(self, features: Dict[str, Any], now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        now = time.monotonic() if now is None else now
+        key = self.key(features)
+        entry = self._data.get(key)
+        if entry is not None and entry[1] <= now:
+            del self._data[key]
+            entry = None
+
+        self.lookups += 1
+        if entry is None:
+            PRED_CACHE_LOOKUPS.labels(result="miss").inc()
+        else:
+            self.hits += 1
+            self._data.move_to_end(key)
+            PRED_CACHE_LOOKUPS.labels(result="hit").inc()
+            PRED_CACHE_SAVED_SECONDS.inc(entry[2])
+        PRED_CACHE_HIT_RATIO.set(self.hits / self.lookups)
+        return None if entry is None else entry[0]
+
+    def put(self, features: Dict[str, Any], pred: Dict[str, Any], latency_sec: float, now: Optional[float] = None):
+        # canary odgovor (kandidat model u MLaaS-u) se ne kešira i ne menja praćenu verziju
+        if not self.enabled or pred.get("canary"):
+            return
+        self.observe_version(pred.get("model_version"))
+        now = time.monotonic() if now is None else now
+        key = self.key(features)
+        self._data[key] = (pred, now + self._ttl, latency_sec)
+        self._data.move_to_end(key)
+        if len(self._data) > self._max:
+            self._data.popitem(last=False)
+        PRED_CACHE_SIZE.set(len(self._data))
+
+    def observe_version(self, version: Optional[str]):
+        if version is None or version == self.model_version:
+            return
+        if self.model_version is not None:
+            self._data.clear()
+            PRED_CACHE_INVALIDATIONS.inc()
+            PRED_CACHE_SIZE.set(0)
+            print(f"[analytics] model version {self.model_version} -> {version}, prediction cache cleared")
+        self.model_version = version
@@ -0,0 +1,161 @@
+import asyncio
+import time
+from typing import Optional
+
+from nats.aio.client import Client as NATS
+
+from app.config import (
+    NATS_BATCH_SIZE, NATS_BUFFER_MAX, NATS_JETSTREAM, NATS_MAX_PENDING, NATS_PUBLISH_RETRIES,
+    NATS_PUBLISH_TIMEOUT_SEC, NATS_RECONNECT_BUFFER_BYTES, NATS_STREAM, NATS_URL,
+)
+from app.metrics import E2E_LAG, NATS_CONNECTED, NATS_PENDING, NATS_PUBLISHED, STAGE_NATS_PUBLISH
+
+
+def _observe_lag(now: float, event_ts: Optional[float]):
+    # događaji bez vremena ili sa vremenom u budućnosti (razlika satova) se ne mere
+    if event_ts is not None and now >= event_ts:
+        E2E_LAG.observe(now - event_ts)
+
+
+class NatsPublisher:
+    """
+    Objava rezultata na NATS kroz ograničen red (backpressure ka pipeline-u).
+
+    Core NATS: poruke iz reda se upisuju u batch-u (do NATS_BATCH_SIZE), pa
+    jedan flush (PING/PONG) potvrđuje da ih je server primio.
+    JetStream (NATS_JETSTREAM=1): svaka poruka čeka PubAck, a najviše
+    NATS_MAX_PENDING objava bez potvrde je u letu; neuspela objava se ponavlja
+    do NATS_PUBLISH_RETRIES puta.
+
+    Dok je konekcija prekinuta, poruke ostaju u redu (NATS_BUFFER_MAX), a
+    objava se nastavlja posle ponovnog povezivanja.
+    """
+
+    def __init__(self, subject: str):
+        self.subject = subject
+        self._nc = NATS()
+        self._js = None
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=NATS_BUFFER_MAX)
+        self._window = asyncio.Semaphore(max(1, NATS_MAX_PENDING))
+        self._connected = asyncio.Event()
+        self._acks = set()
+        self._task: Optional[asyncio.Task] = None
+
+    async def connect(self):
+        await self._nc.connect(
+            servers=[NATS_URL],
+            max_reconnect_attempts=-1,
+            pending_size=NATS_RECONNECT_BUFFER_BYTES,
+            disconnected_cb=self._on_disconnected,
+            reconnected_cb=self._on_reconnected,
+            error_cb=self._on_error,
+        )
+        self._connected.set()
+        NATS_CONNECTED.set(1)
+        if NATS_JETSTREAM:
+            self._js = self._nc.jetstream()
+            if NATS_STREAM:
+                try:
+                    await self._js.add_stream(name=NATS_STREAM, subjects=[self.subject])
+                except Exception as ex:
+                    print(f"[analytics][WARN] JetStream stream {NATS_STREAM}: {ex}")
+        mode = f"JetStream (pending<={NATS_MAX_PENDING})" if self._js is not None else "core"
+        print(f"[analytics] Connected to NATS: {NATS_URL} ({mode}, subject {self.subject})")
+        self._task = asyncio.create_task(self._run())
+
+    # callbacks
+    async def _on_disconnected(self):
+        self._connected.clear()
+        NATS_CONNECTED.set(0)
+        print(f"[analytics][WARN] NATS disconnected, buffering up to {NATS_BUFFER_MAX} messages")
+
+    async def _on_reconnected(self):
+        self._connected.set()
+        NATS_CONNECTED.set(1)
+        print(f"[analytics] NATS reconnected to {self._nc.connected_url.netloc}, "
+              f"{self._queue.qsize()} messages buffered")
+
+    async def _on_error(self, ex):
+        print(f"[analytics][WARN] NATS error: {ex}")
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    async def publish(self, payload: bytes, event_ts: Optional[float] = None):
+        """
+        Stavlja poruku u red; čeka ako je red pun. `event_ts` (epoch sekunde
+        događaja) služi za end-to-end lag, meren kada NATS potvrdi objavu.
+        """
+        await self._queue.put((payload, event_ts))
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < NATS_BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._connected.wait()
+
+            if self._js is not None:
+                for payload, event_ts in batch:
+                    await self._window.acquire()
+                    NATS_PENDING.inc()
+                    task = asyncio.create_task(self._publish_acked(payload, event_ts))
+                    self._acks.add(task)
+                    task.add_done_callback(self._acks.discard)
+            else:
+                await self._publish_core(batch)
+
+    async def _publish_core(self, batch):
+        t0 = time.perf_counter()
+        try:
+            for payload, _ in batch:
+                await self._nc.publish(self.subject, payload)
+        except Exception as ex:
+            NATS_PUBLISHED.labels(result="error").inc(len(batch))
+            print(f"[analytics][WARN] NATS publish of {len(batch)} failed: {ex}")
+            return
+        # poruke su u baferu klijenta (i preživljavaju reconnect); ponavlja se samo potvrda flush-om
+        for attempt in range(NATS_PUBLISH_RETRIES + 1):
+            try:
+                await self._nc.flush(timeout=NATS_PUBLISH_TIMEOUT_SEC)
+                STAGE_NATS_PUBLISH.observe(time.perf_counter() - t0)
+                NATS_PUBLISHED.labels(result="ok").inc(len(batch))
+                now = time.time()
+                for _, event_ts in batch:
+                    _observe_lag(now, event_ts)
+                return
+            except Exception as ex:
+                if attempt == NATS_PUBLISH_RETRIES:
+                    NATS_PUBLISHED.labels(result="unconfirmed").inc(len(batch))
+                    print(f"[analytics][WARN] NATS flush of {len(batch)} not confirmed: {ex}")
+                    return
+                await self._connected.wait()
+
+    async def _publish_acked(self, payload: bytes, event_ts: Optional[float]):
+        try:
+            for attempt in range(NATS_PUBLISH_RETRIES + 1):
+                t0 = time.perf_counter()
+                try:
+                    await self._js.publish(self.subject, payload, timeout=NATS_PUBLISH_TIMEOUT_SEC)
+                    STAGE_NATS_PUBLISH.observe(time.perf_counter() - t0)
+                    NATS_PUBLISHED.labels(result="ok").inc()
+                    _observe_lag(time.time(), event_ts)
+                    return
+                except Exception as ex:
+                    if attempt == NATS_PUBLISH_RETRIES:
+                        NATS_PUBLISHED.labels(result="error").inc()
+                        print(f"[analytics][WARN] JetStream publish failed (no ack): {ex}")
+                        return
+                    await self._connected.wait()
+        finally:
+            NATS_PENDING.dec()
+            self._window.release()
+
+    async def close(self, timeout: float = 5.0):
+        """Sačeka da se red isprazni i potvrde stignu, pa zatvori konekciju."""
+        deadline = time.monotonic() + timeout
+        while (not self._queue.empty() or self._acks) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._task is not None:
+            self._task.cancel()
+        await self._nc.drain()
@@ -0,0 +1,219 @@
+"""
+Offline replay/backfill: istorijski događaji kroz iste faze kao uživo
+(decode -> feature-i -> model -> objava), bez MQTT-a i što brže.
+
+Ulaz:
+  - JSONL: DetectedEvent (iot/deliveries/events), DeliveryEvent ({"delivery": {...}})
+    ili ravan zapis isporuke (camelCase ili snake_case kao u DataManager-u)
+  - CSV: izvoz tabele `deliveries` iz DataManager baze, npr.
+      psql -c "\\copy deliveries TO 'deliveries.csv' CSV HEADER"
+
+Izlaz: JSONL fajl (--output) ili NATS (--nats, subject NATS_SUBJECT).
+
+Pokretanje iz analytics/ (root repozitorijuma na PYTHONPATH):
+  python -m app.replay --input deliveries.csv --output scored.jsonl --batch-size 256 --concurrency 8
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.breaker import CircuitBreaker
+from app.config import (
+    BREAKER_FAILURE_THRESHOLD, BREAKER_OPEN_SEC, MQTT_FEATURE_TOPIC, MQTT_IN_TOPIC, NATS_SUBJECT,
+    PRED_CACHE_DISTANCE_BUCKET_KM, PRED_CACHE_MAX, PRED_CACHE_TTL_SEC,
+)
+from app.feature_store import FeatureStore
+from app.main import create_model
+from app.metrics import registry
+from app.pipeline import Pipeline
+from app.prediction_cache import PredictionCache
+from app.publisher import NatsPublisher
+
+# kolone DataManager-a (proto/SQL, snake_case) -> polja DeliveryEvent.delivery
+_DELIVERY_FIELDS = {
+    "id": "id",
+    "order_id": "orderId",
+    "delivery_person_id": "deliveryPersonId",
+    "city": "city",
+    "weather": "weather",
+    "traffic": "traffic",
+    "distance_km": "distanceKm",
+    "time_taken_min": "timeTakenMin",
+    "delivery_timestamp": "deliveryTimestamp",
+    "delivery_status": "deliveryStatus",
+}
+_NUMERIC_FIELDS = ("distanceKm", "timeTakenMin")
+
+
+def _delivery(row: Dict[str, Any]) -> Dict[str, Any]:
+    d = {_DELIVERY_FIELDS.get(k, k): v for k, v in row.items()}
+    for f in _NUMERIC_FIELDS:
+        if d.get(f) not in (None, ""):
+            d[f] = float(d[f])
+    return d
+
+
+def read_records(path: str, fmt: str) -> Iterator[Tuple[str, bytes]]:
+    """(tema, payload) po zapisu, kao da je stigao preko MQTT-a."""
+    if fmt == "csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                yield MQTT_FEATURE_TOPIC, json.dumps({"delivery": _delivery(row)}).encode("utf-8")
+        return
+
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            if "originalDeliveryId" in rec or "rule" in rec:
+                yield MQTT_IN_TOPIC, line
+            elif isinstance(rec.get("delivery"), dict):
+                yield MQTT_FEATURE_TOPIC, line
+            else:
+                yield MQTT_FEATURE_TOPIC, json.dumps({"delivery": _delivery(rec)}).encode("utf-8")
+
+
+class JsonlSink:
+    """Izlaz u JSONL fajl, isti interfejs kao NatsPublisher."""
+
+    def __init__(self, path: str):
+        self._f = open(path, "wb")
+
+    def qsize(self) -> int:
+        return 0
+
+    async def publish(self, payload: bytes, event_ts: Optional[float] = None):
+        self._f.write(payload)
+        self._f.write(b"\n")
+
+    async def close(self):
+        self._f.close()
+
+
+class TimedModel:
+    """Meri latenciju svakog poziva modela za završni izveštaj."""
+
+    def __init__(self, ml):
+        self._ml = ml
+        self.calls: List[Tuple[float, int]] = []
+
+    async def predict_batch(self, rows):
+        t0 = time.perf_counter()
+        try:
+            return await self._ml.predict_batch(rows)
+        finally:
+            self.calls.append((time.perf_counter() - t0, len(rows)))
+
+    @property
+    def version(self):
+        return self._ml.version
+
+    async def refresh_version(self):
+        return await self._ml.refresh_version()
+
+    async def aclose(self):
+        await self._ml.aclose()
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _out_count(source: str) -> float:
+    return registry.get_sample_value("analytics_events_out_total", {"source": source}) or 0.0
+
+
+def report(fed: int, elapsed: float, model: TimedModel, read_sec: float):
+    latencies = sorted(dt for dt, _ in model.calls)
+    rows = sum(n for _, n in model.calls)
+    out = {s: _out_count(s) for s in ("model", "cache", "fallback")}
+    total_out = sum(out.values())
+    print("[analytics] replay report")
+    print(f"  records read:     {fed} ({read_sec:.2f}s reading input)")
+    print(f"  results written:  {total_out:.0f} (model {out['model']:.0f}, cache {out['cache']:.0f}, "
+          f"fallback {out['fallback']:.0f})")
+    print(f"  elapsed:          {elapsed:.2f}s")
+    print(f"  throughput:       {fed / elapsed if elapsed > 0 else 0.0:,.0f} records/s, "
+          f"{total_out / elapsed if elapsed > 0 else 0.0:,.0f} results/s")
+    print(f"  model calls:      {len(latencies)} batches, {rows} rows "
+          f"(avg {rows / len(latencies) if latencies else 0.0:.1f} rows/batch)")
+    print(f"  batch latency:    p50 {_percentile(latencies, 0.50) * 1000:.1f} ms, "
+          f"p95 {_percentile(latencies, 0.95) * 1000:.1f} ms, p99 {_percentile(latencies, 0.99) * 1000:.1f} ms, "
+          f"max {(latencies[-1] if latencies else 0.0) * 1000:.1f} ms")
+
+
+async def replay(args) -> None:
+    if args.nats:
+        sink = NatsPublisher(NATS_SUBJECT)
+        await sink.connect()
+    else:
+        sink = JsonlSink(args.output)
+    model = TimedModel(await create_model())
+    pipeline = Pipeline(
+        model,
+        sink,
+        FeatureStore(args.feature_store_max),
+        PredictionCache(PRED_CACHE_MAX if args.cache else 0, PRED_CACHE_TTL_SEC, PRED_CACHE_DISTANCE_BUCKET_KM),
+        score_raw=args.score_deliveries,
+        shed=False,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        log_events=False,
+        # veliki batch-evi su ovde očekivano spori; breaker reaguje samo na greške
+        breaker=CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_OPEN_SEC, slow_call_sec=0),
+    )
+    tasks = pipeline.start()
+
+    t0 = time.perf_counter()
+    read_sec = 0.0
+    fed = 0
+    records = read_records(args.input, args.format)
+    while args.limit <= 0 or fed < args.limit:
+        r0 = time.perf_counter()
+        rec = next(records, None)
+        read_sec += time.perf_counter() - r0
+        if rec is None:
+            break
+        await pipeline.feed(*rec)
+        fed += 1
+    await pipeline.join()
+    await sink.close()
+    elapsed = time.perf_counter() - t0
+
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await model.aclose()
+    report(fed, elapsed, model, read_sec)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Analytics offline replay/backfill")
+    ap.add_argument("--input", required=True, help="JSONL događaja/isporuka ili CSV izvoz DataManager-a")
+    ap.add_argument("--format", choices=("jsonl", "csv"), help="podrazumevano po ekstenziji fajla")
+    out = ap.add_mutually_exclusive_group(required=True)
+    out.add_argument("--output", help="JSONL fajl sa analytics.risk porukama")
+    out.add_argument("--nats", action="store_true", help=f"objava na NATS ({NATS_SUBJECT})")
+    ap.add_argument("--batch-size", type=int, default=256)
+    ap.add_argument("--concurrency", type=int, default=8, help="batch-evi ka modelu istovremeno")
+    ap.add_argument("--no-score-deliveries", dest="score_deliveries", action="store_false",
+                    help="isporuke samo pune feature store (skoruju se samo DetectedEvent-i)")
+    ap.add_argument("--no-cache", dest="cache", action="store_false", help="bez keša predikcija")
+    ap.add_argument("--feature-store-max", type=int, default=1_000_000)
+    ap.add_argument("--limit", type=int, default=0, help="najviše zapisa (0 = svi)")
+    args = ap.parse_args()
+    if args.format is None:
+        args.format = "csv" if os.path.splitext(args.input)[1].lower() == ".csv" else "jsonl"
+    asyncio.run(replay(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Propusnost Analytics pipeline-a po jezgru (bez mreže: MQTT ulaz, model i NATS
+su zamenjeni konstantama, keš predikcija je isključen).
+
+  pre:   MQTT nit dekodira i gradi feature-e, pa svaku poruku predaje async
+         petlji u drugoj niti (run_coroutine_threadsafe(...).result())
+  posle: jedna asyncio petlja, faze povezane ograničenim redovima
+
+Meri CPU vreme procesa (sve niti), pa je rezultat poruka/s po jezgru.
+
+Pokretanje iz analytics/:
+  python bench_pipeline.py --n 20000
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import threading
+import time
+
+# poređenje iste obrade: bez odbacivanja/fallback-a kada je red ispred modela pun
+os.environ.setdefault("INTAKE_SHED", "0")
+
+from app.config import MQTT_IN_TOPIC
+from app.feature_store import FeatureStore
+from app.features import build_features, parse_timestamp
+from app.pipeline import Pipeline
+from app.prediction_cache import PredictionCache
+
+
+class ConstModel:
+    async def predict_batch(self, rows):
+        return [{"late": 1, "proba_late": 0.7, "threshold_min": 30.0, "model_version": "bench"} for _ in rows]
+
+
+class CountingPublisher:
+    def __init__(self, n: int):
+        self.n = n
+        self.count = 0
+        self.done = threading.Event()
+
+    def qsize(self) -> int:
+        return 0
+
+    async def publish(self, payload: bytes, event_ts=None):
+        self.count += 1
+        if self.count >= self.n:
+            self.done.set()
+
+
+def sample_payloads(n: int):
+    return [json.dumps({
+        "eventType": "threshold.exceeded",
+        "rule": "timeTakenMin_over_threshold",
+        "field": "timeTakenMin",
+        "threshold": 30.0,
+        "actual": 31.0 + i % 50,
+        "city": ("Belgrade", "Novi Sad", "Niš")[i % 3],
+        "timestamp": "2025-10-23T13:00:00Z",
+        "originalDeliveryId": f"D-{i}",
+    }).encode("utf-8") for i in range(n)]
+
+
+def make_pipeline(n: int):
+    pub = CountingPublisher(n)
+    return Pipeline(ConstModel(), pub, FeatureStore(1000), PredictionCache(0, 0, 1.0)), pub
+
+
+def before(payloads) -> float:
+    pipeline, pub = make_pipeline(len(payloads))
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    runner = asyncio.run_coroutine_threadsafe(pipeline._batcher.run(), loop)
+
+    t0 = time.process_time()
+    for p in payloads:
+        event = json.loads(p.decode("utf-8"))
+        dt = parse_timestamp(event.get("timestamp"))
+        features = build_features(event, pipeline._features, dt)
+        item = (event, features, dt.timestamp() if dt is not None else None)
+        asyncio.run_coroutine_threadsafe(pipeline._batcher.submit(item), loop).result()
+    pub.done.wait()
+    dt = time.process_time() - t0
+    runner.cancel()
+    return len(payloads) / dt
+
+
+def after(payloads) -> float:
+    async def go():
+        pipeline, pub = make_pipeline(len(payloads))
+        tasks = pipeline.start()
+        t0 = time.process_time()
+        for p in payloads:
+            await pipeline.feed(MQTT_IN_TOPIC, p)
+        while not pub.done.is_set():
+            await asyncio.sleep(0.001)
+        dt = time.process_time() - t0
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return len(payloads) / dt
+
+    return asyncio.run(go())
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Analytics pipeline throughput (before/after single event loop)")
+    ap.add_argument("--n", type=int, default=20000, help="broj poruka po prolazu")
+    ap.add_argument("--repeat", type=int, default=3, help="broj prolaza (uzima se najbolji)")
+    args = ap.parse_args()
+
+    payloads = sample_payloads(args.n)
+    # izlaz pipeline-a (log po poruci) se ne meri
+    with contextlib.redirect_stdout(io.StringIO()):
+        b = max(before(payloads) for _ in range(args.repeat))
+        a = max(after(payloads) for _ in range(args.repeat))
+    print(f"messages: {args.n} x {args.repeat}")
+    print(f"before (MQTT thread + run_coroutine_threadsafe per message): {b:,.0f} msg/s per core")
+    print(f"after  (single event loop, bounded stage queues):           {a:,.0f} msg/s per core")
+    print(f"speedup: {a / b:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import String, Float, TIMESTAMP, text
+from sqlalchemy import String, Float, TIMESTAMP, Index, func, text
 import uuid
 
 class Base(DeclarativeBase):
@@ -20,3 +20,10 @@ class Delivery(Base):
     time_taken_min: Mapped[float] = mapped_column(Float)
     delivery_timestamp: Mapped[str] = mapped_column(TIMESTAMP(timezone=True), server_default=text("CURRENT_TIMESTAMP"))
     delivery_status: Mapped[str] = mapped_column(String(32))
+    # vreme poslednjeg upisa (insert/update); raste i za red sa starim delivery_timestamp,
+    # pa inkrementalni trening (deliveryml.training_data) čita nove i izmenjene redove po (updated_at, id)
+    updated_at: Mapped[str] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now()
+    )
+
+    __table_args__ = (Index("ix_deliveries_updated_at_id", "updated_at", "id"),)
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, select, func, and_
+from sqlalchemy import create_engine, select, func, and_, text
 from sqlalchemy.orm import sessionmaker
 from .models import Base, Delivery
 import os
@@ -14,6 +14,19 @@ SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
 
 def init_db():
     Base.metadata.create_all(engine)
+    _migrate()
+
+def _migrate():
+    """Kolone dodate posle prvog create_all (create_all ne menja postojeću tabelu)."""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        conn.execute(text(
+            "ALTER TABLE deliveries ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_deliveries_updated_at_id ON deliveries (updated_at, id)"
+        ))
 
 class FilterObj:
     def __init__(self, city="", person_id="", status="", from_ts="", to_ts=""):
@@ -0,0 +1,132 @@
+"""
+CompiledEncoder naspram sklearn putanje (features_frame + Pipeline).
+
+  parity:   isti ulaz u estimator (transform) i iste verovatnoće za nasumične
+            zahteve, uključujući nepoznate kategorije, `city` umesto `area`,
+            vreme iz `timestamp` i nedostajuća polja; i za isti model sa
+            StandardScaler(with_mean=False) / (with_std=False)
+  latency:  jedan red, medijana i p99 (µs) za pripremu ulaza i ceo predict_proba
+
+Pokretanje iz root-a repozitorijuma:
+  python -m deliveryml.bench_encoder --model mlaas/model.pkl
+"""
+import argparse
+import copy
+import random
+import time
+
+import numpy as np
+from joblib import load
+
+from sklearn.preprocessing import StandardScaler
+
+from deliveryml.encoder import CompiledEncoder
+from deliveryml.features import features_frame
+
+AREAS = ("Urban", "Metropolitian", "Semi-Urban", "Belgrade")
+WEATHER = ("Sunny", "Fog", "Stormy", "Cloudy", "Sandstorms", "Windy", "Clear")
+TRAFFIC = ("Low", "Medium", "High", "Jam", "Unknown")
+
+
+def random_row(rnd: random.Random) -> dict:
+    row = {
+        "weather": rnd.choice(WEATHER),
+        "traffic": rnd.choice(TRAFFIC),
+        "distanceKm": round(rnd.uniform(0.0, 40.0), 3),
+    }
+    row["area" if rnd.random() < 0.7 else "city"] = rnd.choice(AREAS)
+    if rnd.random() < 0.8:
+        row["hour"] = rnd.randrange(24)
+        row["weekday"] = rnd.randrange(7)
+    elif rnd.random() < 0.7:
+        row["timestamp"] = f"2025-10-{rnd.randrange(1, 29):02d}T{rnd.randrange(24):02d}:15:00Z"
+    if rnd.random() < 0.05:
+        del row["distanceKm"]
+    return row
+
+
+def scaler_variant(model, **params):
+    """Kopija Pipeline-a u kojoj fitovani StandardScaler-i imaju zadate with_mean/with_std."""
+    model = copy.deepcopy(model)
+    scalers = [t for _, t, _ in model.steps[0][1].transformers_ if isinstance(t, StandardScaler)]
+    for t in scalers:
+        for key, value in params.items():
+            setattr(t, key, value)
+    return model if scalers else None
+
+
+def check_parity(bundle: dict, encoder: CompiledEncoder, n: int, seed: int) -> None:
+    rnd = random.Random(seed)
+    rows = [random_row(rnd) for _ in range(n)]
+    _check_rows(bundle["model"], bundle["feature_names_in"], encoder, rows)
+    for params in ({"with_mean": False}, {"with_std": False}, {"with_mean": False, "with_std": False}):
+        variant = scaler_variant(bundle["model"], **params)
+        if variant is None:
+            continue
+        _check_rows(variant, bundle["feature_names_in"], CompiledEncoder.from_pipeline(variant), rows[:500])
+        print(f"parity: OK with StandardScaler({', '.join(f'{k}={v}' for k, v in params.items())})")
+
+
+def _check_rows(model, names, encoder: CompiledEncoder, rows: list) -> None:
+    n = len(rows)
+    expected_X = model.steps[0][1].transform(features_frame(rows, names))
+    if hasattr(expected_X, "toarray"):
+        expected_X = expected_X.toarray()
+    got_X = encoder.transform(rows)
+    if not np.array_equal(expected_X, got_X):
+        bad = int(np.argwhere((expected_X != got_X).any(axis=1))[0][0])
+        raise SystemExit(f"[parity] transform se razlikuje za red {bad}: {rows[bad]}")
+
+    expected = model.predict_proba(features_frame(rows, names))
+    got = encoder.predict_proba(rows)
+    if not np.array_equal(expected, got):
+        raise SystemExit(f"[parity] predict_proba se razlikuje, max |Δ| = {np.abs(expected - got).max()}")
+    single = np.vstack([encoder.predict_proba([r]) for r in rows[:200]])
+    if not np.array_equal(expected[:200], single):
+        raise SystemExit("[parity] predict_proba red po red se razlikuje od batch-a")
+    print(f"parity: OK ({n} rows, transform and predict_proba bit-identical)")
+
+
+def timed(fn, repeat: int):
+    fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return samples[len(samples) // 2] * 1e6, samples[min(len(samples) - 1, int(0.99 * len(samples)))] * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compiled encoder parity and single-row latency")
+    ap.add_argument("--model", default="model.pkl", help="model.pkl (train.py ili MLaaS /train)")
+    ap.add_argument("--n", type=int, default=5000, help="broj redova za proveru")
+    ap.add_argument("--repeat", type=int, default=2000, help="broj merenja latencije pripreme ulaza")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    bundle = load(args.model)
+    encoder = CompiledEncoder.from_pipeline(bundle["model"])
+    if encoder is None:
+        raise SystemExit("model nije Pipeline(ColumnTransformer, estimator) sa podržanim koracima")
+    check_parity(bundle, encoder, args.n, args.seed)
+
+    model, names = bundle["model"], bundle["feature_names_in"]
+    pre = model.steps[0][1]
+    row = {"area": "Urban", "weather": "Fog", "traffic": "Jam", "distanceKm": 7.5, "hour": 19, "weekday": 4}
+    prep_sk = timed(lambda: pre.transform(features_frame([row], names)), args.repeat)
+    prep_c = timed(lambda: encoder.transform([row]), args.repeat)
+    full_repeat = max(20, args.repeat // 20)
+    full_sk = timed(lambda: model.predict_proba(features_frame([row], names)), full_repeat)
+    full_c = timed(lambda: encoder.predict_proba([row]), full_repeat)
+
+    print("single row latency (median / p99, µs)")
+    print(f"  input prep  sklearn (DataFrame + ColumnTransformer): {prep_sk[0]:9.1f} / {prep_sk[1]:9.1f}")
+    print(f"  input prep  compiled encoder:                        {prep_c[0]:9.1f} / {prep_c[1]:9.1f}")
+    print(f"  predict_proba sklearn pipeline:                      {full_sk[0]:9.1f} / {full_sk[1]:9.1f}")
+    print(f"  predict_proba compiled encoder + estimator:          {full_c[0]:9.1f} / {full_c[1]:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
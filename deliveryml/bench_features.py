@@ -0,0 +1,71 @@
+"""
+Propusnost pravljenja ulaza modela (redova/s), bez samog modela.
+
+  red po red: dateutil.parser.parse + DataFrame od jednog reda po događaju
+  batch:      features_frame (fromisoformat + kolonski nizovi, jedan DataFrame)
+
+Pokretanje iz root-a repozitorijuma:
+  python -m deliveryml.bench_features --n 20000 --batch 64
+"""
+import argparse
+import time
+
+import pandas as pd
+from dateutil import parser as date_parser
+
+from deliveryml.features import FEATURE_COLUMNS, features_frame
+
+
+def sample_events(n: int):
+    return [{
+        "area": ("Urban", "Metropolitian", "Semi-Urban")[i % 3],
+        "weather": ("Sunny", "Fog", "Stormy", "Cloudy")[i % 4],
+        "traffic": ("Low", "Medium", "High", "Jam")[i % 4],
+        "distanceKm": 1.0 + (i % 30),
+        "timestamp": f"2025-10-{1 + i % 28:02d}T{i % 24:02d}:15:00Z",
+    } for i in range(n)]
+
+
+def row_at_a_time(events, batch: int) -> int:
+    for e in events:
+        dt = date_parser.parse(e["timestamp"])
+        row = {"area": e["area"], "weather": e["weather"], "traffic": e["traffic"],
+               "distancekm": e["distanceKm"], "hour": dt.hour, "weekday": dt.weekday()}
+        pd.DataFrame([[row[c] for c in FEATURE_COLUMNS]], columns=list(FEATURE_COLUMNS))
+    return len(events)
+
+
+def batched(events, batch: int) -> int:
+    for i in range(0, len(events), batch):
+        features_frame(events[i:i + batch])
+    return len(events)
+
+
+def run(fn, events, batch: int, repeat: int) -> float:
+    best = 0.0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(events, batch)
+        dt = time.perf_counter() - t0
+        best = max(best, len(events) / dt)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Feature extraction throughput (rows/s)")
+    ap.add_argument("--n", type=int, default=20000, help="broj događaja po prolazu")
+    ap.add_argument("--batch", type=int, default=64, help="veličina batch-a za features_frame")
+    ap.add_argument("--repeat", type=int, default=3, help="broj prolaza (uzima se najbolji)")
+    args = ap.parse_args()
+
+    events = sample_events(args.n)
+    before = run(row_at_a_time, events, args.batch, args.repeat)
+    after = run(batched, events, args.batch, args.repeat)
+    print(f"events: {args.n} x {args.repeat}, batch {args.batch}")
+    print(f"row-at-a-time (dateutil + 1-row DataFrame): {before:,.0f} rows/s")
+    print(f"features_frame (fromisoformat, columnar):   {after:,.0f} rows/s")
+    print(f"speedup: {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
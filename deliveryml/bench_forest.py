@@ -0,0 +1,125 @@
+"""
+FlatForest naspram sklearn predict_proba.
+
+  equivalence: predict_proba ravne šume i sklearn-a na istim ulazima, za
+               model.pkl (ako je zadat) i niz sintetičkih šuma: RandomForest
+               i ExtraTrees, više klasa, ograničena dubina, težine uzoraka,
+               NaN u treningu i na ulazu, prazne/konstantne kolone
+  latency:     medijana i p99 (ms) po veličini batch-a, za model.pkl ili
+               sintetičku šumu veličine kao u train.py (200 stabala)
+
+Pokretanje iz root-a repozitorijuma:
+  python -m deliveryml.bench_forest --model mlaas/model.pkl
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+from joblib import load
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+
+from deliveryml.encoder import CompiledEncoder
+from deliveryml.forest import FlatForest
+
+ATOL = 1e-12
+
+
+def assert_equivalent(name: str, forest, X) -> None:
+    flat = FlatForest.from_estimator(forest)
+    expected = forest.predict_proba(X)
+    got = flat.predict_proba(X)
+    diff = float(np.abs(expected - got).max()) if expected.size else 0.0
+    if expected.shape != got.shape or diff > ATOL:
+        raise SystemExit(f"[equivalence] {name}: max |Δ| = {diff:.3g} (shape {expected.shape} vs {got.shape})")
+    if not np.array_equal(expected.argmax(axis=1), got.argmax(axis=1)):
+        raise SystemExit(f"[equivalence] {name}: različita predviđena klasa")
+    single = np.vstack([flat.predict_proba(X[i:i + 1]) for i in range(min(50, X.shape[0]))])
+    if np.abs(single - expected[:single.shape[0]]).max() > ATOL:
+        raise SystemExit(f"[equivalence] {name}: red po red se razlikuje od batch-a")
+    print(f"  {name:<44} OK  rows={X.shape[0]:<6} nodes={flat.n_nodes:<8} max |Δ|={diff:.1e}")
+
+
+def synthetic_cases(seed: int):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(3000, 14))
+    X[:, 3:] = (X[:, 3:] > 0.8).astype(float)  # one-hot kolone kao posle ColumnTransformer-a
+    X[:, 13] = 0.0  # konstantna kolona
+    y2 = (X[:, 0] + 0.5 * X[:, 1] - X[:, 4] + rng.normal(scale=0.5, size=3000) > 0).astype(int)
+    y3 = np.digitize(X[:, 0] + rng.normal(scale=0.3, size=3000), [-0.5, 0.5])
+    test = rng.normal(size=(2000, 14))
+    test[:, 3:] = (test[:, 3:] > 0.8).astype(float)
+
+    yield "rf binary (kao train.py, 50 stabala)", RandomForestClassifier(50, random_state=1, n_jobs=-1).fit(X, y2), test
+    yield "rf multiclass", RandomForestClassifier(30, random_state=2).fit(X, y3), test
+    yield "rf max_depth=4, class_weight=balanced", RandomForestClassifier(
+        40, max_depth=4, class_weight="balanced", random_state=3).fit(X, y2), test
+    yield "rf sample_weight", RandomForestClassifier(20, random_state=4).fit(
+        X, y2, sample_weight=rng.uniform(0.1, 3.0, size=3000)), test
+    yield "extra trees", ExtraTreesClassifier(40, random_state=5).fit(X, y3), test
+    yield "rf labels ['no','yes']", RandomForestClassifier(20, random_state=6).fit(
+        X, np.where(y2 == 1, "yes", "no")), test
+    yield "rf single stump", RandomForestClassifier(5, max_depth=1, random_state=7).fit(X, y2), test
+
+    Xn = X.copy()
+    Xn[rng.random(Xn.shape) < 0.1] = np.nan
+    test_n = test.copy()
+    test_n[rng.random(test_n.shape) < 0.1] = np.nan
+    yield "rf NaN in train and input", RandomForestClassifier(30, random_state=8).fit(Xn, y2), test_n
+
+
+def check_model(path: str, n: int, seed: int):
+    bundle = load(path)
+    pipe = bundle["model"]
+    encoder = CompiledEncoder.from_pipeline(pipe)
+    if encoder is None:
+        raise SystemExit("model nije Pipeline(ColumnTransformer, estimator) sa podržanim koracima")
+    from deliveryml.bench_encoder import random_row
+    rnd = random.Random(seed)
+    X = encoder.transform([random_row(rnd) for _ in range(n)])
+    assert_equivalent(f"model.pkl ({len(pipe.steps[-1][1].estimators_)} stabala)", pipe.steps[-1][1], X)
+    return pipe.steps[-1][1], X
+
+
+def timed(fn, repeat: int):
+    fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return samples[len(samples) // 2] * 1e3, samples[min(len(samples) - 1, int(0.99 * len(samples)))] * 1e3
+
+
+def main():
+    ap = argparse.ArgumentParser(description="FlatForest equivalence and latency")
+    ap.add_argument("--model", help="model.pkl (bez njega: sintetička šuma od 200 stabala)")
+    ap.add_argument("--n", type=int, default=5000, help="broj redova za proveru modela")
+    ap.add_argument("--sizes", default="1,8,32,128,512", help="veličine batch-a za latenciju")
+    ap.add_argument("--repeat", type=int, default=50, help="merenja po veličini (za batch > 32 manje)")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    print("equivalence (atol 1e-12, ista klasa)")
+    for name, forest, X in synthetic_cases(args.seed):
+        assert_equivalent(name, forest, X)
+    if args.model:
+        forest, X = check_model(args.model, args.n, args.seed)
+    else:
+        _, forest, X = next(synthetic_cases(args.seed))
+        forest = RandomForestClassifier(200, random_state=42, n_jobs=-1).fit(X, (X[:, 0] > 0).astype(int))
+    flat = FlatForest.from_estimator(forest)
+
+    print("latency (median / p99, ms)")
+    print(f"  {'batch':>6} {'sklearn':>18} {'flat':>18} {'speedup':>8}")
+    for size in (int(s) for s in args.sizes.split(",") if s):
+        xb = X[:size]
+        repeat = max(5, args.repeat if size <= 32 else args.repeat // 5)
+        sk = timed(lambda: forest.predict_proba(xb), repeat)
+        fl = timed(lambda: flat.predict_proba(xb), repeat)
+        print(f"  {size:>6} {sk[0]:>8.2f} / {sk[1]:>7.2f} {fl[0]:>8.2f} / {fl[1]:>7.2f} {sk[0] / fl[0]:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Priprema podataka za trening: stari put iz train.py (ceo CSV, pogađanje
+kolona, haversine red po red kroz df.apply) naspram deliveryml.training_data
+(samo potrebne kolone sa tipovima, vektorski feature-i) i Parquet keša.
+
+  parity:  isti redovi i iste vrednosti feature-a (distancekm do 1e-9)
+  timing:  stari put, nova priprema bez keša, prvi (miss) i ponovljeni (hit) poziv sa kešom
+
+Bez --csv pravi sintetički CSV u formatu Kaggle amazon_delivery.csv.
+Pokretanje iz root-a repozitorijuma:
+  python -m deliveryml.bench_training_data --rows 43000
+"""
+import argparse
+import math
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from deliveryml.features import FEATURE_COLUMNS
+from deliveryml.training_data import load_frame, prepare_frame
+
+
+def synthetic_csv(path: str, rows: int, seed: int):
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(12.0, 30.0, rows)
+    lon = rng.uniform(72.0, 88.0, rows)
+    dates = pd.Timestamp("2022-02-11") + pd.to_timedelta(rng.integers(0, 60, rows), unit="D")
+    times = pd.to_timedelta(rng.integers(0, 24 * 4, rows) * 15, unit="min")
+    order_time = pd.Series([f"{t.components.hours:02d}:{t.components.minutes:02d}:00" for t in times])
+    order_time[rng.random(rows) < 0.01] = "NaN"
+    df = pd.DataFrame({
+        "Order_ID": [f"ord{i:06d}" for i in range(rows)],
+        "Agent_Age": rng.integers(20, 40, rows),
+        "Agent_Rating": np.round(rng.uniform(2.5, 5.0, rows), 1),
+        "Store_Latitude": lat,
+        "Store_Longitude": lon,
+        "Drop_Latitude": lat + rng.normal(0, 0.05, rows),
+        "Drop_Longitude": lon + rng.normal(0, 0.05, rows),
+        "Order_Date": dates.strftime("%Y-%m-%d"),
+        "Order_Time": order_time,
+        "Pickup_Time": order_time,
+        "Weather": rng.choice(["Sunny", "Stormy", "Sandstorms", "Cloudy", "Fog", "Windy"], rows),
+        "Traffic": rng.choice(["Low ", "Medium ", "High ", "Jam "], rows),
+        "Vehicle": rng.choice(["motorcycle ", "scooter ", "van"], rows),
+        "Area": rng.choice(["Urban ", "Metropolitian ", "Semi-Urban ", "Other"], rows),
+        "Delivery_Time": rng.integers(10, 270, rows),
+        "Category": rng.choice(["Clothing", "Electronics", "Sports", "Books"], rows),
+    })
+    df.loc[rng.random(rows) < 0.005, "Weather"] = np.nan
+    df.to_csv(path, index=False)
+
+
+def legacy_prepare(csv_path: str) -> pd.DataFrame:
+    """Priprema kao u train.py pre deliveryml.training_data (za poređenje)."""
+    def haversine_km(lat1, lon1, lat2, lon2) -> float:
+        lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+        a = math.sin((lat2 - lat1) / 2.0) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2.0) ** 2
+        return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+    df = pd.read_csv(csv_path)
+    df.columns = [c.strip().replace(" ", "_").lower() for c in df.columns]
+    df["delivery_minutes"] = pd.to_numeric(df["delivery_time"], errors="coerce")
+    df = df.dropna(subset=["delivery_minutes", "weather", "traffic"])
+    df["distancekm"] = df.apply(lambda r: haversine_km(r["store_latitude"], r["store_longitude"],
+                                                       r["drop_latitude"], r["drop_longitude"]), axis=1)
+    ts = pd.to_datetime(df["order_date"].astype(str) + " " + df["order_time"].astype(str), errors="coerce", utc=True)
+    df["hour"] = ts.dt.hour
+    df["weekday"] = ts.dt.weekday
+    df = df.dropna(subset=["distancekm", "hour", "weekday"])
+    return df[list(FEATURE_COLUMNS) + ["delivery_minutes"]].reset_index(drop=True)
+
+
+def check_parity(csv_path: str):
+    old, new = legacy_prepare(csv_path), prepare_frame(csv_path)
+    if len(old) != len(new):
+        raise SystemExit(f"[parity] broj redova: stari {len(old)}, novi {len(new)}")
+    for col in ("area", "weather", "traffic"):
+        if not (old[col].astype(str).values == new[col].values).all():
+            raise SystemExit(f"[parity] kolona {col} se razlikuje")
+    for col in ("hour", "weekday", "delivery_minutes"):
+        if not np.array_equal(old[col].astype(float).values, new[col].astype(float).values):
+            raise SystemExit(f"[parity] kolona {col} se razlikuje")
+    diff = float(np.abs(old["distancekm"].values - new["distancekm"].values).max())
+    if diff > 1e-9:
+        raise SystemExit(f"[parity] distancekm max |Δ| = {diff:.3g}")
+    print(f"parity OK: {len(new)} redova, distancekm max |Δ| = {diff:.1e}")
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - t0, out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Training data prep: legacy vs vectorized vs Parquet cache")
+    ap.add_argument("--csv", help="CSV u Kaggle formatu (bez njega: sintetički)")
+    ap.add_argument("--rows", type=int, default=43000, help="broj redova sintetičkog CSV-a")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-prep-")
+    try:
+        csv_path = args.csv
+        if not csv_path:
+            csv_path = os.path.join(tmp, "deliveries.csv")
+            synthetic_csv(csv_path, args.rows, args.seed)
+        check_parity(csv_path)
+
+        cache_dir = os.path.join(tmp, "cache")
+        legacy, _ = timed(lambda: legacy_prepare(csv_path))
+        fresh, _ = timed(lambda: prepare_frame(csv_path))
+        miss, (_, info_miss) = timed(lambda: load_frame(csv_path, cache_dir))
+        hit, (frame, info_hit) = timed(lambda: load_frame(csv_path, cache_dir))
+        if not frame.equals(prepare_frame(csv_path)):
+            raise SystemExit("[parity] frame iz keša se razlikuje od pripremljenog")
+        print(f"timing ({os.path.getsize(csv_path) / 1e6:.1f} MB CSV)")
+        print(f"  legacy train.py (apply)       {legacy * 1e3:9.1f} ms")
+        print(f"  prepare_frame                 {fresh * 1e3:9.1f} ms  {legacy / fresh:6.1f}x")
+        print(f"  load_frame, cache {info_miss['cache']:<4}        {miss * 1e3:9.1f} ms")
+        print(f"  load_frame, cache {info_hit['cache']:<4}        {hit * 1e3:9.1f} ms  {legacy / hit:6.1f}x"
+              f"  (hash {info_hit['hash_seconds'] * 1e3:.1f} ms)")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
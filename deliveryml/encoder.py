@@ -0,0 +1,94 @@
+"""
+Kompajlirani ulaz modela: zahtev -> NumPy red bez DataFrame-a i bez
+ColumnTransformer-a. Tabele se prave jednom iz istreniranog Pipeline-a
+(StandardScaler: mean_/scale_, OneHotEncoder: kategorija -> indeks kolone),
+a rezultat je isti niz koji bi `pre.transform` dao za isti zahtev.
+"""
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, StandardScaler
+
+from deliveryml.features import feature_value, time_values
+
+
+class CompiledEncoder:
+    """
+    Zamena za `pipe[:-1].transform(features_frame(rows))` kod Pipeline-a
+    (ColumnTransformer -> estimator). Pravi se sa `from_pipeline`, koji vraća
+    None kada korak nije podržan (tada se koristi obična sklearn putanja);
+    `estimator` zamenjuje poslednji korak (npr. deliveryml.forest.FlatForest).
+    """
+
+    def __init__(
+        self,
+        width: int,
+        numeric: List[Tuple[str, int, float, float]],
+        categorical: List[Tuple[str, Dict[Any, int]]],
+        estimator: Any,
+    ):
+        self.width = width
+        # (kolona, indeks izlaza, mean, scale)
+        self._numeric = numeric
+        # (kolona, kategorija -> indeks izlaza); nepoznata kategorija -> sve nule
+        self._categorical = categorical
+        self._needs_time = any(col in ("hour", "weekday") for col, *_ in numeric + categorical)
+        self.estimator = estimator
+
+    @classmethod
+    def from_pipeline(cls, model: Any, estimator: Any = None) -> Optional["CompiledEncoder"]:
+        if not isinstance(model, Pipeline) or len(model.steps) != 2:
+            return None
+        pre = model.steps[0][1]
+        if not isinstance(pre, ColumnTransformer) or not hasattr(pre, "output_indices_"):
+            return None
+
+        numeric: List[Tuple[str, int, float, float]] = []
+        categorical: List[Tuple[str, Dict[Any, int]]] = []
+        width = 0
+        for name, trans, cols in pre.transformers_:
+            out = pre.output_indices_[name]
+            width = max(width, out.stop)
+            if trans == "drop" or out.stop == out.start:
+                continue
+            cols = [str(c).lower() for c in cols]
+            # remainder="passthrough" je posle fit-a FunctionTransformer bez funkcije
+            if trans == "passthrough" or (isinstance(trans, FunctionTransformer) and trans.func is None):
+                numeric += [(c, out.start + i, 0.0, 1.0) for i, c in enumerate(cols)]
+            elif isinstance(trans, StandardScaler):
+                # mean_ postoji i sa with_mean=False, ali se tada ne oduzima
+                mean = trans.mean_ if trans.with_mean and trans.mean_ is not None else np.zeros(len(cols))
+                scale = trans.scale_ if trans.with_std and trans.scale_ is not None else np.ones(len(cols))
+                numeric += [(c, out.start + i, float(mean[i]), float(scale[i])) for i, c in enumerate(cols)]
+            elif (isinstance(trans, OneHotEncoder) and trans.drop_idx_ is None
+                  and trans.handle_unknown in ("ignore", "infrequent_if_exist")
+                  and getattr(trans, "infrequent_categories_", None) is None):
+                offset = out.start
+                for c, cats in zip(cols, trans.categories_):
+                    categorical.append((c, {cat: offset + j for j, cat in enumerate(cats.tolist())}))
+                    offset += len(cats)
+            else:
+                return None
+        return cls(width, numeric, categorical, estimator if estimator is not None else model.steps[-1][1])
+
+    def _fill(self, out: np.ndarray, row: Mapping[str, Any]):
+        hour, weekday = time_values(row) if self._needs_time else (None, None)
+        for col, idx, mean, scale in self._numeric:
+            v = hour if col == "hour" else weekday if col == "weekday" else feature_value(row, col)
+            out[idx] = (float(v) - mean) / scale
+        for col, table in self._categorical:
+            v = hour if col == "hour" else weekday if col == "weekday" else feature_value(row, col)
+            idx = table.get(v)
+            if idx is not None:
+                out[idx] = 1.0
+
+    def transform(self, rows: Sequence[Mapping[str, Any]]) -> np.ndarray:
+        X = np.zeros((len(rows), self.width), dtype=np.float64)
+        for i, row in enumerate(rows):
+            self._fill(X[i], row)
+        return X
+
+    def predict_proba(self, rows: Sequence[Mapping[str, Any]]) -> np.ndarray:
+        return self.estimator.predict_proba(self.transform(rows))
@@ -0,0 +1,122 @@
+"""
+Zajednička logika feature-a za MLaaS i Analytics: jedina definicija kolona
+modela, brzo parsiranje ISO-8601 vremena i pravljenje ulaza za model iz
+batch-a događaja u jednom prolazu (kolonski, bez DataFrame-a po redu).
+"""
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from dateutil import parser as date_parser
+
+# redosled kolona na treningu (train.py) i na ulazu modela
+CATEGORICAL_COLUMNS: Tuple[str, ...] = ("area", "weather", "traffic")
+NUMERIC_COLUMNS: Tuple[str, ...] = ("distancekm", "hour", "weekday")
+FEATURE_COLUMNS: Tuple[str, ...] = CATEGORICAL_COLUMNS + NUMERIC_COLUMNS
+
+# ključevi u zahtevu/događaju za kolonu modela; prvi prisutan ključ pobeđuje
+_SOURCE_KEYS: Dict[str, Tuple[str, ...]] = {
+    "area": ("area", "city"),
+    "city": ("city", "area"),
+    "distancekm": ("distanceKm", "distancekm", "distance_km"),
+}
+# vrednost kada ključa nema (ostale kolone: 0)
+_DEFAULTS: Dict[str, Any] = {"hour": 12, "weekday": 3}
+_MISSING = object()
+
+
+def artifact_version(path: str) -> str:
+    """Verzija artefakta iz mtime/veličine fajla (ista vrednost u svim procesima)."""
+    st = os.stat(path)
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+def parse_iso(ts: Optional[str]) -> Optional[datetime]:
+    """
+    Vreme događaja. Brzi put je datetime.fromisoformat (ISO-8601, i sa 'Z'),
+    a ostali formati idu preko dateutil. Bez zone se tumači kao UTC;
+    neispravno vreme -> None.
+    """
+    if not ts:
+        return None
+    try:
+        dt = datetime.fromisoformat(ts)
+    except (TypeError, ValueError):
+        try:
+            dt = date_parser.parse(ts)
+        except (TypeError, ValueError, OverflowError):
+            return None
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+
+def hour_weekday(ts: Optional[str]) -> Tuple[int, int]:
+    dt = parse_iso(ts)
+    return (dt.hour, dt.weekday()) if dt is not None else (_DEFAULTS["hour"], _DEFAULTS["weekday"])
+
+
+def feature_value(row: Mapping[str, Any], col: str) -> Any:
+    """Vrednost kolone modela `col` (lower-case) iz zahteva/događaja, ili podrazumevana."""
+    for k in _SOURCE_KEYS.get(col, (col,)):
+        v = row.get(k, _MISSING)
+        if v is not _MISSING:
+            return v
+    return _DEFAULTS.get(col, 0)
+
+
+def _column(rows: Sequence[Mapping[str, Any]], col: str) -> List[Any]:
+    return [feature_value(r, col) for r in rows]
+
+
+def time_values(row: Mapping[str, Any]) -> Tuple[Any, Any]:
+    """(hour, weekday) iz zahteva, a kada ih nema, iz 'timestamp' (jedno parsiranje)."""
+    h = row.get("hour")
+    w = row.get("weekday")
+    if h is None or w is None:
+        th, tw = hour_weekday(row.get("timestamp"))
+        h = th if h is None else h
+        w = tw if w is None else w
+    return h, w
+
+
+def _time_columns(rows: Sequence[Mapping[str, Any]]) -> Tuple[List[Any], List[Any]]:
+    hours, weekdays = [], []
+    for r in rows:
+        h, w = time_values(r)
+        hours.append(h)
+        weekdays.append(w)
+    return hours, weekdays
+
+
+def features_frame(rows: Sequence[Mapping[str, Any]], expected_order: Sequence[str] = FEATURE_COLUMNS) -> pd.DataFrame:
+    """
+    Ulaz modela za ceo batch: jedna kolona po feature-u, redosledom
+    `expected_order` (feature_names_in artefakta). Kolone se pune kolonski,
+    numeričke kao float64 nizovi. Nepoznate kolone dobijaju podrazumevanu
+    vrednost (0, hour=12, weekday=3).
+    """
+    lower = [c.lower() for c in expected_order]
+    time_cols = _time_columns(rows) if ("hour" in lower or "weekday" in lower) else ([], [])
+
+    data = {}
+    for col in lower:
+        if col == "hour":
+            values = time_cols[0]
+        elif col == "weekday":
+            values = time_cols[1]
+        else:
+            values = _column(rows, col)
+        if col in NUMERIC_COLUMNS:
+            data[col] = np.array(values, dtype=np.float64)
+        else:
+            data[col] = np.array(values, dtype=object)
+    return pd.DataFrame(data, columns=lower)
+
+
+def ensure_df_with_features(payload: Dict[str, Any], expected_order: List[str]) -> pd.DataFrame:
+    """
+    Iz zahteva pravi DataFrame sa kolonama tačno onim redosledom koje je model
+    imao na treningu (jedan red; isto kao features_frame).
+    """
+    return features_frame([payload], expected_order)
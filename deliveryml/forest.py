@@ -0,0 +1,151 @@
+"""
+Šuma stabala odlučivanja kao ravni NumPy nizovi (feature, prag, deca,
+verovatnoće u listovima) umesto sklearn poziva po stablu.
+
+RandomForestClassifier.predict_proba za svaki poziv pokreće joblib posao preko
+svih stabala (200 u train.py), što za jedan red traje milisekundama. Ovde se
+svi redovi i sva stabla spuštaju zajedno, jedan nivo po iteraciji, pa je broj
+NumPy operacija srazmeran dubini stabla, a ne broju stabala.
+"""
+import os
+from typing import Any, Optional
+
+import numpy as np
+from joblib import dump, load
+
+# nizovi koje save/load čuvaju kao .npy (load ih može memorijski mapirati)
+_ARRAYS = ("feature", "threshold", "left", "right", "missing_left", "proba", "roots", "is_leaf")
+
+
+class FlatForest:
+    """
+    Ravna kopija istrenirane šume klasifikatora (RandomForest/ExtraTrees).
+    Čvorovi svih stabala su u istim nizovima; list pokazuje sam na sebe.
+
+    Prednost je za male ulaze; batch veći od `max_rows` ide u originalnu
+    sklearn šumu (Cython obilazak je tada brži). max_rows=0 = uvek ravna šuma.
+    """
+
+    def __init__(self, feature, threshold, left, right, missing_left, proba, roots, max_depth: int, classes,
+                 forest: Any = None, max_rows: int = 0, is_leaf=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        # verovatnoće klasa po čvoru (normalizovane kao DecisionTreeClassifier.predict_proba)
+        self.proba = proba
+        self.roots = roots
+        self.is_leaf = is_leaf if is_leaf is not None else left == np.arange(left.shape[0])
+        self.max_depth = max_depth
+        self.classes_ = classes
+        self._forest = forest
+        self._max_rows = max_rows if forest is not None else 0
+
+    @classmethod
+    def from_estimator(cls, forest: Any, max_rows: int = 0) -> Optional["FlatForest"]:
+        trees = getattr(forest, "estimators_", None)
+        if not trees or getattr(forest, "n_outputs_", 1) != 1 or not hasattr(forest, "predict_proba"):
+            return None
+        n_classes = int(forest.n_classes_)
+
+        feature, threshold, left, right, missing_left, proba, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for est in trees:
+            t = est.tree_
+            n = t.node_count
+            own = np.arange(offset, offset + n, dtype=np.int64)
+            is_leaf = t.children_left == -1
+            feature.append(np.where(is_leaf, 0, t.feature).astype(np.intp))
+            threshold.append(np.where(is_leaf, np.inf, t.threshold))
+            left.append(np.where(is_leaf, own, t.children_left + offset))
+            right.append(np.where(is_leaf, own, t.children_right + offset))
+            mgl = getattr(t, "missing_go_to_left", None)
+            missing_left.append(np.asarray(mgl, dtype=bool) if mgl is not None else np.zeros(n, dtype=bool))
+            p = t.value[:, 0, :n_classes].astype(np.float64)
+            norm = p.sum(axis=1, keepdims=True)
+            norm[norm == 0.0] = 1.0
+            proba.append(p / norm)
+            roots.append(offset)
+            max_depth = max(max_depth, int(t.max_depth))
+            offset += n
+
+        return cls(
+            feature=np.concatenate(feature),
+            threshold=np.concatenate(threshold),
+            left=np.concatenate(left),
+            right=np.concatenate(right),
+            missing_left=np.concatenate(missing_left),
+            proba=np.ascontiguousarray(np.concatenate(proba)),
+            roots=np.asarray(roots, dtype=np.int64),
+            max_depth=max_depth,
+            classes=forest.classes_,
+            forest=forest,
+            max_rows=max_rows,
+        )
+
+    def save(self, directory: str):
+        """Nizovi kao .npy u `directory` (bez sklearn šume), za load sa mmap_mode."""
+        os.makedirs(directory, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+        dump({"max_depth": self.max_depth, "classes": self.classes_}, os.path.join(directory, "forest_meta.pkl"))
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = "r") -> "FlatForest":
+        """
+        Učitava save() izlaz. Sa mmap_mode="r" nizovi su read-only mapirani iz
+        fajlova, pa više procesa deli iste stranice kroz page cache OS-a.
+        Bez sklearn šume nema ni prelaska na nju za velike batch-eve.
+        """
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode) for name in _ARRAYS}
+        meta = load(os.path.join(directory, "forest_meta.pkl"))
+        return cls(max_depth=meta["max_depth"], classes=meta["classes"], **arrays)
+
+    def prefault(self) -> int:
+        """Čita po jedan element sa svake stranice nizova (mmap), da prvi zahtevi ne čekaju disk; vraća bajtove."""
+        total = 0
+        for name in _ARRAYS:
+            arr = getattr(self, name).reshape(-1)
+            step = max(1, 4096 // arr.itemsize)
+            arr[::step].sum()
+            total += arr.nbytes
+        return total
+
+    @property
+    def n_nodes(self) -> int:
+        return int(self.feature.shape[0])
+
+    def leaves(self, X) -> np.ndarray:
+        """Indeks lista (globalni) za svaki red i stablo, oblik (n_redova, n_stabala)."""
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+        # kao sklearn: ulaz se poredi u float32, prag je float64
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        has_nan = bool(np.isnan(X).any())
+        n_rows, n_trees = X.shape[0], self.roots.shape[0]
+        flat_x = X.ravel()
+        # ravno: (red, stablo) -> trenutni čvor; u svakoj iteraciji samo parovi koji još nisu u listu
+        node = np.tile(self.roots, n_rows)
+        base = np.repeat(np.arange(n_rows) * X.shape[1], n_trees)
+        active = np.arange(node.shape[0])
+        for _ in range(self.max_depth):
+            cur = node.take(active)
+            x = flat_x.take(base.take(active) + self.feature.take(cur))
+            go_left = x <= self.threshold.take(cur)
+            if has_nan:
+                go_left |= np.isnan(x) & self.missing_left.take(cur)
+            nxt = np.where(go_left, self.left.take(cur), self.right.take(cur))
+            node[active] = nxt
+            active = active[~self.is_leaf.take(nxt)]
+            if not active.shape[0]:
+                break
+        return node.reshape(n_rows, n_trees)
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Prosek verovatnoća listova po stablima (isto kao ForestClassifier.predict_proba)."""
+        if self._max_rows and X.shape[0] > self._max_rows:
+            return self._forest.predict_proba(X)
+        leaves = self.leaves(X)
+        return self.proba[leaves].sum(axis=1) / leaves.shape[1]
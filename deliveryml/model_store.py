@@ -0,0 +1,116 @@
+"""
+Format modela za serviranje iz više procesa (uvicorn --workers N).
+
+joblib.load(model.pkl) u svakom procesu pravi sopstvenu kopiju šume: sklearn
+Tree pri unpickle-u kopira čvorove u svoju memoriju (i sa mmap_mode), pa N
+radnika drži N kopija. Ovde se šuma čuva kao ravni nizovi (deliveryml.forest)
+u .npy fajlovima koje svaki proces mapira read-only, pa stranice deli page
+cache OS-a, a učitavanje ne zavisi od veličine šume:
+
+  <model>.mmap/head.pkl          bundle bez šume: Pipeline(pre, passthrough) + meta
+  <model>.mmap/forest/*.npy      FlatForest nizovi
+  <model>.mmap/store.json        verzija formata i artifact_version izvornog model.pkl
+
+Direktorijum se pravi jednom (export) iz model.pkl i zamenjuje se samo ako
+se izvorni fajl promeni. Export drži fcntl zaključavanje (<model>.mmap.lock),
+pa ga od više procesa radi samo prvi, a piše se u privremeni direktorijum i
+postavlja sa os.rename (prekinut export ne ostavlja polovičan direktorijum).
+"""
+import fcntl
+import json
+import os
+import shutil
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from joblib import dump, load
+
+from deliveryml.features import artifact_version
+from deliveryml.forest import FlatForest
+
+STORE_VERSION = 1
+
+
+def store_dir(pkl_path: str) -> str:
+    return os.path.splitext(pkl_path)[0] + ".mmap"
+
+
+def _store_info(directory: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(directory, "store.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def is_current(pkl_path: str, directory: Optional[str] = None) -> bool:
+    info = _store_info(directory or store_dir(pkl_path))
+    return (info is not None and info.get("store_version") == STORE_VERSION
+            and info.get("artifact_version") == artifact_version(pkl_path))
+
+
+def split_bundle(bundle: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], FlatForest]]:
+    """(bundle bez šume, ravna šuma) ili None ako model nije Pipeline(pre, šuma)."""
+    from sklearn.pipeline import Pipeline
+
+    model = bundle.get("model")
+    if not isinstance(model, Pipeline) or len(model.steps) != 2:
+        return None
+    forest = FlatForest.from_estimator(model.steps[-1][1])
+    if forest is None:
+        return None
+    head = dict(bundle, model=Pipeline([model.steps[0], ("clf", "passthrough")]), storage="mmap")
+    return head, forest
+
+
+def export(pkl_path: str, bundle: Optional[Dict[str, Any]] = None, directory: Optional[str] = None) -> Optional[str]:
+    """
+    Pravi <model>.mmap pored model.pkl (ako već ne postoji za isti artefakt) i
+    vraća putanju; None ako model nema šumu koja može u ravne nizove.
+    """
+    directory = directory or store_dir(pkl_path)
+    if is_current(pkl_path, directory):
+        return directory
+    with open(f"{directory}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if is_current(pkl_path, directory):
+                return directory
+            return _export(pkl_path, bundle, directory)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _export(pkl_path: str, bundle: Optional[Dict[str, Any]], directory: str) -> Optional[str]:
+    source_version = artifact_version(pkl_path)
+    parts = split_bundle(bundle if bundle is not None else load(pkl_path))
+    if parts is None:
+        return None
+    head, forest = parts
+
+    tmp = f"{directory}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        os.makedirs(tmp)
+        dump(head, os.path.join(tmp, "head.pkl"))
+        forest.save(os.path.join(tmp, "forest"))
+        with open(os.path.join(tmp, "store.json"), "w", encoding="utf-8") as f:
+            json.dump({"store_version": STORE_VERSION, "artifact_version": source_version,
+                       "nodes": forest.n_nodes}, f)
+        if os.path.isdir(directory):
+            # zastareo export (model.pkl je zamenjen); procesi koji ga već mapiraju zadržavaju inode-e
+            stale = f"{directory}.{uuid.uuid4().hex[:8]}.old"
+            try:
+                os.rename(directory, stale)
+                shutil.rmtree(stale, ignore_errors=True)
+            except FileNotFoundError:
+                pass
+        os.rename(tmp, directory)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return directory
+
+
+def load_store(directory: str, mmap_mode: Optional[str] = "r") -> Tuple[Dict[str, Any], FlatForest]:
+    """(bundle bez šume, FlatForest sa read-only mapiranim nizovima)."""
+    head = load(os.path.join(directory, "head.pkl"))
+    return head, FlatForest.load(os.path.join(directory, "forest"), mmap_mode=mmap_mode)
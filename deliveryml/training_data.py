@@ -0,0 +1,315 @@
+"""
+Priprema podataka za trening (train.py i MLaaS /train): iz CSV-a se čitaju
+samo potrebne kolone sa zadatim tipovima, feature-i se računaju vektorski
+(haversine, vreme) i rezultat se kešira kao Parquet po hash-u izvornog fajla,
+pa ponovljeni trening nad istim CSV-om preskače parsiranje.
+
+Za inkrementalni trening isti frame se pravi i iz tabele `deliveries`
+(DataManager), u delovima posle zadatog watermark-a. Watermark je po
+(updated_at, id): updated_at postavlja baza pri svakom upisu i izmeni reda,
+pa se vide i redovi upisani kasnije sa starijim delivery_timestamp-om (on je
+samo feature).
+"""
+import hashlib
+import os
+import time
+import uuid
+import warnings
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from deliveryml.features import CATEGORICAL_COLUMNS, FEATURE_COLUMNS, NUMERIC_COLUMNS
+
+# menja se kada se promeni priprema, da stari keš ne bude korišćen
+PREP_VERSION = 1
+
+# uloga -> moguća imena kolone u CSV-u (poređenje bez razmaka/underscore-a, lower-case)
+_CANDIDATES: Dict[str, Tuple[str, ...]] = {
+    "area": ("area", "city", "region"),
+    "weather": ("weather",),
+    "traffic": ("traffic",),
+    "delivery_minutes": ("time_taken_min", "delivery_time", "time_min", "duration_min", "timetakenmin"),
+    "distance": ("distancekm", "distance_km", "distance"),
+    "store_lat": ("store_latitude", "store_lat", "pickup_latitude"),
+    "store_lon": ("store_longitude", "store_lon", "pickup_longitude"),
+    "drop_lat": ("drop_latitude", "drop_lat", "dest_latitude", "delivery_latitude"),
+    "drop_lon": ("drop_longitude", "drop_lon", "dest_longitude", "delivery_longitude"),
+    "timestamp": ("timestamp", "delivery_timestamp", "delivered_at"),
+    "date": ("order_date", "pickup_date", "date"),
+    "time": ("order_time", "pickup_time", "time"),
+}
+_REQUIRED = ("weather", "traffic", "delivery_minutes")
+_NUMERIC_ROLES = ("delivery_minutes", "distance", "store_lat", "store_lon", "drop_lat", "drop_lon")
+
+_HASH_CHUNK = 1 << 20
+
+
+def _norm(name: str) -> str:
+    return name.strip().lower().replace("_", "").replace(" ", "")
+
+
+def resolve_columns(header: Sequence[str]) -> Dict[str, str]:
+    """Uloga -> ime kolone u CSV-u, samo za uloge koje postoje; KeyError ako nedostaje obavezna."""
+    by_norm: Dict[str, str] = {}
+    for col in header:
+        by_norm.setdefault(_norm(col), col)
+    roles: Dict[str, str] = {}
+    for role, cands in _CANDIDATES.items():
+        for cand in cands:
+            if _norm(cand) in by_norm:
+                roles[role] = by_norm[_norm(cand)]
+                break
+    missing = [r for r in _REQUIRED if r not in roles]
+    if missing:
+        raise KeyError(f"Nedostaju ključne kolone: {', '.join(missing)}. Dostupne kolone: {sorted(header)}")
+    return roles
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Haversine rastojanje u km nad celim nizovima."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2.0) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    return 6371.0 * 2.0 * np.arcsin(np.sqrt(a))
+
+
+def _timestamps(raw: pd.DataFrame, roles: Dict[str, str]) -> pd.DatetimeIndex:
+    """Vreme porudžbine: timestamp kolona, datum + vreme, samo datum (podne) ili sintetički niz (1h korak)."""
+    candidates = []
+    if "timestamp" in roles:
+        candidates.append(raw[roles["timestamp"]])
+    if "date" in roles and "time" in roles:
+        candidates.append(raw[roles["date"]] + " " + raw[roles["time"]])
+    elif "date" in roles:
+        candidates.append(raw[roles["date"]] + " 12:00:00")
+    for values in candidates:
+        # ISO-8601 je brz put; ostali formati (npr. 19-03-2022) preko pandas prepoznavanja
+        for fmt in ("ISO8601", None):
+            with warnings.catch_warnings():
+                warnings.filterwarnings("ignore", message="Could not infer format")
+                ts = pd.DatetimeIndex(pd.to_datetime(values, format=fmt, errors="coerce", utc=True))
+            if ts.notna().any():
+                return ts
+    return pd.date_range("2025-01-01", periods=len(raw), freq="h", tz="UTC")
+
+
+def prepare_frame(csv_path: str) -> pd.DataFrame:
+    """
+    Čita CSV (samo potrebne kolone) i vraća kolone FEATURE_COLUMNS +
+    `delivery_minutes`, bez redova kojima nedostaje neka od njih.
+    """
+    roles = resolve_columns(list(pd.read_csv(csv_path, nrows=0).columns))
+    dtypes = {col: (np.float64 if role in _NUMERIC_ROLES else str) for role, col in roles.items()}
+    raw = pd.read_csv(csv_path, usecols=sorted(set(roles.values())), dtype=dtypes)
+
+    if "distance" in roles:
+        distance = raw[roles["distance"]]
+    elif all(r in roles for r in ("store_lat", "store_lon", "drop_lat", "drop_lon")):
+        distance = haversine_km(raw[roles["store_lat"]], raw[roles["store_lon"]],
+                                raw[roles["drop_lat"]], raw[roles["drop_lon"]])
+    else:
+        distance = np.nan
+    # kategorije ostaju kako su u CSV-u (i sa razmacima), jer tako stižu i u događajima
+    return build_frame(
+        area=raw[roles["area"]] if "area" in roles else "Unknown",
+        weather=raw[roles["weather"]],
+        traffic=raw[roles["traffic"]],
+        distance=distance,
+        ts=_timestamps(raw, roles),
+        minutes=raw[roles["delivery_minutes"]],
+        index=raw.index,
+    )
+
+
+def build_frame(area, weather, traffic, distance, ts: pd.DatetimeIndex, minutes, index) -> pd.DataFrame:
+    """Kolone FEATURE_COLUMNS + `delivery_minutes`, bez redova kojima nešto nedostaje."""
+    out = pd.DataFrame(index=index)
+    out["area"] = area
+    out["weather"] = weather
+    out["traffic"] = traffic
+    out["distancekm"] = distance
+    out["hour"] = np.asarray(ts.hour, dtype=np.float64)
+    out["weekday"] = np.asarray(ts.weekday, dtype=np.float64)
+    out["delivery_minutes"] = minutes
+
+    out = out.dropna(subset=list(FEATURE_COLUMNS) + ["delivery_minutes"])
+    out["hour"] = out["hour"].astype(np.int64)
+    out["weekday"] = out["weekday"].astype(np.int64)
+    return out.reset_index(drop=True)
+
+
+def _parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def load_frame(csv_path: str, cache_dir: Optional[str] = None) -> Tuple[pd.DataFrame, Dict[str, object]]:
+    """
+    prepare_frame sa Parquet kešom u `cache_dir` (None = bez keša). Ključ je
+    sha256 sadržaja CSV-a i PREP_VERSION. Vraća (frame, info o kešu).
+    """
+    info: Dict[str, object] = {"cache": "off"}
+    if cache_dir and not _parquet_available():
+        print("[deliveryml] pyarrow not installed, training feature cache disabled")
+        cache_dir = None
+    if not cache_dir:
+        t0 = time.perf_counter()
+        frame = prepare_frame(csv_path)
+        info["prep_seconds"] = round(time.perf_counter() - t0, 3)
+        return frame, info
+
+    t0 = time.perf_counter()
+    key = f"{file_hash(csv_path)[:32]}-v{PREP_VERSION}"
+    path = os.path.join(cache_dir, f"{key}.parquet")
+    info.update({"key": key, "path": path, "hash_seconds": round(time.perf_counter() - t0, 3)})
+
+    t0 = time.perf_counter()
+    try:
+        frame = pd.read_parquet(path)
+        info.update({"cache": "hit", "prep_seconds": round(time.perf_counter() - t0, 3)})
+        return frame, info
+    except FileNotFoundError:
+        pass
+    except Exception as ex:
+        print(f"[deliveryml] unreadable feature cache {path}, rebuilding: {ex}")
+
+    frame = prepare_frame(csv_path)
+    info.update({"cache": "miss", "prep_seconds": round(time.perf_counter() - t0, 3)})
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        frame.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+    except OSError as ex:
+        print(f"[deliveryml] could not write feature cache {path}: {ex}")
+    return frame, info
+
+
+def training_xy(frame: pd.DataFrame, sla_threshold_min: float) -> Tuple[pd.DataFrame, pd.Series]:
+    """Ulaz modela (kolone FEATURE_COLUMNS) i oznaka late = trajanje > SLA."""
+    X = frame[list(CATEGORICAL_COLUMNS) + list(NUMERIC_COLUMNS)]
+    y = (frame["delivery_minutes"] > sla_threshold_min).astype(int).rename("late")
+    return X, y
+
+
+# --- tabela deliveries (DataManager) ---
+
+def deliveries_table():
+    import sqlalchemy as sa
+
+    # samo kolone potrebne za trening (model je u datamanager/app/db/models.py)
+    return sa.Table(
+        "deliveries", sa.MetaData(),
+        sa.Column("id", sa.String, primary_key=True),
+        sa.Column("city", sa.String),
+        sa.Column("weather", sa.String),
+        sa.Column("traffic", sa.String),
+        sa.Column("distance_km", sa.Float),
+        sa.Column("time_taken_min", sa.Float),
+        sa.Column("delivery_timestamp", sa.DateTime(timezone=True)),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+
+
+def change_horizon(engine, settle_sec: float) -> Optional[datetime]:
+    """
+    Gornja granica updated_at za jedan inkrementalni trening: vreme baze minus
+    `settle_sec`. now() u transakciji je vreme njenog početka, pa red iz duge
+    transakcije može biti vidljiv tek posle redova sa većim updated_at; redovi
+    mlađi od granice ostaju za sledeći trening. None (settle_sec <= 0) = bez granice.
+    """
+    import sqlalchemy as sa
+
+    if settle_sec <= 0:
+        return None
+    with engine.connect() as conn:
+        now = conn.execute(sa.select(sa.func.now())).scalar()
+    return now - timedelta(seconds=settle_sec)
+
+
+def _resume(watermark: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+    if watermark and "updated_at" not in watermark:
+        # watermark po delivery_timestamp-u (stariji artefakt) ne određuje poziciju po updated_at
+        print(f"[deliveryml] watermark without updated_at ({watermark}), reading the whole table")
+        return None
+    return watermark
+
+
+def _after(table, watermark: Optional[Dict[str, str]], until: Optional[datetime] = None):
+    """Uslov "posle watermark-a, do granice" po (updated_at, id), isti redosled kao ORDER BY."""
+    import sqlalchemy as sa
+
+    col = table.c.updated_at
+    cond = sa.true() if until is None else col <= until
+    if not watermark:
+        return cond
+    ts = datetime.fromisoformat(watermark["updated_at"])
+    return sa.and_(cond, sa.or_(col > ts, sa.and_(col == ts, table.c.id > watermark["id"])))
+
+
+def count_deliveries(engine, watermark: Optional[Dict[str, str]] = None, until: Optional[datetime] = None) -> int:
+    import sqlalchemy as sa
+
+    table = deliveries_table()
+    with engine.connect() as conn:
+        return int(conn.execute(
+            sa.select(sa.func.count()).select_from(table)
+            .where(table.c.delivery_timestamp.is_not(None)).where(_after(table, _resume(watermark), until))
+        ).scalar())
+
+
+def read_deliveries(engine, watermark: Optional[Dict[str, str]] = None, chunk_rows: int = 5000,
+                    until: Optional[datetime] = None) -> Iterator[Tuple[pd.DataFrame, Dict[str, str]]]:
+    """
+    Redovi tabele deliveries posle `watermark`-a (i najviše do `until`, vidi
+    change_horizon), u delovima od `chunk_rows` (keyset paginacija po
+    (updated_at, id), bez OFFSET-a). Za svaki deo vraća (frame kao
+    prepare_frame, watermark poslednjeg pročitanog reda).
+    """
+    import sqlalchemy as sa
+
+    table = deliveries_table()
+    cols = [table.c.id, table.c.city, table.c.weather, table.c.traffic,
+            table.c.distance_km, table.c.time_taken_min, table.c.delivery_timestamp, table.c.updated_at]
+    watermark = _resume(watermark)
+    while True:
+        query = (
+            sa.select(*cols)
+            .where(table.c.delivery_timestamp.is_not(None)).where(_after(table, watermark, until))
+            .order_by(table.c.updated_at, table.c.id)
+            .limit(chunk_rows)
+        )
+        with engine.connect() as conn:
+            rows = conn.execute(query).all()
+        if not rows:
+            return
+        raw = pd.DataFrame(rows, columns=[c.name for c in cols])
+        last_ts = rows[-1].updated_at
+        if last_ts.tzinfo is None:
+            last_ts = last_ts.replace(tzinfo=timezone.utc)
+        watermark = {"updated_at": last_ts.isoformat(), "id": rows[-1].id}
+        frame = build_frame(
+            area=raw["city"],
+            weather=raw["weather"],
+            traffic=raw["traffic"],
+            distance=pd.to_numeric(raw["distance_km"], errors="coerce"),
+            ts=pd.DatetimeIndex(pd.to_datetime(raw["delivery_timestamp"], utc=True)),
+            minutes=pd.to_numeric(raw["time_taken_min"], errors="coerce"),
+            index=raw.index,
+        )
+        yield frame, watermark
+        if len(rows) < chunk_rows:
+            return
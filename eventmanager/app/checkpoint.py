@@ -0,0 +1,181 @@
+"""
+Periodični checkpoint stanja EventManager-a (prozori + dedupe) u lokalni fajl.
+
+Format fajla:
+  zaglavlje: b"EMCK" | verzija formata (u8) | marshal.version (u8)
+  zapisi:    dužina (u32) | crc32 (u32) | zlib(marshal(zapis))
+
+Prvi zapis je pun snapshot, a svaki sledeći samo ključevi promenjeni od
+prethodnog (inkrementalno, append). Posle CHECKPOINT_COMPACT_EVERY delta
+zapisa fajl se atomski zamenjuje novim punim snapshot-om. Nepotpun zapis na
+kraju fajla (pad tokom upisa) se ignoriše.
+"""
+import marshal
+import os
+import struct
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+from eventmanager.app.config import settings
+from eventmanager.app.dedupe import ThresholdSuppressor
+from eventmanager.app.metrics import CHECKPOINT_BYTES, GAP_EVENTS, RECOVERY_SECONDS
+from eventmanager.app.windows import WindowEngine, parse_event_time
+
+_MAGIC = b"EMCK"
+_FORMAT_VERSION = 1
+_HEADER = _MAGIC + bytes([_FORMAT_VERSION, marshal.version])
+_RECORD = struct.Struct("<II")
+
+
+def _encode(record: Dict[str, Any]) -> bytes:
+    body = zlib.compress(marshal.dumps(record), 1)
+    return _RECORD.pack(len(body), zlib.crc32(body)) + body
+
+
+def _read_records(path: str):
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:len(_HEADER)] != _HEADER:
+        raise ValueError("nepoznat format ili verzija checkpoint fajla")
+    pos = len(_HEADER)
+    while pos + _RECORD.size <= len(data):
+        length, crc = _RECORD.unpack_from(data, pos)
+        body = data[pos + _RECORD.size:pos + _RECORD.size + length]
+        if len(body) < length or zlib.crc32(body) != crc:
+            break
+        yield marshal.loads(zlib.decompress(body))
+        pos += _RECORD.size + length
+
+
+class Checkpointer:
+    def __init__(
+        self,
+        windows: WindowEngine,
+        suppressor: Optional[ThresholdSuppressor],
+        path: Optional[str] = None,
+        interval_sec: Optional[float] = None,
+        compact_every: Optional[int] = None,
+    ):
+        self.windows = windows
+        self.suppressor = suppressor
+        self.path = (settings.CHECKPOINT_PATH if path is None else path).format(partition=settings.PARTITION_INDEX)
+        self.interval_sec = settings.CHECKPOINT_INTERVAL_SEC if interval_sec is None else interval_sec
+        self.compact_every = compact_every or settings.CHECKPOINT_COMPACT_EVERY
+
+        self._last = time.monotonic()
+        self._deltas = 0
+        self._need_full = True
+        # vreme poslednjeg checkpoint-a pre restarta i vreme pokretanja (wall clock)
+        self.restored_wall: Optional[float] = None
+        self.started_wall = time.time()
+        self.gap_events = 0
+        self._gap_reported = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    # --- restore ---
+    def restore(self):
+        if not self.enabled or not os.path.exists(self.path):
+            return
+        t0 = time.perf_counter()
+        now = time.monotonic()
+        records = 0
+        try:
+            # svi zapisi se pročitaju pre primene, pa loš zapis ne ostavlja delimično stanje
+            recs = list(_read_records(self.path))
+            if recs and recs[0]["kind"] != "full":
+                raise ValueError("prvi zapis nije pun snapshot")
+            for rec in recs:
+                full = rec["kind"] == "full"
+                self.windows.restore(rec["windows"], full, now)
+                if self.suppressor is not None:
+                    self.suppressor.restore(rec["dedupe"], full, now)
+                self.restored_wall = rec["wall"]
+                records += 1
+        except Exception as ex:
+            self.windows.clear()
+            if self.suppressor is not None:
+                self.suppressor.clear()
+            self.restored_wall = None
+            print(f"[EventManager][WARN] checkpoint {self.path} unusable, starting empty: {ex}")
+            return
+
+        elapsed = time.perf_counter() - t0
+        RECOVERY_SECONDS.set(elapsed)
+        if self.restored_wall is not None:
+            print(
+                f"[EventManager] restored checkpoint {self.path}: {records} records, "
+                f"{self.windows.key_count()} window keys, {len(self.suppressor or ())} dedupe keys "
+                f"in {elapsed * 1000:.1f} ms (checkpoint age {self.started_wall - self.restored_wall:.1f}s)"
+            )
+
+    def observe(self, event_timestamp: Optional[str]):
+        """
+        Broji događaje nastale između poslednjeg checkpoint-a i pokretanja
+        (stanje ih nije videlo). Pretpostavlja da je vreme događaja blizu
+        vremena objave, a da ih broker čuva tokom prekida (perzistentna sesija).
+        """
+        if self.restored_wall is None:
+            return
+        event_ts = parse_event_time(event_timestamp)
+        if event_ts is not None and self.restored_wall < event_ts <= self.started_wall:
+            self.gap_events += 1
+            GAP_EVENTS.inc()
+
+    # --- upis ---
+    def maybe_checkpoint(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        if self.enabled and now - self._last >= self.interval_sec:
+            self.checkpoint(now)
+
+    def checkpoint(self, now: Optional[float] = None):
+        if not self.enabled:
+            return
+        now = time.monotonic() if now is None else now
+        full = self._need_full or self._deltas >= self.compact_every
+        record = {
+            "kind": "full" if full else "delta",
+            "wall": time.time(),
+            "windows": self.windows.snapshot(full),
+            "dedupe": self.suppressor.snapshot(full, now) if self.suppressor is not None else {},
+        }
+        self._last = now
+        if not full and not record["windows"]["keys"] and not record["dedupe"]:
+            return
+
+        try:
+            if full:
+                self._write_full(_encode(record))
+                self._deltas = 0
+                self._need_full = False
+            else:
+                with open(self.path, "ab") as f:
+                    f.write(_encode(record))
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._deltas += 1
+            CHECKPOINT_BYTES.set(os.path.getsize(self.path))
+        except OSError as ex:
+            # izgubljena delta -> sledeći upis mora biti pun snapshot
+            self._need_full = True
+            print(f"[EventManager][WARN] checkpoint write failed: {ex}")
+
+        if self.restored_wall is not None and not self._gap_reported:
+            self._gap_reported = True
+            print(f"[EventManager] recovery: {self.gap_events} events arrived during the gap "
+                  f"since the last checkpoint")
+
+    def _write_full(self, record: bytes):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_HEADER)
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
@@ -1,5 +1,9 @@
+from typing import List, Literal
+
 from pydantic_settings import BaseSettings
 
+from eventmanager.app.models import WindowRule
+
 
 class Settings(BaseSettings):
     # MQTT konekcija
@@ -7,15 +11,78 @@ class Settings(BaseSettings):
     MQTT_PORT: int = 1883
     MQTT_QOS: int = 1
     MQTT_RETAIN: bool = False
+    MQTT_PROTOCOL: int = 5  # 5 = MQTT v5, 4 = v3.1.1
+    # ako je zadat, ulazna sesija je perzistentna (broker čuva poruke dok je servis dole)
+    MQTT_CLIENT_ID: str = ""  # podržava {partition}
+    MQTT_SESSION_EXPIRY_SEC: int = 3600
+    MQTT_RECONNECT_SEC: float = 2.0
 
     # Topici
     MQTT_IN_TOPIC: str = "iot/deliveries/raw"
     MQTT_OUT_TOPIC: str = "iot/deliveries/events"
 
+    # Skaliranje: shared pretplata + particije stanja
+    MQTT_SHARED_GROUP: str = ""  # npr. "eventmanager" -> $share/eventmanager/<MQTT_IN_TOPIC>
+    MQTT_PARTITION_TOPIC: str = "iot/deliveries/partitioned"
+    PARTITION_COUNT: int = 1
+    PARTITION_INDEX: int = 0
+
     # Pragovi
     THRESHOLD_TIME_TAKEN_MIN: float = 30.0
     THRESHOLD_DISTANCE_KM: float = 20.0
 
+    # Prozorska pravila (env: JSON lista WindowRule objekata)
+    WINDOW_RULES: List[WindowRule] = [
+        WindowRule(
+            name="city_avg_timeTakenMin_10m",
+            keyBy=["city"],
+            field="timeTakenMin",
+            agg="avg",
+            windowSec=600,
+            threshold=120,
+        ),
+        WindowRule(
+            name="courier_late_deliveries_1h",
+            keyBy=["deliveryPersonId"],
+            field="timeTakenMin",
+            agg="count",
+            windowSec=3600,
+            threshold=3,
+            minValue=140,
+        ),
+        WindowRule(
+            name="weather_traffic_max_distanceKm_15m",
+            keyBy=["weather", "traffic"],
+            field="distanceKm",
+            agg="max",
+            windowSec=900,
+            kind="tumbling",
+            threshold=25,
+        ),
+    ]
+    WINDOW_MAX_EVENTS_PER_KEY: int = 512
+    WINDOW_MAX_KEYS: int = 10000
+    WINDOW_IDLE_TTL_SEC: float = 3600.0
+    WINDOW_ALLOWED_LATENESS_SEC: float = 60.0
+    # vreme za prozore: "processing" (trenutak prijema) | "event" (deliveryTimestamp);
+    # sensor-generator šalje Order_Date (datum bez vremena, redovi nisu po vremenu),
+    # pa sa "event" skoro svi događaji padaju ispod watermark-a
+    WINDOW_TIME_DOMAIN: Literal["processing", "event"] = "processing"
+
+    # Potiskivanje duplikata (originalDeliveryId, pravilo)
+    DEDUPE_ENABLED: bool = True
+    DEDUPE_TTL_SEC: float = 3600.0
+    DEDUPE_MAX_KEYS: int = 100000
+    DEDUPE_HYSTERESIS_RATIO: float = 0.05
+
+    # Checkpoint stanja (prazna putanja = isključeno; {partition} -> PARTITION_INDEX)
+    CHECKPOINT_PATH: str = "state/eventmanager-{partition}.ckpt"
+    CHECKPOINT_INTERVAL_SEC: float = 10.0
+    CHECKPOINT_COMPACT_EVERY: int = 30
+
+    # Prometheus /metrics (0 = isključeno)
+    METRICS_PORT: int = 9100
+
     # Ostalo
     SERVICE_ID: str = "eventmanager-1"
 
@@ -0,0 +1,117 @@
+"""
+Potiskivanje duplikata threshold događaja po ključu (originalDeliveryId, pravilo);
+za sliding prozorska pravila ključ je (vrednost ključa prozora, pravilo).
+
+Ključ koji je jednom prijavljen ostaje "naoružan" dok vrednost ne padne ispod
+praga umanjenog za histerezis (traka oko praga); tek tada sledeći prelazak
+praga ponovo emituje događaj. Tabela je LRU sa TTL-om (računa se od
+poslednjeg viđenja ključa) i ograničenim brojem ključeva.
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from eventmanager.app.config import settings
+from eventmanager.app.metrics import DEDUPE_KEYS, EVENTS_SUPPRESSED
+
+
+class ThresholdSuppressor:
+    def __init__(
+        self,
+        ttl_sec: Optional[float] = None,
+        max_keys: Optional[int] = None,
+        hysteresis_ratio: Optional[float] = None,
+    ):
+        self.ttl_sec = settings.DEDUPE_TTL_SEC if ttl_sec is None else ttl_sec
+        self.max_keys = max_keys or settings.DEDUPE_MAX_KEYS
+        self.hysteresis_ratio = (
+            settings.DEDUPE_HYSTERESIS_RATIO if hysteresis_ratio is None else hysteresis_ratio
+        )
+        # (ključ, pravilo) -> vreme isteka
+        self._entries: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        # ključevi promenjeni od poslednjeg checkpoint-a
+        self._dirty: Set[Tuple[str, str]] = set()
+        self.suppressed = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def admit(self, key: str, rule: str, actual: float, threshold: float, now: Optional[float] = None) -> bool:
+        """
+        Poziva se za svaku evaluaciju pravila (i kada prag nije prekoračen).
+        Vraća True samo kada događaj treba objaviti.
+        """
+        now = time.monotonic() if now is None else now
+        key = (key, rule)
+        entries = self._entries
+        self._expire(now)
+
+        if actual > threshold:
+            self._dirty.add(key)
+            if key in entries:
+                entries[key] = now + self.ttl_sec
+                entries.move_to_end(key)
+                self.suppressed += 1
+                EVENTS_SUPPRESSED.labels(rule=rule).inc()
+                return False
+            entries[key] = now + self.ttl_sec
+            if len(entries) > self.max_keys:
+                self._dirty.add(entries.popitem(last=False)[0])
+            DEDUPE_KEYS.set(len(entries))
+            return True
+
+        if key in entries and actual <= threshold - abs(threshold) * self.hysteresis_ratio:
+            del entries[key]
+            self._dirty.add(key)
+            DEDUPE_KEYS.set(len(entries))
+        return False
+
+    def _expire(self, now: float):
+        entries = self._entries
+        removed = False
+        while entries:
+            key = next(iter(entries))
+            if entries[key] > now:
+                break
+            del entries[key]
+            self._dirty.add(key)
+            removed = True
+        if removed:
+            DEDUPE_KEYS.set(len(entries))
+
+    # --- checkpoint ---
+    def snapshot(self, full: bool, now: Optional[float] = None) -> Dict[Tuple[str, str], Optional[float]]:
+        """
+        Ključ -> preostali TTL u sekundama (None = ključ obrisan). Pun snapshot
+        sadrži sve ključeve, inkrementalni samo promenjene od prethodnog.
+        """
+        now = time.monotonic() if now is None else now
+        entries = self._entries
+        keys = entries.keys() if full else self._dirty
+        out = {}
+        for key in keys:
+            exp = entries.get(key)
+            out[key] = None if exp is None else exp - now
+        self._dirty.clear()
+        return out
+
+    def clear(self):
+        self._entries.clear()
+        self._dirty.clear()
+        DEDUPE_KEYS.set(0)
+
+    def restore(self, snap: Dict[Tuple[str, str], Optional[float]], full: bool, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        entries = self._entries
+        if full:
+            entries.clear()
+        for key, remaining in snap.items():
+            if remaining is None or remaining <= 0:
+                entries.pop(key, None)
+            else:
+                entries[key] = now + remaining
+                entries.move_to_end(key)
+        # redosled isteka (LRU) mora ostati rastući
+        for key in sorted(entries, key=entries.__getitem__):
+            entries.move_to_end(key)
+        DEDUPE_KEYS.set(len(entries))
@@ -1,4 +1,5 @@
 from eventmanager.app.config import settings
+from eventmanager.app.metrics import start_metrics_server
 from eventmanager.app.mqtt.consumer import RawConsumer
 
 def main():
@@ -8,8 +9,13 @@ def main():
         f"- OUT topic: {settings.MQTT_OUT_TOPIC}\n"
         f"- thresholds: timeTakenMin>{settings.THRESHOLD_TIME_TAKEN_MIN}, "
         f"distanceKm>{settings.THRESHOLD_DISTANCE_KM}\n"
+        f"- window rules: {[r.name for r in settings.WINDOW_RULES]} "
+        f"(lateness={settings.WINDOW_ALLOWED_LATENESS_SEC}s, max keys={settings.WINDOW_MAX_KEYS})\n"
+        f"- dedupe: enabled={settings.DEDUPE_ENABLED} ttl={settings.DEDUPE_TTL_SEC}s "
+        f"max keys={settings.DEDUPE_MAX_KEYS} hysteresis={settings.DEDUPE_HYSTERESIS_RATIO}\n"
         f"- mqtt: {settings.MQTT_HOST}:{settings.MQTT_PORT} qos={settings.MQTT_QOS} retain={settings.MQTT_RETAIN}"
     )
+    start_metrics_server()
     RawConsumer().start()
 
 if __name__ == "__main__":
@@ -0,0 +1,38 @@
+from prometheus_client import CollectorRegistry, Counter, Gauge, start_http_server
+
+from eventmanager.app.config import settings
+
+registry = CollectorRegistry()
+EVENTS_IN = Counter(
+    "eventmanager_events_in_total", "Broj primljenih DeliveryEvent poruka (source: input | forwarded)", ["source"],
+    registry=registry,
+)
+EVENTS_INVALID = Counter("eventmanager_events_invalid_total", "Broj neispravnih poruka", registry=registry)
+EVENTS_FORWARDED = Counter(
+    "eventmanager_events_forwarded_total", "Poruke prosleđene replici vlasniku particije", registry=registry
+)
+EVENTS_OUT = Counter("eventmanager_events_out_total", "Broj objavljenih DetectedEvent poruka", ["rule"], registry=registry)
+EVENTS_SUPPRESSED = Counter(
+    "eventmanager_events_suppressed_total",
+    "Broj potisnutih duplikata (pravilo je već prijavljeno za isti ključ)",
+    ["rule"], registry=registry,
+)
+WINDOW_LATE_DROPPED = Counter(
+    "eventmanager_window_late_dropped_total", "Događaji stariji od watermark-a", registry=registry
+)
+WINDOW_KEYS = Gauge("eventmanager_window_keys", "Broj aktivnih ključeva u prozorskim pravilima", registry=registry)
+DEDUPE_KEYS = Gauge("eventmanager_dedupe_keys", "Broj ključeva u dedupe tabeli", registry=registry)
+
+CHECKPOINT_BYTES = Gauge("eventmanager_checkpoint_bytes", "Veličina checkpoint fajla", registry=registry)
+RECOVERY_SECONDS = Gauge("eventmanager_recovery_seconds", "Trajanje učitavanja checkpoint-a pri startu", registry=registry)
+GAP_EVENTS = Counter(
+    "eventmanager_gap_events_total",
+    "Događaji nastali između poslednjeg checkpoint-a i restarta",
+    registry=registry,
+)
+
+
+def start_metrics_server():
+    if settings.METRICS_PORT > 0:
+        start_http_server(settings.METRICS_PORT, registry=registry)
+        print(f"[EventManager] metrics on :{settings.METRICS_PORT}/metrics")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Literal, Optional
 
 
 class Delivery(BaseModel):
@@ -31,3 +31,25 @@ class DetectedEvent(BaseModel):
     timestamp: Optional[str] = None  # preuzimamo iz deliveryTimestamp
     originalDeliveryId: Optional[str] = None
     sourceId: str = "eventmanager"
+    # popunjava se samo za prozorska pravila (eventType="window.threshold.exceeded")
+    aggregation: Optional[str] = None
+    windowKey: Optional[str] = None
+    windowStart: Optional[str] = None
+    windowEnd: Optional[str] = None
+    count: Optional[int] = None
+
+
+class WindowRule(BaseModel):
+    """
+    Pravilo nad prozorom događaja grupisanih po ključu (npr. prosečno
+    timeTakenMin po gradu u poslednjih 10 minuta > prag).
+    """
+    name: str
+    keyBy: List[Literal["city", "deliveryPersonId", "weather", "traffic"]]
+    field: Literal["timeTakenMin", "distanceKm"]
+    agg: Literal["count", "sum", "avg", "max"]
+    windowSec: float = Field(gt=0)
+    kind: Literal["sliding", "tumbling"] = "sliding"
+    threshold: float
+    # ako je zadato, u prozor ulaze samo događaji sa field > minValue
+    minValue: Optional[float] = None
@@ -0,0 +1,36 @@
+import paho.mqtt.client as mqtt
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+
+from eventmanager.app.config import settings
+
+
+def make_client(client_id: str = "") -> mqtt.Client:
+    """
+    MQTT klijent sa protokolom iz MQTT_PROTOCOL (5 = MQTT v5, inače v3.1.1).
+    Sa client_id sesija je perzistentna (vidi connect()).
+    """
+    if settings.MQTT_PROTOCOL == 5:
+        return mqtt.Client(client_id=client_id, protocol=mqtt.MQTTv5)
+    return mqtt.Client(client_id=client_id, clean_session=not client_id)
+
+
+def connect(client: mqtt.Client, persistent: bool = False):
+    if settings.MQTT_PROTOCOL == 5 and persistent:
+        props = Properties(PacketTypes.CONNECT)
+        props.SessionExpiryInterval = settings.MQTT_SESSION_EXPIRY_SEC
+        client.connect(settings.MQTT_HOST, settings.MQTT_PORT, keepalive=30,
+                       clean_start=False, properties=props)
+    else:
+        client.connect(settings.MQTT_HOST, settings.MQTT_PORT, keepalive=30)
+
+
+def consumer_client_id() -> str:
+    return settings.MQTT_CLIENT_ID.format(partition=settings.PARTITION_INDEX)
+
+
+def in_subscription() -> str:
+    """Ulazna pretplata; sa MQTT_SHARED_GROUP broker deli poruke između replika."""
+    if settings.MQTT_SHARED_GROUP:
+        return f"$share/{settings.MQTT_SHARED_GROUP}/{settings.MQTT_IN_TOPIC}"
+    return settings.MQTT_IN_TOPIC
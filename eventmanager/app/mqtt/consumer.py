@@ -1,17 +1,40 @@
-import json
+import signal
+import time
+
 import paho.mqtt.client as mqtt
-from typing import List
+from pydantic import TypeAdapter
+from typing import List, Optional
 
+from eventmanager.app.checkpoint import Checkpointer
 from eventmanager.app.config import settings
+from eventmanager.app.dedupe import ThresholdSuppressor
+from eventmanager.app.metrics import EVENTS_FORWARDED, EVENTS_IN, EVENTS_INVALID, EVENTS_OUT
 from eventmanager.app.models import DeliveryEvent, DetectedEvent
+from eventmanager.app.mqtt.client import connect, consumer_client_id, in_subscription, make_client
 from eventmanager.app.mqtt.publisher import get_publisher
+from eventmanager.app.partitioning import Partitioner, partition_key
+from eventmanager.app.windows import WindowEngine
+
+# validacija direktno iz bajtova payload-a (bez decode + json.loads + dict međukoraka)
+DELIVERY_EVENT_ADAPTER = TypeAdapter(DeliveryEvent)
+_IN_INPUT = EVENTS_IN.labels(source="input")
+_IN_FORWARDED = EVENTS_IN.labels(source="forwarded")
+
 
+def _exceeds(suppressor: Optional[ThresholdSuppressor], delivery_id: str, rule: str,
+             actual: float, threshold: float) -> bool:
+    if suppressor is None:
+        return actual > threshold
+    return suppressor.admit(delivery_id, rule, actual, threshold)
 
-def detect_violations(evt: DeliveryEvent) -> List[DetectedEvent]:
+
+def detect_violations(evt: DeliveryEvent, suppressor: Optional[ThresholdSuppressor] = None) -> List[DetectedEvent]:
     out: List[DetectedEvent] = []
+    delivery_id = evt.delivery.id
 
     # pravilo 1: trajanje > prag
-    if evt.delivery.timeTakenMin > settings.THRESHOLD_TIME_TAKEN_MIN:
+    if _exceeds(suppressor, delivery_id, "timeTakenMin_over_threshold",
+                evt.delivery.timeTakenMin, settings.THRESHOLD_TIME_TAKEN_MIN):
         out.append(DetectedEvent(
             rule="timeTakenMin_over_threshold",
             field="timeTakenMin",
@@ -23,7 +46,8 @@ def detect_violations(evt: DeliveryEvent) -> List[DetectedEvent]:
         ))
 
     # pravilo 2: distanca > prag
-    if evt.delivery.distanceKm > settings.THRESHOLD_DISTANCE_KM:
+    if _exceeds(suppressor, delivery_id, "distanceKm_over_threshold",
+                evt.delivery.distanceKm, settings.THRESHOLD_DISTANCE_KM):
         out.append(DetectedEvent(
             rule="distanceKm_over_threshold",
             field="distanceKm",
@@ -39,31 +63,103 @@ def detect_violations(evt: DeliveryEvent) -> List[DetectedEvent]:
 
 class RawConsumer:
     def __init__(self):
-        self._client = mqtt.Client()
+        self._client_id = consumer_client_id()
+        self._client = make_client(self._client_id)
         self._client.on_connect = self._on_connect
         self._client.on_message = self._on_message
+        self._suppressor = ThresholdSuppressor() if settings.DEDUPE_ENABLED else None
+        self._windows = WindowEngine(suppressor=self._suppressor)
+        self._partitioner = Partitioner()
+        self._checkpoint = Checkpointer(self._windows, self._suppressor)
+        self._checkpoint.restore()
+        self._stopping = False
 
     def start(self):
-        self._client.connect(settings.MQTT_HOST, settings.MQTT_PORT, keepalive=30)
-        self._client.loop_forever()
+        # SIGTERM (docker stop) -> prekid petlje pa završni checkpoint
+        signal.signal(signal.SIGTERM, lambda *_: self._stop())
+        connect(self._client, persistent=bool(self._client_id))
+        try:
+            self._loop()
+        finally:
+            self._checkpoint.checkpoint()
+
+    def _stop(self):
+        self._stopping = True
+        self._client.disconnect()
+
+    def _loop(self):
+        """
+        Mrežna petlja (umesto loop_forever) koja posle svakog prolaza, najviše
+        na 1 s, proverava i checkpoint: promene stanja pre zatišja se upisuju
+        bez čekanja sledeće poruke. Callback-ovi i checkpoint su u istoj niti.
+        """
+        while not self._stopping:
+            rc = self._client.loop(timeout=1.0)
+            if rc != mqtt.MQTT_ERR_SUCCESS and not self._stopping:
+                print(f"[EventManager][WARN] MQTT connection lost (rc={rc}), "
+                      f"reconnecting in {settings.MQTT_RECONNECT_SEC}s")
+                time.sleep(settings.MQTT_RECONNECT_SEC)
+                try:
+                    self._client.reconnect()
+                except OSError as ex:
+                    print(f"[EventManager][WARN] MQTT reconnect failed: {ex}")
+            self._checkpoint.maybe_checkpoint()
 
     # callbacks
-    def _on_connect(self, client, userdata, flags, rc):
-        client.subscribe(settings.MQTT_IN_TOPIC, qos=settings.MQTT_QOS)
-        print(f"[EventManager] connected and subscribed to {settings.MQTT_IN_TOPIC} (rc={rc})")
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
+        topic = in_subscription()
+        client.subscribe(topic, qos=settings.MQTT_QOS)
+        print(f"[EventManager] connected and subscribed to {topic} (rc={rc})")
+        if self._partitioner.enabled:
+            part_topic = self._partitioner.topic(self._partitioner.index)
+            client.subscribe(part_topic, qos=settings.MQTT_QOS)
+            print(f"[EventManager] partition {self._partitioner.index}/{self._partitioner.count} "
+                  f"subscribed to {part_topic}")
 
     def _on_message(self, client, userdata, msg):
         try:
-            data = json.loads(msg.payload.decode("utf-8"))
-            incoming = DeliveryEvent.model_validate(data)  # pydantic v2
+            # poruka sa particione teme je već prebrojana kao ulaz na replici koja ju je prosledila
+            forwarded = msg.topic != settings.MQTT_IN_TOPIC
+            (_IN_FORWARDED if forwarded else _IN_INPUT).inc()
+            try:
+                incoming = DELIVERY_EVENT_ADAPTER.validate_json(msg.payload)
+            except Exception:
+                EVENTS_INVALID.inc()
+                raise
 
-            violations = detect_violations(incoming)
+            self._checkpoint.observe(incoming.delivery.deliveryTimestamp)
+            violations = self._process(incoming, msg.payload, forwarded=forwarded)
             if not violations:
                 return
 
             pub = get_publisher()
             for v in violations:
-                pub.publish_detected(v.model_dump())
-                print(f"[EventManager] publish -> {settings.MQTT_OUT_TOPIC}: {v.model_dump()}")
+                # serijalizuje se jednom, isti JSON ide na MQTT i u log
+                payload = v.model_dump_json()
+                pub.publish_json(payload)
+                EVENTS_OUT.labels(rule=v.rule).inc()
+                print(f"[EventManager] publish -> {settings.MQTT_OUT_TOPIC}: {payload}")
         except Exception as ex:
             print(f"[EventManager][WARN] invalid message or publish failed: {ex}")
+
+    def _process(self, incoming: DeliveryEvent, raw: bytes, forwarded: bool) -> List[DetectedEvent]:
+        part = self._partitioner
+        if not part.enabled:
+            violations = detect_violations(incoming, self._suppressor)
+            violations.extend(self._windows.process(incoming))
+            return violations
+
+        # stanje je raspodeljeno po ključu: dedupe po isporuci, prozori po ključu pravila
+        delivery_key = partition_key(["id"], incoming.delivery.id)
+        if not forwarded:
+            keys = [delivery_key] + self._windows.partition_keys(incoming.delivery)
+            owners = part.foreign_owners(keys)
+            if owners:
+                pub = get_publisher()
+                for owner in owners:
+                    pub.publish_raw(part.topic(owner), raw)
+                    EVENTS_FORWARDED.inc()
+
+        violations = detect_violations(incoming, self._suppressor) if part.owns(delivery_key) else []
+        violations.extend(self._windows.process(incoming, owns=part.owns))
+        return violations
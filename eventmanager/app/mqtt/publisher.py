@@ -1,32 +1,35 @@
 import json
 import threading
 from typing import Optional
-import paho.mqtt.client as mqtt
 
 from eventmanager.app.config import settings
+from eventmanager.app.mqtt.client import connect, make_client
 
 
 class EventsPublisher:
     def __init__(self):
-        self._client = mqtt.Client()
+        self._client = make_client()
         self._connected = threading.Event()
 
         # callbacks
         self._client.on_connect = self._on_connect
 
         # konekcija
-        self._client.connect(settings.MQTT_HOST, settings.MQTT_PORT, keepalive=30)
+        connect(self._client)
         self._client.loop_start()
         # sačekaj connect
         self._connected.wait(timeout=5)
 
-    def _on_connect(self, client, userdata, flags, rc):
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
         # rc == 0 => OK
         print(f"[EventManager Publisher] MQTT connected rc={rc} to {settings.MQTT_HOST}:{settings.MQTT_PORT}")
         self._connected.set()
 
     def publish_detected(self, evt: dict):
-        payload = json.dumps(evt, ensure_ascii=False)
+        return self.publish_json(json.dumps(evt, ensure_ascii=False))
+
+    def publish_json(self, payload):
+        """Objavi već serijalizovan JSON (str ili bytes)."""
         info = self._client.publish(
             settings.MQTT_OUT_TOPIC,
             payload=payload,
@@ -36,6 +39,10 @@ class EventsPublisher:
         # opciono: .wait_for_publish() ako želiš sinhrono potvrdu
         return info
 
+    def publish_raw(self, topic: str, payload: bytes):
+        """Prosledi originalni payload na zadatu temu (particiona tema druge replike)."""
+        return self._client.publish(topic, payload=payload, qos=settings.MQTT_QOS, retain=False)
+
     def stop(self):
         try:
             self._client.loop_stop()
@@ -0,0 +1,50 @@
+"""
+Konzistentna raspodela stanja po replikama EventManager-a.
+
+Kod shared pretplate ($share/<group>/...) broker deli poruke replikama bez
+obzira na ključ, pa replika koja primi poruku obrađuje samo jedinice stanja
+čiji je vlasnik (dedupe po isporuci, prozor po ključu), a poruku prosleđuje
+na particionu temu vlasnika ostalih jedinica. Vlasnik ključa je
+crc32(ključ) % PARTITION_COUNT, isti na svim replikama.
+"""
+import zlib
+from typing import Iterable, List
+
+from eventmanager.app.config import settings
+
+
+def partition_key(fields: Iterable[str], value: str) -> str:
+    return f"{'|'.join(fields)}={value}"
+
+
+class Partitioner:
+    def __init__(self, count: int = None, index: int = None, shared_group: str = None):
+        self.count = max(1, count or settings.PARTITION_COUNT)
+        self.index = settings.PARTITION_INDEX if index is None else index
+        if not 0 <= self.index < self.count:
+            raise ValueError(f"PARTITION_INDEX={self.index} van opsega [0, {self.count})")
+        group = settings.MQTT_SHARED_GROUP if shared_group is None else shared_group
+        if self.count > 1 and not group:
+            # bez shared pretplate svaka replika dobija svaku poruku, pa bi je vlasnik obradio dvaput
+            raise ValueError(f"PARTITION_COUNT={self.count} zahteva MQTT_SHARED_GROUP")
+
+    @property
+    def enabled(self) -> bool:
+        return self.count > 1
+
+    def owner(self, key: str) -> int:
+        if self.count == 1:
+            return 0
+        return zlib.crc32(key.encode("utf-8")) % self.count
+
+    def owns(self, key: str) -> bool:
+        return self.owner(key) == self.index
+
+    def foreign_owners(self, keys: Iterable[str]) -> List[int]:
+        """Particije (osim sopstvene) kojima poruka mora da se prosledi."""
+        owners = {self.owner(k) for k in keys}
+        owners.discard(self.index)
+        return sorted(owners)
+
+    def topic(self, index: int) -> str:
+        return f"{settings.MQTT_PARTITION_TOPIC}/{index}"
@@ -0,0 +1,419 @@
+"""
+Prozorske agregacije (sliding/tumbling) nad DeliveryEvent tokom, po ključu
+(grad, kurir, vreme/saobraćaj...).
+
+Stanje po ključu je ograničeno: sliding prozor čuva parove (ts, vrednost) u
+ring bufferu fiksnog maksimalnog kapaciteta, a tumbling prozor samo
+akumulatore (count, sum, max) otvorenih prozora. Neaktivni ključevi se
+izbacuju (TTL + LRU limit), a događaji stariji od watermark-a
+(najveće viđeno vreme događaja - dozvoljeno kašnjenje) se odbacuju.
+
+Vreme događaja je po WINDOW_TIME_DOMAIN trenutak prijema (podrazumevano) ili
+deliveryTimestamp; drugo ima smisla samo za izvor sa tačnim vremenom isporuke
+u približno hronološkom redosledu.
+"""
+import heapq
+import math
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from eventmanager.app.config import settings
+from eventmanager.app.dedupe import ThresholdSuppressor
+from eventmanager.app.metrics import WINDOW_KEYS, WINDOW_LATE_DROPPED
+from eventmanager.app.models import Delivery, DeliveryEvent, DetectedEvent, WindowRule
+from eventmanager.app.partitioning import partition_key
+
+
+def parse_event_time(ts: Optional[str]) -> Optional[float]:
+    """ISO8601 (ili str(datetime) iz DataManager-a) -> UNIX sekunde; naivno vreme je UTC."""
+    if not ts:
+        return None
+    try:
+        dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _agg_value(agg: str, n: int, total: float, mx: float) -> float:
+    if agg == "count":
+        return float(n)
+    if agg == "sum":
+        return total
+    if agg == "avg":
+        return total / n if n else 0.0
+    return mx if n else 0.0
+
+
+class RingBuffer:
+    """
+    Parovi (ts, vrednost) u dva array('d'). Kapacitet raste udvostručavanjem do
+    max_capacity; kada je pun, novi element prepisuje najstariji.
+    """
+    __slots__ = ("_ts", "_val", "_cap", "_max", "_head", "_size")
+
+    def __init__(self, max_capacity: int, initial_capacity: int = 8):
+        cap = max(1, min(initial_capacity, max_capacity))
+        self._ts = array("d", bytes(8 * cap))
+        self._val = array("d", bytes(8 * cap))
+        self._cap = cap
+        self._max = max_capacity
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _grow(self):
+        new_cap = min(self._cap * 2, self._max)
+        ts = array("d", bytes(8 * new_cap))
+        val = array("d", bytes(8 * new_cap))
+        for i in range(self._size):
+            j = (self._head + i) % self._cap
+            ts[i] = self._ts[j]
+            val[i] = self._val[j]
+        self._ts, self._val, self._cap, self._head = ts, val, new_cap, 0
+
+    def append(self, ts: float, value: float) -> bool:
+        """Dodaj par; vraća True ako je pri tome prepisan najstariji element."""
+        if self._size == self._cap and self._cap < self._max:
+            self._grow()
+        tail = (self._head + self._size) % self._cap
+        self._ts[tail] = ts
+        self._val[tail] = value
+        if self._size == self._cap:
+            self._head = (self._head + 1) % self._cap
+            return True
+        self._size += 1
+        return False
+
+    def evict_before(self, cutoff: float):
+        """Izbaci sa početka sve elemente sa ts < cutoff."""
+        while self._size and self._ts[self._head] < cutoff:
+            self._head = (self._head + 1) % self._cap
+            self._size -= 1
+
+    def to_bytes(self) -> Tuple[bytes, bytes]:
+        """Elementi od najstarijeg ka najnovijem kao (ts, vrednosti) bajtovi array('d')."""
+        idx = [(self._head + i) % self._cap for i in range(self._size)]
+        return (array("d", (self._ts[j] for j in idx)).tobytes(),
+                array("d", (self._val[j] for j in idx)).tobytes())
+
+    @classmethod
+    def from_bytes(cls, max_capacity: int, ts: bytes, val: bytes) -> "RingBuffer":
+        ts_arr, val_arr = array("d"), array("d")
+        ts_arr.frombytes(ts)
+        val_arr.frombytes(val)
+        buf = cls(max_capacity, initial_capacity=len(ts_arr))
+        for t, v in zip(ts_arr, val_arr):
+            buf.append(t, v)
+        return buf
+
+    def aggregate(self, start: float, end: float) -> Tuple[int, float, float]:
+        """(count, sum, max) nad elementima sa start < ts <= end."""
+        n, total, mx = 0, 0.0, float("-inf")
+        ts, val, cap, head = self._ts, self._val, self._cap, self._head
+        for i in range(self._size):
+            j = (head + i) % cap
+            t = ts[j]
+            if start < t <= end:
+                v = val[j]
+                n += 1
+                total += v
+                if v > mx:
+                    mx = v
+        return n, total, mx
+
+
+class _SlidingState:
+    __slots__ = ("buf", "max_ts", "last_seen")
+
+    def __init__(self, capacity: int):
+        self.buf = RingBuffer(capacity)
+        self.max_ts = float("-inf")
+        self.last_seen = 0.0
+
+
+class _TumblingState:
+    __slots__ = ("buckets", "last_seen")
+
+    def __init__(self):
+        # početak prozora -> [count, sum, max]
+        self.buckets: Dict[float, list] = {}
+        self.last_seen = 0.0
+
+
+class WindowEngine:
+    """
+    Izvršava WindowRule pravila. Nije thread-safe; poziva se iz MQTT callback
+    niti (jedna nit po klijentu).
+    """
+
+    def __init__(
+        self,
+        rules: Optional[List[WindowRule]] = None,
+        max_events_per_key: Optional[int] = None,
+        max_keys: Optional[int] = None,
+        idle_ttl_sec: Optional[float] = None,
+        allowed_lateness_sec: Optional[float] = None,
+        suppressor: Optional[ThresholdSuppressor] = None,
+        time_domain: Optional[str] = None,
+    ):
+        self.rules = list(settings.WINDOW_RULES if rules is None else rules)
+        self.max_events_per_key = max_events_per_key or settings.WINDOW_MAX_EVENTS_PER_KEY
+        self.max_keys = max_keys or settings.WINDOW_MAX_KEYS
+        self.idle_ttl_sec = settings.WINDOW_IDLE_TTL_SEC if idle_ttl_sec is None else idle_ttl_sec
+        self.allowed_lateness_sec = (
+            settings.WINDOW_ALLOWED_LATENESS_SEC if allowed_lateness_sec is None else allowed_lateness_sec
+        )
+        self.time_domain = time_domain or settings.WINDOW_TIME_DOMAIN
+
+        # sliding pravila okidaju na svaki događaj dok je agregat iznad praga
+        self.suppressor = suppressor
+
+        self._rules_by_name: Dict[str, WindowRule] = {r.name: r for r in self.rules}
+        self._state: Dict[str, "OrderedDict[str, object]"] = {r.name: OrderedDict() for r in self.rules}
+        # heap (kraj prozora, pravilo, ključ, početak) otvorenih tumbling prozora
+        self._closing: List[Tuple[float, str, str, float]] = []
+        # (pravilo, ključ) promenjeni od poslednjeg checkpoint-a
+        self._dirty: Set[Tuple[str, str]] = set()
+
+        self.max_event_ts = float("-inf")
+        self.watermark = float("-inf")
+        self.late_dropped = 0
+        self.evicted_keys = 0
+
+    @staticmethod
+    def rule_key(rule: WindowRule, d: Delivery) -> str:
+        return "|".join(str(getattr(d, f)) for f in rule.keyBy)
+
+    def partition_keys(self, d: Delivery) -> List[str]:
+        return [partition_key(r.keyBy, self.rule_key(r, d)) for r in self.rules]
+
+    def process(self, evt: DeliveryEvent, now: Optional[float] = None,
+                owns: Optional[Callable[[str], bool]] = None, wall: Optional[float] = None) -> List[DetectedEvent]:
+        """
+        owns: ako je zadato, obrađuju se samo ključevi čija je ova replika vlasnik.
+        wall: vreme prijema (UNIX s) za time_domain="processing"; podrazumevano time.time().
+        """
+        d = evt.delivery
+        now = time.monotonic() if now is None else now
+        ts = parse_event_time(d.deliveryTimestamp) if self.time_domain == "event" else None
+        if ts is None:
+            ts = time.time() if wall is None else wall
+
+        out: List[DetectedEvent] = []
+        if ts < self.watermark:
+            self.late_dropped += 1
+            WINDOW_LATE_DROPPED.inc()
+        else:
+            if ts > self.max_event_ts:
+                self.max_event_ts = ts
+                self.watermark = ts - self.allowed_lateness_sec
+
+            for rule in self.rules:
+                value = float(getattr(d, rule.field))
+                if rule.minValue is not None and value <= rule.minValue:
+                    continue
+                key = self.rule_key(rule, d)
+                if owns is not None and not owns(partition_key(rule.keyBy, key)):
+                    continue
+                if rule.kind == "sliding":
+                    detected = self._add_sliding(rule, key, ts, value, now, d)
+                    if detected is not None:
+                        out.append(detected)
+                else:
+                    self._add_tumbling(rule, key, ts, value, now)
+
+        out.extend(self._close_tumbling())
+        self._evict_idle(now)
+        return out
+
+    # --- sliding ---
+    def _add_sliding(self, rule: WindowRule, key: str, ts: float, value: float,
+                     now: float, d: Delivery) -> Optional[DetectedEvent]:
+        st = self._touch(rule, key, now)
+        st.buf.append(ts, value)
+        if ts > st.max_ts:
+            st.max_ts = ts
+
+        end = st.max_ts
+        start = end - rule.windowSec
+        st.buf.evict_before(start)
+        n, total, mx = st.buf.aggregate(start, end)
+        actual = _agg_value(rule.agg, n, total, mx)
+        if self.suppressor is not None:
+            if not self.suppressor.admit(key, rule.name, actual, rule.threshold):
+                return None
+        elif actual <= rule.threshold:
+            return None
+
+        return DetectedEvent(
+            eventType="window.threshold.exceeded",
+            rule=rule.name,
+            field=rule.field,
+            threshold=rule.threshold,
+            actual=actual,
+            city=d.city,
+            timestamp=d.deliveryTimestamp,
+            originalDeliveryId=d.id,
+            aggregation=rule.agg,
+            windowKey=key,
+            windowStart=_iso(start),
+            windowEnd=_iso(end),
+            count=n,
+        )
+
+    # --- tumbling ---
+    def _add_tumbling(self, rule: WindowRule, key: str, ts: float, value: float, now: float):
+        st = self._touch(rule, key, now)
+        start = math.floor(ts / rule.windowSec) * rule.windowSec
+        b = st.buckets.get(start)
+        if b is None:
+            b = st.buckets[start] = [0, 0.0, float("-inf")]
+            heapq.heappush(self._closing, (start + rule.windowSec, rule.name, key, start))
+        b[0] += 1
+        b[1] += value
+        if value > b[2]:
+            b[2] = value
+
+    def _close_tumbling(self) -> List[DetectedEvent]:
+        out: List[DetectedEvent] = []
+        while self._closing and self._closing[0][0] <= self.watermark:
+            end, rule_name, key, start = heapq.heappop(self._closing)
+            st = self._state[rule_name].get(key)
+            if st is None:
+                continue  # ključ je u međuvremenu izbačen
+            b = st.buckets.pop(start, None)
+            if b is None:
+                continue
+            self._dirty.add((rule_name, key))
+            rule = self._rules_by_name[rule_name]
+            actual = _agg_value(rule.agg, b[0], b[1], b[2])
+            if actual <= rule.threshold:
+                continue
+            out.append(DetectedEvent(
+                eventType="window.threshold.exceeded",
+                rule=rule.name,
+                field=rule.field,
+                threshold=rule.threshold,
+                actual=actual,
+                city=key if rule.keyBy == ["city"] else None,
+                timestamp=_iso(end),
+                aggregation=rule.agg,
+                windowKey=key,
+                windowStart=_iso(start),
+                windowEnd=_iso(end),
+                count=b[0],
+            ))
+        return out
+
+    # --- stanje po ključu ---
+    def _touch(self, rule: WindowRule, key: str, now: float):
+        states = self._state[rule.name]
+        st = states.get(key)
+        if st is None:
+            st = _SlidingState(self.max_events_per_key) if rule.kind == "sliding" else _TumblingState()
+            states[key] = st
+            if len(states) > self.max_keys:
+                self._dirty.add((rule.name, states.popitem(last=False)[0]))
+                self.evicted_keys += 1
+        else:
+            states.move_to_end(key)
+        st.last_seen = now
+        self._dirty.add((rule.name, key))
+        return st
+
+    def _evict_idle(self, now: float):
+        cutoff = now - self.idle_ttl_sec
+        for rule_name, states in self._state.items():
+            while states:
+                key = next(iter(states))
+                if states[key].last_seen >= cutoff:
+                    break
+                del states[key]
+                self._dirty.add((rule_name, key))
+                self.evicted_keys += 1
+        WINDOW_KEYS.set(self.key_count())
+
+    def key_count(self) -> int:
+        return sum(len(s) for s in self._state.values())
+
+    # --- checkpoint ---
+    def snapshot(self, full: bool) -> Dict[str, Any]:
+        """
+        Stanje kao marshal-kompatibilni primitivi. Pun snapshot sadrži sve
+        ključeve, inkrementalni samo promenjene (None = ključ izbačen).
+        """
+        if full:
+            keys = [(r, k) for r, states in self._state.items() for k in states]
+        else:
+            keys = list(self._dirty)
+        out: Dict[Tuple[str, str], Any] = {}
+        for rule_name, key in keys:
+            st = self._state.get(rule_name, {}).get(key)
+            if st is None:
+                out[(rule_name, key)] = None
+            elif isinstance(st, _SlidingState):
+                ts, val = st.buf.to_bytes()
+                out[(rule_name, key)] = ("s", st.max_ts, ts, val)
+            else:
+                out[(rule_name, key)] = ("t", {start: tuple(b) for start, b in st.buckets.items()})
+        self._dirty.clear()
+        return {"max_event_ts": self.max_event_ts, "watermark": self.watermark, "keys": out}
+
+    def clear(self):
+        """Prazno stanje kao posle pokretanja (npr. neupotrebljiv checkpoint)."""
+        for states in self._state.values():
+            states.clear()
+        self._closing = []
+        self._dirty.clear()
+        self.max_event_ts = float("-inf")
+        self.watermark = float("-inf")
+
+    def restore(self, snap: Dict[str, Any], full: bool, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        if full:
+            for states in self._state.values():
+                states.clear()
+        self.max_event_ts = max(self.max_event_ts, snap["max_event_ts"])
+        self.watermark = max(self.watermark, snap["watermark"])
+
+        for (rule_name, key), data in snap["keys"].items():
+            states = self._state.get(rule_name)
+            rule = self._rules_by_name.get(rule_name)
+            if states is None:
+                continue  # pravilo više nije u konfiguraciji
+            if data is None:
+                states.pop(key, None)
+                continue
+            if data[0] == "s" and rule.kind == "sliding":
+                st = _SlidingState(self.max_events_per_key)
+                st.buf = RingBuffer.from_bytes(self.max_events_per_key, data[2], data[3])
+                st.max_ts = data[1]
+            elif data[0] == "t" and rule.kind == "tumbling":
+                st = _TumblingState()
+                st.buckets = {start: list(b) for start, b in data[1].items()}
+            else:
+                continue  # promenjen tip prozora
+            st.last_seen = now
+            states[key] = st
+            states.move_to_end(key)
+
+        self._closing = [
+            (start + self._rules_by_name[rule_name].windowSec, rule_name, key, start)
+            for rule_name, states in self._state.items()
+            for key, st in states.items() if isinstance(st, _TumblingState)
+            for start in st.buckets
+        ]
+        heapq.heapify(self._closing)
+        WINDOW_KEYS.set(self.key_count())
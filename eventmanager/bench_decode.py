@@ -0,0 +1,93 @@
+"""
+Mikro-benchmark obrade jedne MQTT poruke u EventManager-u (bez mreže).
+
+  stari put: bytes -> str -> json.loads -> model_validate -> 2x model_dump (+ json.dumps)
+  novi put:  bytes -> TypeAdapter.validate_json -> 1x model_dump_json
+
+Meri CPU vreme jedne niti (time.process_time), pa je rezultat poruka/s po jezgru.
+
+Pokretanje iz root-a repozitorijuma:
+  python -m eventmanager.bench_decode --n 50000
+"""
+import argparse
+import json
+import time
+
+from eventmanager.app.mqtt.consumer import DELIVERY_EVENT_ADAPTER, detect_violations
+from eventmanager.app.models import DeliveryEvent
+
+
+def sample_payloads(n: int):
+    out = []
+    for i in range(n):
+        out.append(json.dumps({
+            "eventType": "updated" if i % 3 else "created",
+            "source": "datamanager",
+            "delivery": {
+                "id": f"D-{i}",
+                "orderId": f"O-{i}",
+                "deliveryPersonId": f"P-{i % 97}",
+                "city": ("Belgrade", "Novi Sad", "Niš", "Kragujevac")[i % 4],
+                "weather": ("Clear", "Rain", "Fog")[i % 3],
+                "traffic": ("Low", "Medium", "High", "Jam")[i % 4],
+                "distanceKm": 5.0 + (i % 30),
+                "timeTakenMin": 20.0 + (i % 200),
+                "deliveryTimestamp": "2025-10-23T13:00:00+00:00",
+                "deliveryStatus": "delivered",
+            },
+        }).encode("utf-8"))
+    return out
+
+
+def old_path(payload: bytes) -> int:
+    data = json.loads(payload.decode("utf-8"))
+    incoming = DeliveryEvent.model_validate(data)
+    n = 0
+    for v in detect_violations(incoming):
+        json.dumps(v.model_dump(), ensure_ascii=False)
+        f"{v.model_dump()}"
+        n += 1
+    return n
+
+
+def new_path(payload: bytes) -> int:
+    incoming = DELIVERY_EVENT_ADAPTER.validate_json(payload)
+    n = 0
+    for v in detect_violations(incoming):
+        v.model_dump_json()
+        n += 1
+    return n
+
+
+def run(fn, payloads, repeat: int) -> float:
+    best = 0.0
+    for _ in range(repeat):
+        t0 = time.process_time()
+        for p in payloads:
+            fn(p)
+        dt = time.process_time() - t0
+        best = max(best, len(payloads) / dt if dt > 0 else float("inf"))
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description="EventManager decode/validate/serialize benchmark")
+    ap.add_argument("--n", type=int, default=20000, help="broj poruka po prolazu")
+    ap.add_argument("--repeat", type=int, default=3, help="broj prolaza (uzima se najbolji)")
+    args = ap.parse_args()
+
+    payloads = sample_payloads(args.n)
+    # zagrevanje
+    run(old_path, payloads[:1000], 1)
+    run(new_path, payloads[:1000], 1)
+
+    before = run(old_path, payloads, args.repeat)
+    after = run(new_path, payloads, args.repeat)
+    print(f"messages: {args.n} x {args.repeat}")
+    print(f"before (json.loads + model_validate + 2x model_dump): {before:,.0f} msg/s per core")
+    print(f"after  (validate_json + 1x model_dump_json):          {after:,.0f} msg/s per core")
+    print(f"speedup: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
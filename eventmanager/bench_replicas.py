@@ -0,0 +1,148 @@
+"""
+Test propusnosti više replika EventManager-a na lokalnom Mosquitto brokeru
+(shared pretplata + particije stanja).
+
+Za svaki broj replika pokreće N procesa `python -m eventmanager.app.main`
+(isti MQTT_SHARED_GROUP, PARTITION_INDEX 0..N-1), objavi --messages
+DeliveryEvent poruka na ulaznu temu i čeka odgovarajuće DetectedEvent
+poruke na izlaznoj temi. Svaka poruka ima jedinstven id i prekoračuje samo
+prag trajanja, pa se očekuje tačno jedan izlazni događaj po poruci;
+duplikati znače da je poruku obradilo više replika.
+
+Pokretanje (iz root-a repozitorijuma, uz pokrenut broker):
+  docker compose up -d mosquitto
+  python -m eventmanager.bench_replicas --replicas 1,2,4 --messages 20000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+import paho.mqtt.client as mqtt
+
+
+def start_replicas(n: int, run_id: str, args) -> list:
+    procs = []
+    for i in range(n):
+        env = dict(os.environ)
+        env.update({
+            "MQTT_HOST": args.host,
+            "MQTT_PORT": str(args.port),
+            "MQTT_IN_TOPIC": f"bench/{run_id}/raw",
+            "MQTT_OUT_TOPIC": f"bench/{run_id}/events",
+            "MQTT_PARTITION_TOPIC": f"bench/{run_id}/part",
+            "MQTT_SHARED_GROUP": f"bench-{run_id}",
+            "PARTITION_COUNT": str(n),
+            "PARTITION_INDEX": str(i),
+            "THRESHOLD_TIME_TAKEN_MIN": "0",
+            "THRESHOLD_DISTANCE_KM": "1000000",
+            "WINDOW_RULES": "[]",
+            "METRICS_PORT": "0",
+            "SERVICE_ID": f"bench-{i}",
+            # bez checkpoint-a: dedupe stanje prethodnog merenja bi potisnulo iste id-eve (B-{i})
+            "CHECKPOINT_PATH": "",
+        })
+        procs.append(subprocess.Popen(
+            [sys.executable, "-m", "eventmanager.app.main"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ))
+    return procs
+
+
+def payload(i: int) -> bytes:
+    return json.dumps({
+        "eventType": "created",
+        "source": "bench",
+        "delivery": {
+            "id": f"B-{i}",
+            "orderId": f"O-{i}",
+            "deliveryPersonId": f"P-{i % 50}",
+            "city": ("Belgrade", "Novi Sad", "Niš")[i % 3],
+            "weather": "Clear",
+            "traffic": "Low",
+            "distanceKm": 3.0,
+            "timeTakenMin": 45.0,
+            "deliveryTimestamp": "2025-10-23T13:00:00Z",
+            "deliveryStatus": "delivered",
+        },
+    }).encode("utf-8")
+
+
+def run_once(n: int, args) -> dict:
+    run_id = uuid.uuid4().hex[:8]
+    seen: Counter = Counter()
+    done = threading.Event()
+    last_rx = [0.0]
+
+    def on_message(client, userdata, msg):
+        seen[json.loads(msg.payload)["originalDeliveryId"]] += 1
+        last_rx[0] = time.perf_counter()
+        if len(seen) >= args.messages:
+            done.set()
+
+    sub = mqtt.Client()
+    sub.on_message = on_message
+    sub.connect(args.host, args.port, keepalive=30)
+    sub.subscribe(f"bench/{run_id}/events", qos=1)
+    sub.loop_start()
+
+    procs = start_replicas(n, run_id, args)
+    try:
+        time.sleep(args.warmup)  # replike se povezuju i pretplaćuju
+
+        pub = mqtt.Client()
+        pub.max_inflight_messages_set(1000)
+        pub.connect(args.host, args.port, keepalive=30)
+        pub.loop_start()
+        topic = f"bench/{run_id}/raw"
+        t0 = time.perf_counter()
+        for i in range(args.messages):
+            pub.publish(topic, payload(i), qos=1)
+        done.wait(timeout=args.timeout)
+        elapsed = (last_rx[0] or time.perf_counter()) - t0
+        pub.loop_stop()
+        pub.disconnect()
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait(timeout=10)
+        sub.loop_stop()
+        sub.disconnect()
+
+    received = sum(seen.values())
+    return {
+        "replicas": n,
+        "unique": len(seen),
+        "duplicates": received - len(seen),
+        "missing": args.messages - len(seen),
+        "seconds": elapsed,
+        "msg_per_s": len(seen) / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="EventManager multi-replica throughput (local Mosquitto)")
+    ap.add_argument("--host", default="localhost")
+    ap.add_argument("--port", type=int, default=1883)
+    ap.add_argument("--replicas", default="1,2", help="lista broja replika, npr. 1,2,4")
+    ap.add_argument("--messages", type=int, default=10000)
+    ap.add_argument("--warmup", type=float, default=3.0, help="sekunde čekanja na pretplatu replika")
+    ap.add_argument("--timeout", type=float, default=120.0)
+    args = ap.parse_args()
+
+    results = [run_once(int(n), args) for n in args.replicas.split(",")]
+    base = results[0]["msg_per_s"] or 1.0
+    print(f"{'replicas':>8} {'msg/s':>10} {'speedup':>8} {'unique':>8} {'dup':>6} {'missing':>8}")
+    for r in results:
+        print(f"{r['replicas']:>8} {r['msg_per_s']:>10,.0f} {r['msg_per_s'] / base:>7.2f}x "
+              f"{r['unique']:>8} {r['duplicates']:>6} {r['missing']:>8}")
+
+
+if __name__ == "__main__":
+    main()
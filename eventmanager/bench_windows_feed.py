@@ -0,0 +1,87 @@
+"""
+Prozorska pravila nad tokom kakav šalje sensor-generator: redovi Kaggle CSV-a
+prolaze kroz send_csv.map_row (deliveryTimestamp = Order_Date, datum bez
+vremena, redovi nisu po vremenu) i WindowEngine sa podrazumevanim pravilima,
+jednom za svaki WINDOW_TIME_DOMAIN.
+
+  late dropped:  događaji odbačeni kao stariji od watermark-a
+  alerts:        window.threshold.exceeded po pravilu
+
+Vreme prijema se simulira brzinom --rate događaja/s (kao send_csv --rate), pa
+prozori od 10-60 min vide isto koliko i u radu. Bez --csv pravi sintetički
+CSV u Kaggle formatu (deliveryml.bench_training_data).
+
+Pokretanje iz root-a repozitorijuma:
+  python -m eventmanager.bench_windows_feed --csv data/amazon_delivery.csv --rows 2000
+"""
+import argparse
+import importlib.util
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+
+import pandas as pd
+
+from eventmanager.app.models import Delivery, DeliveryEvent
+from eventmanager.app.windows import WindowEngine
+
+SEND_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sensor-generator", "send_csv.py")
+
+
+def load_map_row():
+    spec = importlib.util.spec_from_file_location("send_csv", SEND_CSV)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.map_row
+
+
+def feed_events(csv_path: str, rows: int) -> list:
+    map_row = load_map_row()
+    df = pd.read_csv(csv_path, nrows=rows or None)
+    return [
+        DeliveryEvent(eventType="created", source="datamanager", delivery=Delivery(id=f"D-{i}", **map_row(r)))
+        for i, r in enumerate(df.to_dict(orient="records"))
+    ]
+
+
+def run(events: list, time_domain: str, rate: float) -> dict:
+    engine = WindowEngine(time_domain=time_domain)
+    alerts: Counter = Counter()
+    t0 = time.time()
+    for i, evt in enumerate(events):
+        for d in engine.process(evt, now=i / rate, wall=t0 + i / rate):
+            alerts[d.rule] += 1
+    return {"late": engine.late_dropped, "alerts": alerts}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Window rules over the sensor-generator feed, per time domain")
+    ap.add_argument("--csv", help="Kaggle amazon_delivery.csv (bez njega: sintetički)")
+    ap.add_argument("--rows", type=int, default=2000)
+    ap.add_argument("--rate", type=float, default=10.0, help="događaja/s (send_csv --rate)")
+    args = ap.parse_args()
+
+    csv_path, tmp = args.csv, None
+    if not csv_path:
+        from deliveryml.bench_training_data import synthetic_csv
+
+        tmp = tempfile.mkdtemp(prefix="bench-windows-")
+        csv_path = os.path.join(tmp, "deliveries.csv")
+        synthetic_csv(csv_path, args.rows, seed=7)
+    try:
+        events = feed_events(csv_path, args.rows)
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"{len(events)} events from {csv_path}, {args.rate:g}/s")
+    for domain in ("event", "processing"):
+        r = run(events, domain, args.rate)
+        per_rule = ", ".join(f"{k} {v}" for k, v in sorted(r["alerts"].items())) or "-"
+        print(f"  {domain:<10} late dropped {r['late']:>6}  alerts {sum(r['alerts'].values()):>5}  ({per_rule})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from prometheus_client import Histogram
+
+
+class DynamicBatcher:
+    """
+    Spaja istovremene /predict zahteve u jedan vektorizovan poziv modela.
+
+    Zahtev čeka u redu najviše `max_wait_ms` od svog dolaska ili dok se ne
+    skupi `max_rows` redova; batch se zatim računa u posebnoj niti (jedna
+    inferenca u isto vreme, van FastAPI threadpool-a), a svaki zahtev dobija
+    svoj rezultat preko future-a. Dok inferenca traje, novi zahtevi se
+    skupljaju i pošto im je rok već prošao, sledeći batch kreće odmah:
+    pri malom opterećenju zahtev čeka najviše max_wait_ms, pri velikom se
+    batch-evi sami povećavaju.
+    """
+
+    def __init__(
+        self,
+        score: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+        max_rows: int,
+        max_wait_ms: float,
+        batch_rows: Optional[Histogram] = None,
+        queue_wait: Optional[Histogram] = None,
+    ):
+        self._score = score
+        self._max_rows = max(1, max_rows)
+        self._max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._batch_rows = batch_rows
+        self._queue_wait = queue_wait
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mlaas-predict")
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        while not self._queue.empty():
+            _, fut, _ = self._queue.get_nowait()
+            if not fut.done():
+                fut.set_exception(RuntimeError("MLaaS se gasi"))
+        self._executor.shutdown(wait=False)
+
+    async def predict(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((payload, fut, time.perf_counter()))
+        return await fut
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = batch[0][2] + self._max_wait
+        while len(batch) < self._max_rows:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            now = time.perf_counter()
+            if self._batch_rows is not None:
+                self._batch_rows.observe(len(batch))
+            if self._queue_wait is not None:
+                for _, _, enqueued in batch:
+                    self._queue_wait.observe(now - enqueued)
+
+            try:
+                results = await loop.run_in_executor(self._executor, self._score, [p for p, _, _ in batch])
+            except asyncio.CancelledError:
+                for _, fut, _ in batch:
+                    fut.cancel()
+                raise
+            except Exception as ex:
+                for _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(ex)
+                continue
+            for (_, fut, _), res in zip(batch, results):
+                # klijent je možda prekinuo zahtev (future otkazan)
+                if not fut.done():
+                    fut.set_result(res)
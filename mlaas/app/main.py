@@ -1,71 +1,375 @@
 import os
 import io
+import asyncio
 import json
-from typing import Optional, Dict, Any, List
+import random
+import shutil
+import threading
+import time
+from typing import Optional, Dict, Any, List, NamedTuple, Literal
 
 import numpy as np
-import pandas as pd
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from joblib import load, dump
+from joblib import load
 
-from prometheus_client import (
-    Counter, Histogram, Gauge, CollectorRegistry,
-    generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from fastapi.responses import JSONResponse, Response
+
+from app.batcher import DynamicBatcher
+from app.metrics import (
+    BATCH_ROWS, CANARY_SERVED, DYN_BATCH_ROWS, DYN_QUEUE_WAIT, MODEL_LOAD_SECONDS, MODEL_LOADED, MODEL_READY,
+    PRED_LATENCY, REQ_COUNTER, TRAIN_JOBS, TRAIN_RUNNING, registry,
 )
-from fastapi.responses import Response
+from app.registry import ModelRegistry
+from app.shadow import ShadowScorer
+from app.training import TrainingJobs
+from deliveryml.encoder import CompiledEncoder
+from deliveryml.features import features_frame
+from deliveryml.forest import FlatForest
+from deliveryml import model_store
 
 MODEL_PATH = os.getenv("MODEL_PATH", "/app/model.pkl")
 CSV_PATH = os.getenv("CSV_PATH", "/app/data/amazon_delivery.csv")
 SLA_THRESHOLD_MIN = float(os.getenv("SLA_THRESHOLD_MIN", "30"))
 LATE_DECISION_THRESHOLD = float(os.getenv("LATE_DECISION_THRESHOLD", "0.5"))
+# najviše redova po /predict_batch zahtevu
+PREDICT_BATCH_MAX = int(os.getenv("PREDICT_BATCH_MAX", "1024"))
+# ulaz modela bez DataFrame-a (deliveryml.encoder); 0 = sklearn ColumnTransformer
+COMPILED_ENCODER = os.getenv("COMPILED_ENCODER", "1") == "1"
+# obilazak šume: sklearn | flat (deliveryml.forest, brže za male ulaze)
+FOREST_ENGINE = os.getenv("FOREST_ENGINE", "sklearn").lower()
+# flat: veći batch ide u sklearn šumu (0 = uvek flat)
+FLAT_FOREST_MAX_ROWS = int(os.getenv("FLAT_FOREST_MAX_ROWS", "128"))
+# spajanje istovremenih /predict zahteva u jedan poziv modela (0 = svaki zahtev posebno)
+PREDICT_BATCHING = os.getenv("PREDICT_BATCHING", "0") == "1"
+PREDICT_BATCHING_MAX_ROWS = int(os.getenv("PREDICT_BATCHING_MAX_ROWS", "64"))
+PREDICT_BATCHING_WAIT_MS = float(os.getenv("PREDICT_BATCHING_WAIT_MS", "2"))
+# novi model iz /train se postavlja samo ako je tačnost na test skupu bar ovolika
+TRAIN_MIN_ACCURACY = float(os.getenv("TRAIN_MIN_ACCURACY", "0"))
+# registar verzija modela; MODEL_PATH uvek sadrži kopiju trenutne verzije (npr. za Analytics ML_MODE=embedded)
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", os.path.join(os.path.dirname(MODEL_PATH) or ".", "models"))
+# 1 = model iz /train odmah postaje trenutni; 0 = samo se upisuje u registar (promocija ručno)
+TRAIN_AUTO_PROMOTE = os.getenv("TRAIN_AUTO_PROMOTE", "1") == "1"
+SHADOW_QUEUE_MAX = int(os.getenv("SHADOW_QUEUE_MAX", "256"))
+# Parquet keš pripremljenih feature-a za /train (po hash-u CSV-a); prazno = bez keša
+TRAIN_CACHE_DIR = os.getenv("TRAIN_CACHE_DIR", os.path.join(MODEL_REGISTRY_DIR, "feature-cache"))
+# inkrementalni trening (/train?mode=incremental) iz tabele deliveries; prazno = isključen
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+INCREMENTAL_CHUNK_ROWS = int(os.getenv("INCREMENTAL_CHUNK_ROWS", "5000"))
+INCREMENTAL_TREES_PER_CHUNK = int(os.getenv("INCREMENTAL_TREES_PER_CHUNK", "20"))
+INCREMENTAL_MAX_TREES = int(os.getenv("INCREMENTAL_MAX_TREES", "400"))
+INCREMENTAL_MIN_ROWS = int(os.getenv("INCREMENTAL_MIN_ROWS", "500"))
+# redovi sa updated_at mlađim od ovoga ostaju za sledeći trening (transakcije u toku)
+INCREMENTAL_SETTLE_SEC = float(os.getenv("INCREMENTAL_SETTLE_SEC", "60"))
+# joblib: model.pkl u svakom procesu | mmap: šuma iz <verzija>/model.mmap (deliveryml.model_store),
+# read-only mapirana i deljena između uvicorn --workers procesa; flat obilazak za sve veličine batch-a
+MODEL_STORAGE = os.getenv("MODEL_STORAGE", "joblib").lower()
+# probne predikcije pre nego što proces prijavi spremnost (GET /ready) i pre svake zamene modela
+MODEL_WARMUP_ROUNDS = int(os.getenv("MODEL_WARMUP_ROUNDS", "3"))
+# provera registry.json (promocija/rollback/kandidat iz drugog procesa); 0 = isključeno
+REGISTRY_POLL_SEC = float(os.getenv("REGISTRY_POLL_SEC", "2"))
 
 app = FastAPI(title="MLaaS - Delivery Delay Risk", version="1.0.0")
 
-registry = CollectorRegistry()
-REQ_COUNTER = Counter("mlaas_requests_total", "Broj poziva endpointa", ["endpoint"], registry=registry)
-PRED_LATENCY = Histogram("mlaas_predict_latency_seconds", "Latencija predict() poziva", registry=registry)
-MODEL_LOADED = Gauge("mlaas_model_loaded", "Da li je model učitan (1/0)", registry=registry)
 
-MODEL: Optional[Dict[str, Any]] = None
+class _LoadedModel(NamedTuple):
+    bundle: Dict[str, Any]
+    # verzija iz registra; klijenti (Analytics keš) je prate radi invalidacije
+    version: str
+    # tabele kodiranja napravljene iz učitanog Pipeline-a (None = sklearn putanja)
+    encoder: Optional[CompiledEncoder]
+    forest: Optional[FlatForest]
+    # trajanje warm-up-a (None = još nije zagrejan, proces nije spreman)
+    warmup_ms: Optional[float] = None
+
+
+class _Candidate(NamedTuple):
+    model: _LoadedModel
+    # shadow: skoruje uzorak van putanje zahteva; canary: odgovara na uzorak zahteva
+    mode: str
+    rate: float
+
+
+# trenutni model i kandidat; menjaju se jednom dodelom, pa svaki zahtev vidi konzistentno stanje
+CURRENT: Optional[_LoadedModel] = None
+CANDIDATE: Optional[_Candidate] = None
+REGISTRY: Optional[ModelRegistry] = None
+SHADOW: Optional[ShadowScorer] = None
+BATCHER: Optional[DynamicBatcher] = None
+JOBS: Optional[TrainingJobs] = None
+# promocija, rollback, kandidat i upis iz /train se ne preklapaju
+_SWAP_LOCK = threading.Lock()
+
+# redovi za proveru modela pre nego što počne da služi
+_PROBE_ROWS = [
+    {"area": "Urban", "weather": "Sunny", "traffic": "Low", "distanceKm": 2.5, "hour": 9, "weekday": 1},
+    {"area": "Metropolitian", "weather": "Stormy", "traffic": "Jam", "distanceKm": 14.0, "hour": 19, "weekday": 4},
+    {"area": "Semi-Urban", "weather": "Fog", "traffic": "High", "distanceKm": 7.0, "hour": 13, "weekday": 6},
+    {"area": "nepoznato", "weather": "nepoznato", "traffic": "nepoznato", "distanceKm": 0.0, "hour": 0, "weekday": 0},
+]
+
+
+def _require_meta(bundle: Dict[str, Any]):
+    if bundle.get("feature_names_in") is None:
+        raise ValueError("model nema meta informaciju 'feature_names_in'")
+
+
+def _prepare_store(path: str, version: str) -> Optional[_LoadedModel]:
+    """
+    MODEL_STORAGE=mmap: model.mmap pored artefakta (pravi ga prvi proces koji
+    učita verziju, uz proveru ravne šume naspram sklearn Pipeline-a). None ako
+    model nije Pipeline(pre, šuma), pa se koristi joblib.
+    """
+    directory = model_store.store_dir(path)
+    if not model_store.is_current(path, directory):
+        bundle = load(path)
+        _require_meta(bundle)
+        full = _LoadedModel(bundle, version, None, None)
+        if model_store.export(path, bundle, directory) is None:
+            return None
+        exported = _from_store(directory, version)
+        if not np.allclose(_predict_proba(exported, _PROBE_ROWS), _predict_proba(full, _PROBE_ROWS),
+                           rtol=0.0, atol=1e-9):
+            raise ValueError(f"{directory} se ne slaže sa {path}")
+        print(f"[mlaas] {version}: mmap store {directory} ({exported.forest.n_nodes} nodes)")
+        return exported
+    return _from_store(directory, version)
+
+
+def _from_store(directory: str, version: str) -> _LoadedModel:
+    bundle, forest = model_store.load_store(directory)
+    _require_meta(bundle)
+    encoder = CompiledEncoder.from_pipeline(bundle["model"], estimator=forest) if COMPILED_ENCODER else None
+    return _LoadedModel(bundle, version, encoder, forest)
+
+
+def _prepare(path: str, version: str, storage: Optional[str] = None) -> _LoadedModel:
+    if (storage or MODEL_STORAGE) == "mmap":
+        loaded = _prepare_store(path, version)
+        if loaded is not None:
+            return loaded
+        print("[mlaas] model estimator is not a forest classifier, MODEL_STORAGE=mmap ignored")
+    bundle = load(path)
+    _require_meta(bundle)
+    model = bundle["model"]
+    forest = None
+    if FOREST_ENGINE == "flat" and hasattr(model, "steps"):
+        forest = FlatForest.from_estimator(model.steps[-1][1], FLAT_FOREST_MAX_ROWS)
+        if forest is None:
+            print("[mlaas] model estimator is not a forest classifier, FOREST_ENGINE=flat ignored")
+    encoder = CompiledEncoder.from_pipeline(model, estimator=forest) if COMPILED_ENCODER else None
+    if COMPILED_ENCODER and encoder is None:
+        print("[mlaas] model pipeline not supported by compiled encoder, using sklearn transform")
+    return _LoadedModel(bundle, version, encoder, forest)
+
+
+def _check(loaded: _LoadedModel):
+    """Verovatnoće za probne redove moraju biti ispravne i iste kroz brzu i sklearn putanju."""
+    # mmap model nema sklearn šumu (ravna je proverena pri export-u), pa se proverava samo encoder
+    forest = loaded.forest if loaded.bundle.get("storage") == "mmap" else None
+    reference = _predict_proba(loaded._replace(encoder=None, forest=forest), _PROBE_ROWS)
+    probas = _predict_proba(loaded, _PROBE_ROWS)
+    if probas.shape != (len(_PROBE_ROWS),) or not np.all((probas >= 0.0) & (probas <= 1.0)):
+        raise ValueError(f"neispravne verovatnoće za probne redove: {probas}")
+    if not np.allclose(probas, reference, rtol=0.0, atol=1e-9):
+        raise ValueError("brza putanja (encoder/flat) se ne slaže sa sklearn Pipeline-om")
+
+
+def _bundle_meta(bundle: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "feature_names_in": list(bundle.get("feature_names_in") or []),
+        "threshold_min": float(bundle.get("threshold_min", SLA_THRESHOLD_MIN)),
+        "class_labels": [c.item() if hasattr(c, "item") else c for c in bundle.get("class_labels", [])],
+    }
+
+
+def _bootstrap_registry():
+    """Prazan registar preuzima MODEL_PATH (model iz image-a, train.py) kao prvu verziju."""
+    # pod zaključavanjem registra: sa --workers N samo prvi proces uvozi
+    with REGISTRY.locked():
+        if REGISTRY.current is not None or not os.path.isfile(MODEL_PATH):
+            return
+        meta = _bundle_meta(load(MODEL_PATH))
+        meta.update({
+            "source": "import",
+            "imported_from": MODEL_PATH,
+            "trained_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(os.path.getmtime(MODEL_PATH))),
+            "metrics": None,
+        })
+        version = REGISTRY.add(MODEL_PATH, meta, move=False)
+        REGISTRY.set_current(version)
+    print(f"[mlaas] registry {MODEL_REGISTRY_DIR}: imported {MODEL_PATH} as {version}")
+
+
+def _warm(loaded: _LoadedModel) -> _LoadedModel:
+    """
+    Pre služenja: mapirane stranice šume se učitaju (prefault), pa nekoliko
+    predikcija za jedan red i za batch, da prvi zahtevi ne plaćaju hladan start.
+    """
+    if loaded.warmup_ms is not None:
+        return loaded
+    t0 = time.perf_counter()
+    if loaded.bundle.get("storage") == "mmap":
+        loaded.forest.prefault()
+    batch = _PROBE_ROWS * 16
+    for _ in range(max(1, MODEL_WARMUP_ROUNDS)):
+        _predict_proba(loaded, _PROBE_ROWS[:1])
+        _predict_proba(loaded, batch)
+    return loaded._replace(warmup_ms=round((time.perf_counter() - t0) * 1e3, 2))
+
+
+def _mirror(version: str):
+    """Kopija trenutne verzije na MODEL_PATH (atomski), za čitaoce fajla van registra."""
+    try:
+        tmp = f"{MODEL_PATH}.{version}.tmp"
+        shutil.copy2(REGISTRY.artifact(version), tmp)
+        os.replace(tmp, MODEL_PATH)
+    except OSError as ex:
+        print(f"[mlaas][WARN] could not update {MODEL_PATH}: {ex}")
+
+
+def _set_candidate(version: Optional[str], mode: str = "shadow", rate: float = 0.0, loaded=None):
+    global CANDIDATE
+    if version is None:
+        CANDIDATE = None
+        return
+    loaded = _warm(loaded or _prepare(REGISTRY.artifact(version), version))
+    SHADOW.reset(version)
+    CANDIDATE = _Candidate(loaded, mode, rate)
 
 
 def load_model() -> Optional[Dict[str, Any]]:
-    global MODEL
+    global CURRENT
     try:
-        MODEL = load(MODEL_PATH)
+        version = REGISTRY.current
+        if version is None:
+            raise FileNotFoundError(f"registar {MODEL_REGISTRY_DIR} nema trenutnu verziju, a {MODEL_PATH} ne postoji")
+        t0 = time.perf_counter()
+        CURRENT = _warm(_prepare(REGISTRY.artifact(version), version))
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - t0)
         MODEL_LOADED.set(1)
-    except Exception:
-        MODEL = None
+        MODEL_READY.set(1)
+        print(f"[mlaas] serving {version} ({CURRENT.bundle.get('storage', 'joblib')}), "
+              f"load+warmup {time.perf_counter() - t0:.2f} s (warmup {CURRENT.warmup_ms} ms)")
+    except Exception as ex:
+        CURRENT = None
         MODEL_LOADED.set(0)
-    return MODEL
-
-
-def ensure_df_with_features(payload: Dict[str, Any], expected_order: List[str]) -> pd.DataFrame:
+        MODEL_READY.set(0)
+        print(f"[mlaas][WARN] no model loaded: {ex}")
+    cand = REGISTRY.candidate
+    if cand:
+        try:
+            _set_candidate(cand["version"], cand["mode"], cand["rate"])
+        except Exception as ex:
+            print(f"[mlaas][WARN] candidate {cand['version']} not loaded: {ex}")
+    return CURRENT.bundle if CURRENT is not None else None
+
+
+def _activate(loaded: _LoadedModel, rollback: bool = False):
+    """Postavlja proveren model kao trenutni (registar, MODEL_PATH, CURRENT)."""
+    global CURRENT
+    if rollback:
+        REGISTRY.rollback(loaded.version)
+    else:
+        REGISTRY.set_current(loaded.version)
+    _mirror(loaded.version)
+    CURRENT = _warm(loaded)
+    MODEL_LOADED.set(1)
+    MODEL_READY.set(1)
+    if CANDIDATE is not None and CANDIDATE.model.version == loaded.version:
+        _set_candidate(None)
+        if REGISTRY.candidate:
+            REGISTRY.clear_candidate()
+
+
+def _register_trained(tmp_path: str, result: Dict[str, Any]) -> str:
+    """
+    Model iz /train: provera (probni redovi, tačnost bar TRAIN_MIN_ACCURACY),
+    upis u registar kao nova verzija i, sa TRAIN_AUTO_PROMOTE, promocija.
+    Neuspela provera ne menja ni registar ni model koji služi.
+    """
+    # staging fajl se proverava direktno (joblib); mmap export se pravi tek za verziju u registru
+    loaded = _prepare(tmp_path, "staging", storage="joblib")
+    _check(loaded)
+    metrics = result.get("metrics") or {}
+    accuracy = metrics.get("accuracy") or 0.0
+    if accuracy < TRAIN_MIN_ACCURACY:
+        raise ValueError(f"tačnost {accuracy:.3f} < TRAIN_MIN_ACCURACY {TRAIN_MIN_ACCURACY:.3f}")
+
+    meta = _bundle_meta(loaded.bundle)
+    incremental = result.get("mode") == "incremental"
+    meta.update({
+        "source": "incremental" if incremental else "train",
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "train_seconds": result.get("train_seconds"),
+        "csv_path": None if incremental else CSV_PATH,
+        "base_version": result.get("base_version"),
+        # poslednji red tabele deliveries uključen u model (isti je i u artefaktu)
+        "watermark": loaded.bundle.get("watermark"),
+        "metrics": metrics,
+    })
+    with _SWAP_LOCK:
+        version = REGISTRY.add(tmp_path, meta)
+        if TRAIN_AUTO_PROMOTE:
+            if MODEL_STORAGE == "mmap":
+                loaded = _prepare(REGISTRY.artifact(version), version)
+            _activate(loaded._replace(version=version))
+    return version
+
+
+def _sync_registry():
     """
-    Iz zahteva pravi DataFrame sa kolonama tačno onim redosledom koje je model
-    imao na treningu (case-insensitive mapiranje).
+    Sa --workers N promociju, rollback i kandidata menja proces koji je primio
+    zahtev; ostali ih preuzimaju iz registry.json (model se učita i zagreje pre zamene).
     """
-    data = payload.copy()
-    if "area" not in data and "city" in data:
-        data["area"] = data.pop("city")
-
-    lower_map = {k.lower(): v for k, v in data.items()}
-
-    row = []
-    for col in expected_order:
-        v = None
-        if col.lower() in lower_map:
-            v = lower_map[col.lower()]
-        else:
-            if col.lower() in ("hour", "weekday"):
-                v = 12 if col.lower() == "hour" else 3
+    global CURRENT
+    REGISTRY.reload()
+    with _SWAP_LOCK:
+        version = REGISTRY.current
+        if version is not None and (CURRENT is None or CURRENT.version != version):
+            CURRENT = _warm(_prepare(REGISTRY.artifact(version), version))
+            MODEL_LOADED.set(1)
+            MODEL_READY.set(1)
+            print(f"[mlaas] registry changed, serving {version}")
+        cand = REGISTRY.candidate
+        want = (cand["version"], cand["mode"], cand["rate"]) if cand else None
+        have = (CANDIDATE.model.version, CANDIDATE.mode, CANDIDATE.rate) if CANDIDATE is not None else None
+        if want != have:
+            if want is None:
+                _set_candidate(None)
             else:
-                v = 0
-        row.append(v)
+                _set_candidate(*want)
+            print(f"[mlaas] registry changed, candidate {want[0] if want else None}")
+
+
+async def _load_and_watch():
+    """Učitavanje i warm-up van startup-a (GET /health odgovara odmah, /ready tek posle), pa praćenje registra."""
+    def initial():
+        try:
+            _bootstrap_registry()
+        except Exception as ex:
+            print(f"[mlaas][WARN] could not import {MODEL_PATH} into registry: {ex}")
+        with _SWAP_LOCK:
+            load_model()
+
+    await run_in_threadpool(initial)
+    failed = None
+    while REGISTRY_POLL_SEC > 0:
+        await asyncio.sleep(REGISTRY_POLL_SEC)
+        try:
+            await run_in_threadpool(_sync_registry)
+            failed = None
+        except Exception as ex:
+            if str(ex) != failed:
+                print(f"[mlaas][WARN] registry sync failed: {ex}")
+            failed = str(ex)
+
 
-    X_df = pd.DataFrame([row], columns=[c.lower() for c in expected_order])
-    return X_df
+def _training_finished(status: str):
+    TRAIN_JOBS.labels(status=status).inc()
+    TRAIN_RUNNING.set(0)
 
 
 class PredictIn(BaseModel):
@@ -79,34 +383,62 @@ class PredictIn(BaseModel):
 
 
 @app.on_event("startup")
-def _startup():
-    load_model()
+async def _startup():
+    global BATCHER, JOBS, REGISTRY, SHADOW
+    REGISTRY = ModelRegistry(MODEL_REGISTRY_DIR)
+    SHADOW = ShadowScorer(_predict_proba, LATE_DECISION_THRESHOLD, SHADOW_QUEUE_MAX)
+    MODEL_READY.set(0)
+    asyncio.get_running_loop().create_task(_load_and_watch())
+    JOBS = TrainingJobs(_register_trained, on_finish=_training_finished)
+    if PREDICT_BATCHING:
+        BATCHER = DynamicBatcher(
+            _score, PREDICT_BATCHING_MAX_ROWS, PREDICT_BATCHING_WAIT_MS,
+            batch_rows=DYN_BATCH_ROWS, queue_wait=DYN_QUEUE_WAIT,
+        )
+        BATCHER.start()
+        print(f"[mlaas] /predict batching: <= {PREDICT_BATCHING_MAX_ROWS} rows, wait <= {PREDICT_BATCHING_WAIT_MS} ms")
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    global BATCHER
+    if BATCHER is not None:
+        await BATCHER.stop()
+        BATCHER = None
+    if JOBS is not None:
+        JOBS.shutdown()
 
 
 @app.get("/health")
 def health():
     REQ_COUNTER.labels(endpoint="/health").inc()
-    return {"status": "ok", "has_model": MODEL is not None}
-
-
-@app.post("/predict")
-def predict(req: PredictIn):
-    REQ_COUNTER.labels(endpoint="/predict").inc()
-
-    if MODEL is None:
-        raise HTTPException(status_code=503, detail="Model nije učitan")
+    current = CURRENT
+    return {
+        "status": "ok",
+        "has_model": current is not None,
+        "model_version": current.version if current is not None else None,
+    }
 
-    model = MODEL["model"]
-    feat_names = MODEL.get("feature_names_in")
-    threshold_min = MODEL.get("threshold_min", SLA_THRESHOLD_MIN)
 
-    if feat_names is None:
-        raise HTTPException(status_code=500, detail="Model nema meta informaciju 'feature_names_in'")
+@app.get("/ready")
+def ready():
+    """Spremnost procesa: model učitan i warm-up predikcija završena (503 do tada)."""
+    REQ_COUNTER.labels(endpoint="/ready").inc()
+    current = CURRENT
+    is_ready = current is not None and current.warmup_ms is not None
+    body = {
+        "ready": is_ready,
+        "model_version": current.version if current is not None else None,
+        "storage": current.bundle.get("storage", "joblib") if current is not None else None,
+        "warmup_ms": current.warmup_ms if current is not None else None,
+        "pid": os.getpid(),
+    }
+    return body if is_ready else JSONResponse(status_code=503, content=body)
 
-    area_value = req.area if req.area is not None else req.city
 
-    payload = {
-        "area": area_value,
+def _payload(req: PredictIn) -> Dict[str, Any]:
+    return {
+        "area": req.area if req.area is not None else req.city,
         "weather": req.weather,
         "traffic": req.traffic,
         "distanceKm": req.distanceKm,
@@ -114,16 +446,73 @@ def predict(req: PredictIn):
         "weekday": req.weekday,
     }
 
+
+def _predict_proba(current: _LoadedModel, payloads: List[Dict[str, Any]]) -> np.ndarray:
+    model = current.bundle["model"]
+    feat_names = current.bundle["feature_names_in"]
+    if current.encoder is not None:
+        return current.encoder.predict_proba(payloads)[:, 1]
+    if current.forest is not None:
+        X = model[:-1].transform(features_frame(payloads, feat_names))
+        return current.forest.predict_proba(X)[:, 1]
+    return model.predict_proba(features_frame(payloads, feat_names))[:, 1]
+
+
+def _score(payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Jedna matrica feature-a i jedan predict_proba za sve redove; rezultati istim redosledom."""
+    current, candidate = CURRENT, CANDIDATE
+    if current is None:
+        raise HTTPException(status_code=503, detail="Model nije učitan")
+
+    served = current
+    if candidate is not None and candidate.mode == "canary" and random.random() < candidate.rate:
+        served = candidate.model
+        CANARY_SERVED.inc(len(payloads))
+
+    threshold_min = float(served.bundle.get("threshold_min", SLA_THRESHOLD_MIN))
     with PRED_LATENCY.time():
-        X_df = ensure_df_with_features(payload, feat_names)
-        proba = float(model.predict_proba(X_df)[0][1])
-        late = int(proba >= LATE_DECISION_THRESHOLD)
+        probas = _predict_proba(served, payloads)
 
-    return {
-        "late": late,
-        "proba_late": round(proba, 3),
-        "threshold_min": float(threshold_min),
-    }
+    if candidate is not None and candidate.mode == "shadow" and random.random() < candidate.rate:
+        SHADOW.submit(candidate.model, payloads, probas)
+
+    out = [
+        {
+            "late": int(p >= LATE_DECISION_THRESHOLD),
+            "proba_late": round(float(p), 3),
+            "threshold_min": threshold_min,
+            "model_version": served.version,
+        }
+        for p in probas
+    ]
+    if served is not current:
+        for o in out:
+            o["canary"] = True
+    return out
+
+
+@app.post("/predict")
+async def predict(req: PredictIn):
+    REQ_COUNTER.labels(endpoint="/predict").inc()
+    if CURRENT is None:
+        raise HTTPException(status_code=503, detail="Model nije učitan")
+    if BATCHER is not None:
+        return await BATCHER.predict(_payload(req))
+    return (await run_in_threadpool(_score, [_payload(req)]))[0]
+
+
+@app.post("/predict_batch")
+def predict_batch(reqs: List[PredictIn]):
+    """Više zahteva odjednom (npr. micro-batch iz Analytics-a); odgovor {"predictions": [...]} istim redosledom."""
+    REQ_COUNTER.labels(endpoint="/predict_batch").inc()
+
+    if len(reqs) > PREDICT_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"Najviše {PREDICT_BATCH_MAX} redova po zahtevu, poslato {len(reqs)}")
+    BATCH_ROWS.observe(len(reqs))
+    if not reqs:
+        return {"predictions": []}
+
+    return {"predictions": _score([_payload(r) for r in reqs])}
 
 
 @app.get("/metrics")
@@ -133,157 +522,154 @@ def metrics():
     return Response(content=data, media_type=CONTENT_TYPE_LATEST)
 
 
-@app.post("/train")
-def train():
+@app.post("/train", status_code=202)
+def train(mode: Literal["full", "incremental"] = "full"):
     """
-    Ponovno treniranje unutar servisa (učitava CSV_PATH, trenira i snima model na MODEL_PATH),
-    sa istom logikom kao train.py – ali lokalno ovde radi bez forkovanja procesa.
+    Pokreće ponovno treniranje u posebnom procesu i odmah vraća posao; stanje
+    i napredak su na GET /train/{job_id}. Novi model ulazi u registar (i
+    postaje trenutni) tek kada prođe proveru (_register_trained).
+
+    mode=full: ceo CSV_PATH od nule. mode=incremental: trenutni model se
+    ažurira samo novim redovima tabele deliveries posle njegovog watermark-a.
     """
     REQ_COUNTER.labels(endpoint="/train").inc()
-
+    incremental = None
+    if mode == "incremental":
+        if not DATABASE_URL:
+            raise HTTPException(status_code=400, detail="Inkrementalni trening zahteva DATABASE_URL")
+        base_version = REGISTRY.current
+        if base_version is None:
+            raise HTTPException(status_code=409, detail="Nema trenutnog modela za inkrementalni trening")
+        incremental = {
+            "database_url": DATABASE_URL,
+            "base_path": REGISTRY.artifact(base_version),
+            "base_version": base_version,
+            "chunk_rows": INCREMENTAL_CHUNK_ROWS,
+            "trees_per_chunk": INCREMENTAL_TREES_PER_CHUNK,
+            "max_trees": INCREMENTAL_MAX_TREES,
+            "min_rows": INCREMENTAL_MIN_ROWS,
+            "settle_sec": INCREMENTAL_SETTLE_SEC,
+        }
+    TRAIN_RUNNING.set(1)
     try:
-        from sklearn.model_selection import train_test_split
-        from sklearn.compose import ColumnTransformer
-        from sklearn.preprocessing import OneHotEncoder, StandardScaler
-        from sklearn.pipeline import Pipeline
-        from sklearn.ensemble import RandomForestClassifier
-        from sklearn.metrics import classification_report
-
-        def pick(cols, *cands):
-            norm = {c.lower().replace("_", "").replace(" ", ""): c for c in cols}
-            for cand in cands:
-                k = cand.lower().replace("_", "").replace(" ", "")
-                if k in norm:
-                    return norm[k]
-            raise KeyError(f"Missing column. Tried: {cands}, has: {sorted(cols)}")
-
-        def haversine_km(lat1, lon1, lat2, lon2):
-            R = 6371.0
-            p = math.pi / 180.0
-            dlat = (lat2 - lat1) * p
-            dlon = (lon2 - lon1) * p
-            a = (np.sin(dlat / 2) ** 2 +
-                 np.cos(lat1 * p) * np.cos(lat2 * p) * np.sin(dlon / 2) ** 2)
-            c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
-            return R * c
-
-        import math
-
-        df_raw = pd.read_csv(CSV_PATH)
-        cols = list(df_raw.columns)
-
-        area_col    = pick(cols, "area", "city", "region")
-        weather_col = pick(cols, "weather")
-        traffic_col = pick(cols, "traffic")
-        vehicle_col = None
-        try:
-            vehicle_col = pick(cols, "vehicle", "vehicle_type")
-        except KeyError:
-            pass
-        cat_col = None
-        try:
-            cat_col = pick(cols, "category")
-        except KeyError:
-            pass
-        agent_age_col = None
-        agent_rating_col = None
-        try:
-            agent_age_col = pick(cols, "agent_age")
-        except KeyError:
-            pass
-        try:
-            agent_rating_col = pick(cols, "agent_rating")
-        except KeyError:
-            pass
+        return JOBS.start(CSV_PATH, REGISTRY.staging_path(), SLA_THRESHOLD_MIN, TRAIN_CACHE_DIR or None, incremental)
+    except RuntimeError as ex:
+        raise HTTPException(status_code=409, detail={"message": str(ex), "job": JOBS.running()})
 
-        store_lat_col = store_lon_col = drop_lat_col = drop_lon_col = None
-        try:
-            store_lat_col = pick(cols, "store_latitude", "store_lat")
-            store_lon_col = pick(cols, "store_longitude", "store_lon")
-            drop_lat_col  = pick(cols, "drop_latitude", "drop_lat")
-            drop_lon_col  = pick(cols, "drop_longitude", "drop_lon")
-        except KeyError:
-            pass
-
-        order_date_col = order_time_col = None
-        try:
-            order_date_col = pick(cols, "order_date", "date")
-            order_time_col = pick(cols, "order_time", "time")
-        except KeyError:
-            pass
-
-        delivery_time_col = pick(cols, "delivery_time", "timetakenmin", "time_taken_min")
-
-        df = df_raw.copy()
-
-        if all([store_lat_col, store_lon_col, drop_lat_col, drop_lon_col]):
-            df["distanceKm"] = haversine_km(
-                df[store_lat_col].astype(float),
-                df[store_lon_col].astype(float),
-                df[drop_lat_col].astype(float),
-                df[drop_lon_col].astype(float),
-            )
-        else:
-            df["distanceKm"] = 0.0
-
-        if order_date_col and order_time_col:
-            ts = pd.to_datetime(df[order_date_col] + " " + df[order_time_col], errors="coerce", utc=True)
-        else:
-            ts = pd.date_range("2025-01-01", periods=len(df), freq="h", tz="UTC")
-
-        df["hour"] = ts.hour
-        df["weekday"] = ts.weekday
-        df["late"] = (df[delivery_time_col].astype(float) > SLA_THRESHOLD_MIN).astype(int)
-
-        cat_cols = [area_col, weather_col, traffic_col]
-        if vehicle_col:
-            cat_cols.append(vehicle_col)
-        if cat_col:
-            cat_cols.append(cat_col)
-
-        num_cols = ["distanceKm", "hour", "weekday"]
-        if agent_age_col:
-            num_cols.append(agent_age_col)
-        if agent_rating_col:
-            num_cols.append(agent_rating_col)
-
-        X = df[cat_cols + num_cols].copy()
-        X.columns = [c.lower() for c in X.columns]
-        y = df["late"]
-
-        pre = ColumnTransformer(
-            transformers=[
-                ("num", StandardScaler(), [c.lower() for c in num_cols]),
-                ("cat", OneHotEncoder(handle_unknown="ignore"), [c.lower() for c in cat_cols]),
-            ]
-        )
-        clf = RandomForestClassifier(
-            n_estimators=200,
-            random_state=42,
-            class_weight="balanced"
-        )
-        pipe = Pipeline([("pre", pre), ("clf", clf)])
-
-        X_tr, X_te, y_tr, y_te = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-        pipe.fit(X_tr, y_tr)
-        y_pr = pipe.predict(X_te)
-        report = classification_report(y_te, y_pr)
-
-        payload = {
-            "model": pipe,
-            "threshold_min": SLA_THRESHOLD_MIN,
-            "feature_names_in": list(X.columns),
-            "class_labels": sorted(list(np.unique(y)))
-        }
-        dump(payload, MODEL_PATH)
 
-        load_model()
+@app.get("/train")
+def train_jobs():
+    REQ_COUNTER.labels(endpoint="/train/jobs").inc()
+    return {"jobs": JOBS.list()}
+
+
+@app.get("/train/{job_id}")
+def train_job(job_id: str):
+    REQ_COUNTER.labels(endpoint="/train/job").inc()
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Nepoznat posao {job_id}")
+    return job
+
+
+class CandidateIn(BaseModel):
+    version: str
+    mode: Literal["shadow", "canary"] = "shadow"
+    rate: float = Field(default=0.1, ge=0.0, le=1.0, description="Udeo zahteva koji ide kandidatu")
 
-        return {
-            "status": "ok",
-            "message": "Model retrained",
-            "log_tail": report[-500:]
-        }
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+def _version_info(meta: Dict[str, Any]) -> Dict[str, Any]:
+    candidate = REGISTRY.candidate
+    return dict(
+        meta,
+        current=meta["version"] == REGISTRY.current,
+        candidate=candidate if candidate and candidate["version"] == meta["version"] else None,
+    )
+
+
+@app.get("/models")
+def models():
+    REQ_COUNTER.labels(endpoint="/models").inc()
+    candidate = REGISTRY.candidate
+    if candidate:
+        candidate["stats"] = SHADOW.stats() if candidate["mode"] == "shadow" else None
+    return {
+        "current": REGISTRY.current,
+        "history": REGISTRY.history,
+        "candidate": candidate,
+        "versions": [_version_info(m) for m in REGISTRY.versions()],
+    }
+
+
+@app.get("/models/{version}")
+def model_version(version: str):
+    REQ_COUNTER.labels(endpoint="/models/version").inc()
+    meta = REGISTRY.meta(version)
+    if meta is None:
+        raise HTTPException(status_code=404, detail=f"Nepoznata verzija {version}")
+    return _version_info(meta)
+
+
+def _load_checked(version: str) -> _LoadedModel:
+    if not REGISTRY.exists(version):
+        raise HTTPException(status_code=404, detail=f"Nepoznata verzija {version}")
+    try:
+        loaded = _prepare(REGISTRY.artifact(version), version)
+        _check(loaded)
+    except Exception as ex:
+        raise HTTPException(status_code=422, detail=f"Verzija {version} nije prošla proveru: {ex}")
+    return loaded
+
+
+@app.post("/models/{version}/promote")
+def promote(version: str):
+    """Verzija iz registra postaje trenutni model (prethodna ide u istoriju za rollback)."""
+    REQ_COUNTER.labels(endpoint="/models/promote").inc()
+    with _SWAP_LOCK:
+        previous = REGISTRY.current
+        if version != previous:
+            _activate(_load_checked(version))
+    print(f"[mlaas] promoted {version} (previous {previous})")
+    return {"current": version, "previous": previous}
+
+
+@app.post("/models/rollback")
+def rollback():
+    """Vraća poslednju prethodnu verziju iz istorije promocija."""
+    REQ_COUNTER.labels(endpoint="/models/rollback").inc()
+    with _SWAP_LOCK:
+        current = REGISTRY.current
+        target = REGISTRY.previous()
+        if target is None:
+            raise HTTPException(status_code=409, detail="Nema prethodne verzije za rollback")
+        _activate(_load_checked(target), rollback=True)
+    print(f"[mlaas] rolled back {current} -> {target}")
+    return {"current": target, "rolled_back": current}
+
+
+@app.put("/models/candidate")
+def set_candidate(body: CandidateIn):
+    """
+    Kandidat verzija: `shadow` skoruje udeo `rate` zahteva u pozadini i poredi
+    sa trenutnim modelom (GET /models, mlaas_shadow_*), `canary` odgovara na
+    udeo `rate` zahteva (odgovor ima "canary": true i model_version kandidata).
+    """
+    REQ_COUNTER.labels(endpoint="/models/candidate").inc()
+    with _SWAP_LOCK:
+        if body.version == REGISTRY.current:
+            raise HTTPException(status_code=409, detail=f"{body.version} je već trenutni model")
+        loaded = _load_checked(body.version)
+        REGISTRY.set_candidate(body.version, body.mode, body.rate)
+        _set_candidate(body.version, body.mode, body.rate, loaded=loaded)
+    print(f"[mlaas] candidate {body.version}: {body.mode} at {body.rate:.0%}")
+    return REGISTRY.candidate
+
+
+@app.delete("/models/candidate")
+def clear_candidate():
+    REQ_COUNTER.labels(endpoint="/models/candidate").inc()
+    with _SWAP_LOCK:
+        stats = SHADOW.stats() if CANDIDATE is not None and CANDIDATE.mode == "shadow" else None
+        REGISTRY.clear_candidate()
+        _set_candidate(None)
+    return {"candidate": None, "last_stats": stats}
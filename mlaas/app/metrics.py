@@ -0,0 +1,35 @@
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry
+
+registry = CollectorRegistry()
+REQ_COUNTER = Counter("mlaas_requests_total", "Broj poziva endpointa", ["endpoint"], registry=registry)
+PRED_LATENCY = Histogram("mlaas_predict_latency_seconds", "Latencija predict() poziva", registry=registry)
+BATCH_ROWS = Histogram(
+    "mlaas_predict_batch_rows", "Broj redova po /predict_batch zahtevu",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048), registry=registry,
+)
+DYN_BATCH_ROWS = Histogram(
+    "mlaas_dynamic_batch_rows", "Broj /predict zahteva spojenih u jedan poziv modela",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256), registry=registry,
+)
+DYN_QUEUE_WAIT = Histogram(
+    "mlaas_dynamic_batch_queue_wait_seconds", "Čekanje /predict zahteva u redu do poziva modela",
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0), registry=registry,
+)
+MODEL_LOADED = Gauge("mlaas_model_loaded", "Da li je model učitan (1/0)", registry=registry)
+MODEL_READY = Gauge("mlaas_model_ready", "Da li je model učitan i zagrejan (GET /ready, 1/0)", registry=registry)
+MODEL_LOAD_SECONDS = Gauge(
+    "mlaas_model_load_seconds", "Učitavanje i warm-up modela pri startu procesa", registry=registry
+)
+TRAIN_RUNNING = Gauge("mlaas_training_running", "Da li je trening u toku (1/0)", registry=registry)
+TRAIN_JOBS = Counter("mlaas_training_jobs_total", "Završeni poslovi treniranja", ["status"], registry=registry)
+
+SHADOW_SCORED = Counter("mlaas_shadow_scored_total", "Redovi skorovani kandidatom u shadow režimu", registry=registry)
+SHADOW_DISAGREE = Counter(
+    "mlaas_shadow_disagreements_total", "Shadow redovi gde kandidat daje drugačiju odluku (late)", registry=registry
+)
+SHADOW_ABS_DIFF = Histogram(
+    "mlaas_shadow_proba_abs_diff", "|proba_late kandidata - proba_late trenutnog modela| u shadow režimu",
+    buckets=(0.001, 0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0), registry=registry,
+)
+SHADOW_DROPPED = Counter("mlaas_shadow_dropped_total", "Shadow zahtevi odbačeni jer je red pun", registry=registry)
+CANARY_SERVED = Counter("mlaas_canary_served_total", "Redovi na koje je odgovorio canary model", registry=registry)
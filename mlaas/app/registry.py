@@ -0,0 +1,194 @@
+"""
+Registar modela na disku:
+
+  <root>/<verzija>/model.pkl     artefakt (isti format kao train.py)
+  <root>/<verzija>/meta.json     vreme treniranja, metrike, feature-i, izvor
+  <root>/registry.json           trenutna verzija, istorija promocija, kandidat
+
+Svaki upis stanja ide preko privremenog fajla i os.replace, pa prekinut
+proces ne ostavlja polovično stanje. Izmene stanja drže fcntl zaključavanje
+(<root>/.registry.lock) i kreću od stanja sa diska, pa više procesa
+(uvicorn --workers N) deli isti registar; reload() preuzima tuđe izmene.
+"""
+import fcntl
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from deliveryml.features import artifact_version
+
+# najviše prethodnih verzija za rollback
+_HISTORY_MAX = 20
+
+
+def _write_json(path: str, data: Dict[str, Any]):
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+class ModelRegistry:
+    def __init__(self, root: str):
+        self.root = root
+        self._state_path = os.path.join(root, "registry.json")
+        self._lock_path = os.path.join(root, ".registry.lock")
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._mtime: Optional[int] = None
+        os.makedirs(root, exist_ok=True)
+        self._state = self._read_state()
+
+    def _state_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self._state_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _read_state(self) -> Dict[str, Any]:
+        self._mtime = self._state_mtime()
+        try:
+            with open(self._state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            state = {}
+        state.setdefault("current", None)
+        state.setdefault("history", [])
+        state.setdefault("candidate", None)
+        return state
+
+    def _save(self):
+        _write_json(self._state_path, self._state)
+        self._mtime = self._state_mtime()
+
+    @contextmanager
+    def locked(self):
+        """Izmena stanja isključiva i među procesima; unutra je stanje sveže pročitano sa diska."""
+        with self._lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+            with open(self._lock_path, "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                self._depth = 1
+                try:
+                    self._state = self._read_state()
+                    yield
+                finally:
+                    self._depth = 0
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def reload(self) -> bool:
+        """Ponovo čita registry.json ako ga je menjao drugi proces; True ako je stanje promenjeno."""
+        with self._lock:
+            if self._state_mtime() == self._mtime:
+                return False
+            old = self._state
+            self._state = self._read_state()
+            return self._state != old
+
+    # --- verzije ---
+    def artifact(self, version: str) -> str:
+        return os.path.join(self.root, version, "model.pkl")
+
+    def staging_path(self) -> str:
+        """Osnova za privremene fajlove treninga (isti fajl sistem kao registar, pa je os.replace atomski)."""
+        return os.path.join(self.root, "staging.pkl")
+
+    def exists(self, version: str) -> bool:
+        return os.path.isfile(self.artifact(version))
+
+    def meta(self, version: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.root, version, "meta.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def versions(self) -> List[Dict[str, Any]]:
+        out = []
+        for name in os.listdir(self.root):
+            meta = self.meta(name) if os.path.isdir(os.path.join(self.root, name)) else None
+            if meta is not None:
+                out.append(meta)
+        return sorted(out, key=lambda m: m.get("created_at", ""), reverse=True)
+
+    def add(self, src_path: str, meta: Dict[str, Any], move: bool = True) -> str:
+        """Upisuje artefakt kao novu verziju (premešta src_path ili ga kopira) i vraća verziju."""
+        version = time.strftime("%Y%m%d-%H%M%S", time.gmtime()) + "-" + uuid.uuid4().hex[:6]
+        vdir = os.path.join(self.root, version)
+        os.makedirs(vdir)
+        dst = self.artifact(version)
+        if move:
+            os.replace(src_path, dst)
+        else:
+            shutil.copy2(src_path, f"{dst}.tmp")
+            os.replace(f"{dst}.tmp", dst)
+        meta = dict(meta)
+        meta.update({
+            "version": version,
+            "created_at": meta.get("created_at") or time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "artifact_version": artifact_version(dst),
+            "size_bytes": os.path.getsize(dst),
+        })
+        _write_json(os.path.join(vdir, "meta.json"), meta)
+        return version
+
+    # --- stanje ---
+    @property
+    def current(self) -> Optional[str]:
+        return self._state["current"]
+
+    @property
+    def history(self) -> List[str]:
+        return list(self._state["history"])
+
+    @property
+    def candidate(self) -> Optional[Dict[str, Any]]:
+        cand = self._state["candidate"]
+        return dict(cand) if cand else None
+
+    def set_current(self, version: str):
+        with self.locked():
+            old = self._state["current"]
+            if old == version:
+                return
+            if old is not None:
+                self._state["history"] = ([old] + [v for v in self._state["history"] if v != old])[:_HISTORY_MAX]
+            self._state["current"] = version
+            cand = self._state["candidate"]
+            if cand and cand.get("version") == version:
+                self._state["candidate"] = None
+            self._save()
+
+    def previous(self) -> Optional[str]:
+        for version in self._state["history"]:
+            if version != self._state["current"] and self.exists(version):
+                return version
+        return None
+
+    def rollback(self, version: str):
+        """Vraća prethodnu verziju; trenutna se ne upisuje u istoriju (rollback se ne vraća sam na sebe)."""
+        with self.locked():
+            self._state["history"] = [v for v in self._state["history"] if v != version]
+            self._state["current"] = version
+            self._save()
+
+    def set_candidate(self, version: str, mode: str, rate: float):
+        with self.locked():
+            self._state["candidate"] = {"version": version, "mode": mode, "rate": rate}
+            self._save()
+
+    def clear_candidate(self):
+        with self.locked():
+            self._state["candidate"] = None
+            self._save()
@@ -0,0 +1,77 @@
+import queue
+import threading
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from app.metrics import SHADOW_ABS_DIFF, SHADOW_DISAGREE, SHADOW_DROPPED, SHADOW_SCORED
+
+
+class ShadowScorer:
+    """
+    Skoruje uzorak saobraćaja kandidat modelom van putanje zahteva.
+
+    Zahtev samo ubaci (model, redove, verovatnoće trenutnog modela) u
+    ograničen red i odmah vraća odgovor; posebna nit računa predikciju
+    kandidata i upoređuje je sa trenutnom. Kada je red pun, uzorak se odbacuje.
+    """
+
+    def __init__(self, predict: Callable[[Any, List[Dict[str, Any]]], np.ndarray], threshold: float,
+                 max_queue: int = 256):
+        self._predict = predict
+        self._threshold = threshold
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._version = None
+        self._stats = self._empty_stats()
+        threading.Thread(target=self._run, name="mlaas-shadow", daemon=True).start()
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, Any]:
+        return {"scored": 0, "disagreements": 0, "abs_diff_sum": 0.0, "dropped": 0, "errors": 0}
+
+    def submit(self, candidate, payloads: List[Dict[str, Any]], primary: np.ndarray):
+        try:
+            self._queue.put_nowait((candidate, payloads, primary))
+        except queue.Full:
+            SHADOW_DROPPED.inc()
+            with self._lock:
+                self._stats["dropped"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Zbirno poređenje za trenutnog kandidata (od postavljanja kandidata)."""
+        with self._lock:
+            s = dict(self._stats)
+            version = self._version
+        s["version"] = version
+        s["disagreement_rate"] = s["disagreements"] / s["scored"] if s["scored"] else None
+        s["mean_abs_diff"] = s.pop("abs_diff_sum") / s["scored"] if s["scored"] else None
+        return s
+
+    def reset(self, version):
+        with self._lock:
+            self._version = version
+            self._stats = self._empty_stats()
+
+    def _run(self):
+        while True:
+            candidate, payloads, primary = self._queue.get()
+            try:
+                shadow = self._predict(candidate, payloads)
+            except Exception as ex:
+                with self._lock:
+                    self._stats["errors"] += 1
+                print(f"[mlaas][WARN] shadow scoring with {candidate.version} failed: {ex}")
+                continue
+            diff = np.abs(shadow - primary)
+            disagree = int(((shadow >= self._threshold) != (primary >= self._threshold)).sum())
+            SHADOW_SCORED.inc(len(payloads))
+            SHADOW_DISAGREE.inc(disagree)
+            for d in diff:
+                SHADOW_ABS_DIFF.observe(float(d))
+            with self._lock:
+                if candidate.version != self._version:
+                    continue
+                self._stats["scored"] += len(payloads)
+                self._stats["disagreements"] += disagree
+                self._stats["abs_diff_sum"] += float(diff.sum())
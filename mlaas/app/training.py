@@ -0,0 +1,395 @@
+"""
+Treniranje modela kao pozadinski posao (POST /train).
+
+Trening (učitavanje CSV-a, feature-i, RandomForest) radi u posebnom procesu,
+pa ne drži FastAPI nit i ne bori se za GIL sa /predict. Proces javlja napredak
+kroz red poruka, a gotov model upisuje u privremeni fajl; MLaaS ga tek posle
+provere (main._register_trained) upisuje u registar verzija.
+"""
+import copy
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+import warnings
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from deliveryml.features import CATEGORICAL_COLUMNS, FEATURE_COLUMNS, NUMERIC_COLUMNS
+
+# broj stabala koji se dodaje po koraku (napredak tokom fit-a)
+_FIT_STEPS = 10
+
+
+def make_preprocessor(dense: bool = False):
+    """ColumnTransformer ulaza modela (StandardScaler + OneHotEncoder); dense=True za estimatore bez sparse ulaza."""
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    return ColumnTransformer(
+        transformers=[
+            ("num", StandardScaler(), list(NUMERIC_COLUMNS)),
+            ("cat", OneHotEncoder(handle_unknown="ignore"), list(CATEGORICAL_COLUMNS)),
+        ],
+        **({"sparse_threshold": 0.0} if dense else {}),
+    )
+
+
+def fit_pipeline(X, y, progress: Callable[[str, float], None]) -> Tuple[Any, Dict[str, Any], str]:
+    """Pipeline(ColumnTransformer, RandomForest(200)) od nule; vraća (pipeline, metrike, izveštaj)."""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, classification_report, f1_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.pipeline import Pipeline
+
+    pre = make_preprocessor()
+    n_estimators = 200
+    clf = RandomForestClassifier(
+        n_estimators=n_estimators // _FIT_STEPS,
+        random_state=42,
+        class_weight="balanced",
+        warm_start=True,
+    )
+
+    X_tr, X_te, y_tr, y_te = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    Xt_tr = pre.fit_transform(X_tr, y_tr)
+
+    # stabla se dodaju u koracima (warm_start) radi napretka; sa istim random_state
+    # rezultat je isti kao jedan fit sa n_estimators=200
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message=".*class_weight presets.*")
+        for step in range(1, _FIT_STEPS + 1):
+            clf.n_estimators = n_estimators * step // _FIT_STEPS
+            progress("fitting", 0.2 + 0.7 * (step - 1) / _FIT_STEPS)
+            clf.fit(Xt_tr, y_tr)
+    clf.warm_start = False
+    pipe = Pipeline([("pre", pre), ("clf", clf)])
+
+    progress("evaluating", 0.9)
+    y_pr = pipe.predict(X_te)
+    metrics = {
+        "accuracy": float(accuracy_score(y_te, y_pr)),
+        "f1": float(f1_score(y_te, y_pr, zero_division=0)),
+        "train_rows": int(len(X_tr)),
+        "test_rows": int(len(X_te)),
+    }
+    return pipe, metrics, classification_report(y_te, y_pr)
+
+
+def train_model(csv_path: str, sla_threshold_min: float, progress: Callable[[str, float], None],
+                cache_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Trenira Pipeline(ColumnTransformer, RandomForest) nad CSV-om i vraća
+    {"payload": artefakt za model.pkl, "metrics": {...}, "log_tail": "...", "prep": {...}}.
+    Feature-i su isti kao u train.py (deliveryml.training_data, Parquet keš u `cache_dir`).
+    """
+    import numpy as np
+    from deliveryml.training_data import load_frame, training_xy
+
+    progress("loading", 0.0)
+    frame, prep = load_frame(csv_path, cache_dir)
+    progress("features", 0.1)
+    X, y = training_xy(frame, sla_threshold_min)
+    pipe, metrics, report = fit_pipeline(X, y, progress)
+
+    return {
+        "payload": {
+            "model": pipe,
+            "threshold_min": sla_threshold_min,
+            "feature_names_in": list(FEATURE_COLUMNS),
+            "class_labels": sorted(list(np.unique(y))),
+            # full trening iz CSV-a ne zna za tabelu deliveries; inkrementalni kreće od početka tabele
+            "watermark": None,
+        },
+        "metrics": metrics,
+        "log_tail": report[-500:],
+        "prep": prep,
+        "mode": "full",
+    }
+
+
+def update_model(bundle: Dict[str, Any], chunks, sla_threshold_min: float, progress: Callable[[str, float], None],
+                 total_rows: int, trees_per_chunk: int = 20, max_trees: int = 400,
+                 holdout: float = 0.2, holdout_max: int = 20000) -> Dict[str, Any]:
+    """
+    Inkrementalno ažuriranje postojećeg Pipeline(ColumnTransformer, RandomForest):
+    za svaki deo novih redova (`chunks`: (frame, watermark)) dodaje se
+    `trees_per_chunk` stabala treniranih samo na tom delu (warm_start), a kada
+    šuma pređe `max_trees`, najstarija stabla se izbacuju. ColumnTransformer
+    ostaje kakav je (nove kategorije su "nepoznate", kao na /predict).
+
+    Deo sa samo jednom klasom se spaja sa sledećim; redovi koji na kraju ostanu
+    neiskorišćeni nisu uključeni u watermark. Od svakog dela `holdout` redova
+    ide u test skup, na kome se porede osnovni i ažurirani model.
+    """
+    import numpy as np
+    import pandas as pd
+    from sklearn.metrics import accuracy_score, f1_score
+
+    from deliveryml.training_data import training_xy
+
+    model = bundle["model"]
+    pre, clf = model[:-1], model.steps[-1][1]
+    if not hasattr(clf, "estimators_") or not hasattr(clf, "warm_start"):
+        raise ValueError(f"model {type(clf).__name__} ne podržava inkrementalni trening (potrebna je šuma sa warm_start)")
+    base_classes = list(clf.classes_)
+    base_trees = list(clf.estimators_)
+    rng = np.random.default_rng(int(clf.random_state or 0) + len(base_trees))
+
+    watermark = bundle.get("watermark")
+    pending: Optional[pd.DataFrame] = None
+    tests: List[pd.DataFrame] = []
+    seen = used = train_rows = chunks_fitted = 0
+    clf.warm_start = True
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message=".*class_weight presets.*")
+        for frame, chunk_watermark in chunks:
+            seen += len(frame)
+            progress("fitting", 0.1 + 0.8 * min(1.0, seen / max(1, total_rows)))
+            frame = frame if pending is None else pd.concat([pending, frame], ignore_index=True)
+            is_test = rng.random(len(frame)) < holdout
+            X, y = training_xy(frame[~is_test], sla_threshold_min)
+            if sorted(y.unique()) != base_classes:
+                pending = frame
+                continue
+            pending = None
+            tests.append(frame[is_test])
+            # novo seme po delu: sa punom šumom (max_trees) warm_start bi inače ponavljao ista semena stabala
+            clf.random_state = int(rng.integers(2 ** 31 - 1))
+            clf.n_estimators = len(clf.estimators_) + trees_per_chunk
+            clf.fit(pre.transform(X), y)
+            if len(clf.estimators_) > max_trees:
+                clf.estimators_ = clf.estimators_[-max_trees:]
+                clf.n_estimators = max_trees
+            used += len(frame)
+            train_rows += len(X)
+            chunks_fitted += 1
+            watermark = chunk_watermark
+    clf.warm_start = False
+    if not chunks_fitted:
+        raise ValueError("novi redovi nemaju obe klase, model nije ažuriran")
+
+    progress("evaluating", 0.9)
+    test = pd.concat(tests, ignore_index=True).iloc[-holdout_max:]
+    X_te, y_te = training_xy(test, sla_threshold_min)
+    y_pr = model.predict(X_te)
+    base = copy.copy(clf)
+    base.estimators_ = base_trees
+    base.n_estimators = len(base_trees)
+    base_pr = base.predict(pre.transform(X_te)) if len(X_te) else y_pr
+
+    payload = dict(bundle, model=model, watermark=watermark)
+    return {
+        "payload": payload,
+        "metrics": {
+            "accuracy": float(accuracy_score(y_te, y_pr)) if len(X_te) else None,
+            "f1": float(f1_score(y_te, y_pr, zero_division=0)) if len(X_te) else None,
+            "base_accuracy": float(accuracy_score(y_te, base_pr)) if len(X_te) else None,
+            "train_rows": int(train_rows),
+            "test_rows": int(len(test)),
+            "new_rows": int(seen),
+            "unused_rows": int(seen - used),
+            "chunks": chunks_fitted,
+            "trees": len(clf.estimators_),
+        },
+        "watermark": watermark,
+    }
+
+
+def train_incremental(database_url: str, base_path: str, sla_threshold_min: float,
+                      progress: Callable[[str, float], None], base_version: Optional[str] = None,
+                      chunk_rows: int = 5000, trees_per_chunk: int = 20, max_trees: int = 400,
+                      min_rows: int = 500, settle_sec: float = 60.0) -> Dict[str, Any]:
+    """
+    Učitava osnovni model, čita nove i izmenjene redove iz tabele deliveries
+    posle njegovog watermark-a (updated_at starije od `settle_sec`) i ažurira ga.
+    """
+    import sqlalchemy as sa
+    from joblib import load
+
+    from deliveryml.training_data import change_horizon, count_deliveries, read_deliveries
+
+    progress("loading", 0.0)
+    bundle = load(base_path)
+    engine = sa.create_engine(database_url, pool_pre_ping=True)
+    try:
+        watermark = bundle.get("watermark")
+        until = change_horizon(engine, settle_sec)
+        total = count_deliveries(engine, watermark, until)
+        if total < min_rows:
+            raise _Skipped(f"{total} novih redova posle watermark-a (najmanje {min_rows})")
+        result = update_model(bundle, read_deliveries(engine, watermark, chunk_rows, until), sla_threshold_min, progress,
+                              total, trees_per_chunk=trees_per_chunk, max_trees=max_trees)
+    finally:
+        engine.dispose()
+    result["log_tail"] = (f"base watermark {watermark}, new watermark {result['watermark']}, "
+                          f"metrics {result['metrics']}")[-500:]
+    result["mode"] = "incremental"
+    result["base_version"] = base_version
+    return result
+
+
+class _Skipped(Exception):
+    """Nema dovoljno novih podataka; posao se završava kao `skipped`, bez novog modela."""
+
+
+def run_job(csv_path: str, out_path: str, sla_threshold_min: float, messages, cache_dir: Optional[str] = None,
+            incremental: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Ulaz procesa za trening: napredak, pa ("done", rezultat), ("skipped", razlog)
+    ili ("error", poruka). Sa `incremental` (argumenti train_incremental) se
+    ažurira postojeći model iz baze umesto treninga iz CSV-a.
+    """
+    from joblib import dump
+
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+    try:
+        t0 = time.time()
+        progress = lambda stage, p: messages.put(("progress", stage, p))
+        if incremental is not None:
+            result = train_incremental(sla_threshold_min=sla_threshold_min, progress=progress, **incremental)
+        else:
+            result = train_model(csv_path, sla_threshold_min, progress, cache_dir)
+        messages.put(("progress", "saving", 0.95))
+        dump(result.pop("payload"), out_path)
+        result["train_seconds"] = round(time.time() - t0, 3)
+        messages.put(("done", result))
+    except _Skipped as ex:
+        messages.put(("skipped", str(ex)))
+    except Exception as ex:
+        messages.put(("error", f"{type(ex).__name__}: {ex}", traceback.format_exc()[-2000:]))
+
+
+class TrainingJobs:
+    """
+    Pozadinski poslovi treniranja; najviše jedan u isto vreme.
+
+    `install(tmp_path, result)` se poziva iz niti posmatrača kada proces
+    uspešno završi; treba da proveri model i zameni trenutni (vraća verziju)
+    ili da baci izuzetak, kada se posao označava kao neuspeo.
+    """
+
+    def __init__(self, install: Callable[[str, Dict[str, Any]], str], keep: int = 20, on_finish=None):
+        self._install = install
+        self._on_finish = on_finish
+        self._keep = keep
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._procs: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._ctx = mp.get_context("spawn")
+
+    def running(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for job in self._jobs.values():
+                if job["status"] in ("queued", "running", "validating"):
+                    return dict(job)
+        return None
+
+    def start(self, csv_path: str, model_path: str, sla_threshold_min: float,
+              cache_dir: Optional[str] = None, incremental: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex[:12]
+        tmp_path = f"{model_path}.{job_id}.tmp"
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "stage": "queued",
+            "progress": 0.0,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "mode": "incremental" if incremental is not None else "full",
+            "csv_path": csv_path if incremental is None else None,
+            "base_version": (incremental or {}).get("base_version"),
+            "metrics": None,
+            "model_version": None,
+            "log_tail": None,
+            "prep": None,
+            "error": None,
+        }
+        with self._lock:
+            if any(j["status"] in ("queued", "running", "validating") for j in self._jobs.values()):
+                raise RuntimeError("trening je već u toku")
+            self._jobs[job_id] = job
+            self._trim()
+
+        messages = self._ctx.Queue()
+        proc = self._ctx.Process(
+            target=run_job, args=(csv_path, tmp_path, sla_threshold_min, messages, cache_dir, incremental),
+            name=f"mlaas-train-{job_id}", daemon=True,
+        )
+        proc.start()
+        self._procs[job_id] = proc
+        self._update(job_id, status="running", started_at=time.time())
+        threading.Thread(target=self._watch, args=(job_id, proc, messages, tmp_path),
+                         name=f"mlaas-train-watch-{job_id}", daemon=True).start()
+        print(f"[mlaas] training job {job_id} started (pid {proc.pid})")
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(j) for j in sorted(self._jobs.values(), key=lambda j: j["created_at"], reverse=True)]
+
+    def shutdown(self):
+        for proc in list(self._procs.values()):
+            if proc.is_alive():
+                proc.terminate()
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _trim(self):
+        done = [j for j in self._jobs.values() if j["status"] in ("succeeded", "failed", "skipped")]
+        for job in sorted(done, key=lambda j: j["created_at"])[:max(0, len(self._jobs) - self._keep)]:
+            del self._jobs[job["job_id"]]
+
+    def _watch(self, job_id: str, proc, messages, tmp_path: str):
+        result = error = skipped = None
+        while result is None and error is None:
+            try:
+                msg = messages.get(timeout=1.0)
+            except queue.Empty:
+                if not proc.is_alive():
+                    error = f"proces treniranja je završio bez rezultata (exit code {proc.exitcode})"
+                continue
+            if msg[0] == "progress":
+                self._update(job_id, stage=msg[1], progress=round(msg[2], 3))
+            elif msg[0] == "done":
+                result = msg[1]
+            elif msg[0] == "skipped":
+                skipped = error = msg[1]
+            else:
+                error = msg[1]
+                print(f"[mlaas] training job {job_id} failed in worker:\n{msg[2]}")
+        proc.join(timeout=10)
+        self._procs.pop(job_id, None)
+
+        status, version = ("skipped" if skipped else "failed"), None
+        if result is not None:
+            self._update(job_id, status="validating", stage="validating", progress=0.97,
+                         metrics=result.get("metrics"), log_tail=result.get("log_tail"), prep=result.get("prep"))
+            try:
+                version = self._install(tmp_path, result)
+                status = "succeeded"
+            except Exception as ex:
+                error = f"validacija nije prošla: {ex}"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        fields = {"status": status, "stage": status, "finished_at": time.time(), "model_version": version, "error": error}
+        if status == "succeeded":
+            fields["progress"] = 1.0
+        self._update(job_id, **fields)
+        print(f"[mlaas] training job {job_id} {status}" + (f": {error}" if error else f" -> {version}"))
+        if self._on_finish is not None:
+            self._on_finish(status)
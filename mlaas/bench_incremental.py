@@ -0,0 +1,174 @@
+"""
+Inkrementalni trening (warm_start iz tabele deliveries) naspram punog
+ponovnog treninga: vreme (uključujući čitanje iz baze) i tačnost na istom
+test skupu iz perioda novih podataka.
+
+  base:         model istreniran na starijem delu istorije (watermark = poslednji red)
+  incremental:  base + samo novi redovi posle watermark-a (app.training.update_model)
+  full:         RandomForest(200) od nule nad celom tabelom (app.training.fit_pipeline)
+
+Sintetičke isporuke (kategorije kao u Kaggle CSV-u) idu u SQLite bazu; u
+novom periodu se verovatnoća kašnjenja pomera (drift), pa se vidi koliko
+inkrementalni model prati nove podatke. Posle osnovnog treninga se upisuju i
+redovi sa starim delivery_timestamp-om (--late-rows) i menjaju se postojeći
+(--updated-rows); watermark je po updated_at, pa ih inkrementalni trening
+mora pročitati zajedno sa novim periodom. Sa --database-url se koristi
+postojeća baza (upisuje se u tabelu deliveries, pa ne na produkcionu).
+
+Pokretanje iz mlaas/ (root repozitorijuma na PYTHONPATH):
+  python bench_incremental.py --base-rows 40000 --new-rows 8000
+"""
+import argparse
+import copy
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+
+from app.training import fit_pipeline, update_model
+from deliveryml.training_data import build_frame, count_deliveries, deliveries_table, read_deliveries, training_xy
+
+SLA = 30.0
+
+
+def synthetic_deliveries(n: int, start: str, days: int, drift: float, rng) -> pd.DataFrame:
+    traffic = rng.choice(["Low ", "Medium ", "High ", "Jam "], n, p=[0.35, 0.25, 0.15, 0.25])
+    weather = rng.choice(["Sunny", "Stormy", "Sandstorms", "Cloudy", "Fog", "Windy"], n)
+    city = rng.choice(["Urban ", "Metropolitian ", "Semi-Urban ", "Other"], n, p=[0.3, 0.5, 0.05, 0.15])
+    distance = rng.gamma(2.0, 4.0, n)
+    ts = pd.Timestamp(start, tz="UTC") + pd.to_timedelta(np.sort(rng.uniform(0, days * 86400, n)), unit="s")
+    hour = ts.hour.values
+    minutes = (
+        12 + 2.2 * distance
+        + np.select([traffic == "Jam ", traffic == "High "], [25.0, 12.0], 0.0)
+        + np.select([weather == "Stormy", weather == "Fog"], [8.0, 6.0], 0.0)
+        + np.where((hour >= 17) & (hour <= 21), 6.0, 0.0)
+        # drift: u novom periodu Metropolitian i Fog kasne više
+        + drift * (np.where(city == "Metropolitian ", 10.0, 0.0) + np.where(weather == "Fog", 8.0, 0.0))
+        + rng.normal(0, 8.0, n)
+    )
+    return pd.DataFrame({
+        "id": [str(uuid.uuid4()) for _ in range(n)],
+        "city": city,
+        "weather": weather,
+        "traffic": traffic,
+        "distance_km": distance,
+        "time_taken_min": np.maximum(minutes, 5.0),
+        "delivery_timestamp": ts.to_pydatetime(),
+    })
+
+
+def insert(engine, df: pd.DataFrame):
+    # updated_at eksplicitno: SQLite CURRENT_TIMESTAMP ima rezoluciju od sekunde i drugi format
+    table = deliveries_table()
+    with engine.begin() as conn:
+        conn.execute(table.insert(), df.assign(updated_at=datetime.now(timezone.utc)).to_dict("records"))
+
+
+def touch(engine, ids, minutes):
+    """Izmena postojećih redova (kao DataManager update): novo trajanje i updated_at."""
+    table = deliveries_table()
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(
+            table.update().where(table.c.id == sa.bindparam("b_id"))
+            .values(time_taken_min=sa.bindparam("b_min"), updated_at=now),
+            [{"b_id": i, "b_min": float(m)} for i, m in zip(ids, minutes)],
+        )
+
+
+def read_all(engine, watermark=None, chunk_rows=5000):
+    frames, last = [], watermark
+    for frame, last in read_deliveries(engine, watermark, chunk_rows):
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True), last
+
+
+def as_frame(raw: pd.DataFrame) -> pd.DataFrame:
+    """Test skup u istom obliku kao read_deliveries (bez upisa u bazu)."""
+    return build_frame(
+        area=raw["city"], weather=raw["weather"], traffic=raw["traffic"], distance=raw["distance_km"],
+        ts=pd.DatetimeIndex(pd.to_datetime(raw["delivery_timestamp"], utc=True)),
+        minutes=raw["time_taken_min"], index=raw.index,
+    )
+
+
+def accuracy(bundle, test: pd.DataFrame) -> float:
+    X, y = training_xy(test, SLA)
+    return float((bundle["model"].predict(X) == y.values).mean())
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Incremental (warm-start) vs full retrain")
+    ap.add_argument("--database-url", help="SQLAlchemy URL (bez njega: privremena SQLite baza)")
+    ap.add_argument("--base-rows", type=int, default=40000)
+    ap.add_argument("--new-rows", type=int, default=8000)
+    ap.add_argument("--late-rows", type=int, default=500, help="novi redovi sa delivery_timestamp iz osnovnog perioda")
+    ap.add_argument("--updated-rows", type=int, default=500, help="izmenjeni postojeći redovi")
+    ap.add_argument("--test-rows", type=int, default=5000)
+    ap.add_argument("--drift", type=float, default=1.0, help="jačina promene u novom periodu (0 = bez)")
+    ap.add_argument("--chunk-rows", type=int, default=5000)
+    ap.add_argument("--trees-per-chunk", type=int, default=20)
+    ap.add_argument("--max-trees", type=int, default=400)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    tmp = tempfile.mkdtemp(prefix="bench-incr-")
+    url = args.database_url or f"sqlite:///{os.path.join(tmp, 'deliveries.db')}"
+    engine = sa.create_engine(url)
+    try:
+        deliveries_table().metadata.create_all(engine)
+        base_raw = synthetic_deliveries(args.base_rows, "2025-01-01", 180, 0.0, rng)
+        insert(engine, base_raw)
+
+        frame, watermark = read_all(engine, chunk_rows=args.chunk_rows)
+        X, y = training_xy(frame, SLA)
+        pipe, _, _ = fit_pipeline(X, y, lambda stage, p: None)
+        base = {"model": pipe, "threshold_min": SLA, "watermark": watermark}
+
+        insert(engine, synthetic_deliveries(args.new_rows, "2025-07-01", 30, args.drift, rng))
+        insert(engine, synthetic_deliveries(args.late_rows, "2025-01-01", 180, 0.0, rng))
+        changed = base_raw.sample(n=min(args.updated_rows, len(base_raw)), random_state=args.seed)
+        touch(engine, changed["id"], changed["time_taken_min"] + 15.0)
+        test_raw = synthetic_deliveries(args.test_rows, "2025-07-01", 30, args.drift, rng)
+        test = as_frame(test_raw)
+        new_rows = count_deliveries(engine, watermark)
+        expected = args.new_rows + args.late_rows + len(changed)
+        if new_rows != expected:
+            raise SystemExit(f"posle watermark-a {new_rows} redova, očekivano {expected}")
+
+        t0 = time.perf_counter()
+        result = update_model(copy.deepcopy(base), read_deliveries(engine, watermark, args.chunk_rows), SLA,
+                              lambda stage, p: None, new_rows, trees_per_chunk=args.trees_per_chunk,
+                              max_trees=args.max_trees)
+        t_incr = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        frame_all, _ = read_all(engine, chunk_rows=args.chunk_rows)
+        X_all, y_all = training_xy(frame_all, SLA)
+        full_pipe, _, _ = fit_pipeline(X_all, y_all, lambda stage, p: None)
+        t_full = time.perf_counter() - t0
+
+        print(f"rows: base {len(frame)}, new {new_rows} (period {args.new_rows}, back-dated {args.late_rows}, "
+              f"updated {len(changed)}), test {len(test)} (drift {args.drift})")
+        print(f"  {'model':<12} {'wall s':>8} {'accuracy':>9} {'trees':>6}")
+        print(f"  {'base':<12} {'-':>8} {accuracy(base, test):>9.4f} {len(pipe.steps[-1][1].estimators_):>6}")
+        print(f"  {'incremental':<12} {t_incr:>8.2f} {accuracy(result['payload'], test):>9.4f} "
+              f"{result['metrics']['trees']:>6}")
+        print(f"  {'full':<12} {t_full:>8.2f} {accuracy({'model': full_pipe}, test):>9.4f} "
+              f"{len(full_pipe.steps[-1][1].estimators_):>6}")
+        print(f"  speedup {t_full / t_incr:.1f}x, watermark {result['watermark']}")
+    finally:
+        engine.dispose()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
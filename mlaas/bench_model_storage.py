@@ -0,0 +1,105 @@
+"""
+Memorija i hladan start N procesa koji služe isti model (kao uvicorn --workers N):
+
+  joblib:  svaki proces radi load(model.pkl) -> sopstvena kopija šume
+  mmap:    šuma iz model.mmap (deliveryml.model_store), read-only mapirana
+
+Svaki proces učitava model kroz app.main._prepare i zagreje ga (_warm), pa
+ostaje živ dok se ne izmeri /proc/<pid>/smaps_rollup. Pss deli zajedničke
+stranice na procese koji ih koriste, pa je zbir Pss stvarna ukupna memorija;
+"baseline" je proces sa istim importima bez modela.
+
+Pokretanje iz mlaas/ (root repozitorijuma na PYTHONPATH):
+  python bench_model_storage.py --model /app/model.pkl --workers 4
+"""
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+import time
+
+from deliveryml import model_store
+
+
+def _child(mode: str, path: str, out, stop):
+    t0 = time.perf_counter()
+    from app.main import _prepare, _warm
+
+    t_import = time.perf_counter() - t0
+    load_s = warm_ms = 0.0
+    if mode != "baseline":
+        t0 = time.perf_counter()
+        loaded = _prepare(path, "bench", storage=mode)
+        load_s = time.perf_counter() - t0
+        warm_ms = _warm(loaded).warmup_ms
+    out.put((os.getpid(), t_import, load_s, warm_ms))
+    stop.wait()
+
+
+def smaps_kb(pid: int) -> dict:
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[0].endswith(":"):
+                out[parts[0][:-1]] = int(parts[1])
+    return out
+
+
+def run(mode: str, path: str, workers: int) -> dict:
+    ctx = mp.get_context("spawn")
+    out, stop = ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=_child, args=(mode, path, out, stop)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    try:
+        stats = [out.get(timeout=300) for _ in procs]
+        mem = [smaps_kb(pid) for pid, *_ in stats]
+    finally:
+        stop.set()
+        for p in procs:
+            p.join()
+    return {
+        "rss_mb": sum(m["Rss"] for m in mem) / 1024 / workers,
+        "pss_total_mb": sum(m["Pss"] for m in mem) / 1024,
+        "shared_mb": sum(m.get("Shared_Clean", 0) + m.get("Shared_Dirty", 0) for m in mem) / 1024 / workers,
+        "load_s": max(s[2] for s in stats),
+        "warm_ms": max(s[3] for s in stats),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Model storage: joblib vs mmap across worker processes")
+    ap.add_argument("--model", default=os.getenv("MODEL_PATH", "/app/model.pkl"), help="model.pkl (train.py format)")
+    ap.add_argument("--workers", type=int, default=4)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-storage-")
+    try:
+        # kopija, da se model.mmap ne pravi pored originala
+        path = os.path.join(tmp, "model.pkl")
+        shutil.copy2(args.model, path)
+        t0 = time.perf_counter()
+        if model_store.export(path) is None:
+            raise SystemExit("model nije Pipeline(pre, šuma); mmap format nije primenljiv")
+        store = model_store.store_dir(path)
+        store_mb = sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(store) for f in fs) / 1e6
+        print(f"{args.model}: {os.path.getsize(path) / 1e6:.1f} MB pkl, {store_mb:.1f} MB mmap store "
+              f"(export {time.perf_counter() - t0:.2f} s), {args.workers} processes")
+
+        base = run("baseline", path, args.workers)
+        print(f"  {'storage':<9} {'load s':>7} {'warmup ms':>10} {'RSS/proc':>9} {'shared/proc':>12} "
+              f"{'Pss total':>10} {'model total':>12}")
+        for mode in ("joblib", "mmap"):
+            r = run(mode, path, args.workers)
+            print(f"  {mode:<9} {r['load_s']:>7.2f} {r['warm_ms']:>10.1f} {r['rss_mb']:>7.1f}MB "
+                  f"{r['shared_mb']:>10.1f}MB {r['pss_total_mb']:>8.1f}MB "
+                  f"{r['pss_total_mb'] - base['pss_total_mb']:>10.1f}MB")
+        print(f"  baseline (importi bez modela): Pss total {base['pss_total_mb']:.1f} MB")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
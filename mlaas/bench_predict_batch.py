@@ -0,0 +1,74 @@
+"""
+Propusnost MLaaS predikcije (redova/s) u zavisnosti od veličine batch-a.
+
+  /predict:        jedan HTTP zahtev i jedan predict_proba po redu
+  /predict_batch:  jedan zahtev i jedan predict_proba za ceo batch
+
+Zahtevi idu kroz FastAPI TestClient (validacija, JSON, handler), bez mreže.
+Potreban je istrenirani model na MODEL_PATH i httpx (za TestClient).
+
+Pokretanje iz mlaas/ (root repozitorijuma na PYTHONPATH):
+  MODEL_PATH=model.pkl python bench_predict_batch.py --n 2000 --sizes 1,8,32,128,512
+"""
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import PREDICT_BATCH_MAX, app
+
+
+def sample_rows(n: int):
+    return [{
+        "area": ("Urban", "Metropolitian", "Semi-Urban")[i % 3],
+        "weather": ("Sunny", "Fog", "Stormy", "Cloudy")[i % 4],
+        "traffic": ("Low", "Medium", "High", "Jam")[i % 4],
+        "distanceKm": 1.0 + (i % 30),
+        "hour": i % 24,
+        "weekday": i % 7,
+    } for i in range(n)]
+
+
+def single(client: TestClient, rows) -> float:
+    t0 = time.perf_counter()
+    for r in rows:
+        client.post("/predict", json=r).raise_for_status()
+    return len(rows) / (time.perf_counter() - t0)
+
+
+def batched(client: TestClient, rows, size: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(0, len(rows), size):
+        resp = client.post("/predict_batch", json=rows[i:i + size])
+        resp.raise_for_status()
+        assert len(resp.json()["predictions"]) == len(rows[i:i + size])
+    return len(rows) / (time.perf_counter() - t0)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="MLaaS /predict vs /predict_batch throughput (rows/s)")
+    ap.add_argument("--n", type=int, default=2000, help="broj redova po merenju")
+    ap.add_argument("--sizes", default="1,8,32,128,512", help="veličine batch-a, razdvojene zarezom")
+    args = ap.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    rows = sample_rows(args.n)
+    with TestClient(app) as client:
+        if not client.get("/health").json()["has_model"]:
+            raise SystemExit("[mlaas] model nije učitan (MODEL_PATH)")
+        client.post("/predict_batch", json=rows[:8]).raise_for_status()  # zagrevanje
+
+        base = single(client, rows)
+        print(f"rows: {args.n}")
+        print(f"{'endpoint':<16}{'batch':>7}{'rows/s':>12}{'speedup':>10}")
+        print(f"{'/predict':<16}{1:>7}{base:>12,.0f}{1.0:>9.1f}x")
+        for size in sizes:
+            if size > PREDICT_BATCH_MAX:
+                print(f"{'/predict_batch':<16}{size:>7}  preskočeno (PREDICT_BATCH_MAX={PREDICT_BATCH_MAX})")
+                continue
+            rate = batched(client, rows, size)
+            print(f"{'/predict_batch':<16}{size:>7}{rate:>12,.0f}{rate / base:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
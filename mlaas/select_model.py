@@ -0,0 +1,235 @@
+"""
+Izbor modela: kandidati (RandomForest po veličini/dubini, HistGradientBoosting,
+LogisticRegression) se treniraju paralelno u pool-u procesa nad istim
+podacima kao train.py, a zatim se redom mere na način na koji ih MLaaS služi:
+
+  accuracy, f1:     test skup (20%, isti split za sve kandidate)
+  p50/p99 1 red:    jedan /predict poziv (kompajlirani encoder + predict_proba)
+  p50/p99 batch:    jedan /predict_batch poziv sa --batch redova
+  size:             veličina model.pkl artefakta (joblib)
+
+Latencija se meri posle treninga, jedan kandidat za drugim, da trening ne
+utiče na merenje. Kandidati na frontu tačnost / p99 (jednog reda) su
+označeni sa `*`: nijedan drugi kandidat nije i tačniji i brži.
+
+Pokretanje iz mlaas/ (root repozitorijuma na PYTHONPATH):
+  python select_model.py --csv data/amazon_delivery.csv --workers 4
+  python select_model.py --only rf,hgb --forest-engine flat --json report.json --keep models-eval/
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Tuple
+
+from joblib import dump, load
+
+from app.training import make_preprocessor
+from deliveryml.encoder import CompiledEncoder
+from deliveryml.features import FEATURE_COLUMNS, features_frame
+from deliveryml.forest import FlatForest
+from deliveryml.training_data import load_frame, training_xy
+
+CSV_PATH = os.getenv("CSV_PATH", "data/amazon_delivery.csv")
+SLA_THRESHOLD_MIN = float(os.getenv("SLA_THRESHOLD_MIN", "30"))
+TRAIN_CACHE_DIR = os.getenv("TRAIN_CACHE_DIR", os.path.join(os.path.dirname(CSV_PATH) or ".", ".feature-cache"))
+
+# podaci za trening u svakom procesu pool-a (postavlja _init_worker)
+_DATA: Dict[str, Any] = {}
+
+
+def candidates() -> List[Tuple[str, str, Dict[str, Any]]]:
+    """(ime, vrsta, parametri); rf-200 je trenutni model iz train.py."""
+    out: List[Tuple[str, str, Dict[str, Any]]] = []
+    for n in (25, 50, 100, 200):
+        for depth in (None, 12, 8):
+            name = f"rf-{n}" + (f"-d{depth}" if depth else "")
+            out.append((name, "rf", {"n_estimators": n, "max_depth": depth, "random_state": 42}))
+    for iters, leaves in ((100, 31), (200, 15), (300, 31)):
+        out.append((f"hgb-{iters}-l{leaves}", "hgb",
+                    {"max_iter": iters, "max_leaf_nodes": leaves, "learning_rate": 0.1, "random_state": 42}))
+    for c in (0.1, 1.0, 10.0):
+        out.append((f"logreg-c{c:g}", "logreg", {"C": c, "max_iter": 1000}))
+    return out
+
+
+def _estimator(kind: str, params: Dict[str, Any]):
+    from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+
+    if kind == "rf":
+        # n_jobs=1: paralelizam je na nivou kandidata (pool), a i /train model ga koristi
+        return RandomForestClassifier(n_jobs=1, **params)
+    if kind == "hgb":
+        return HistGradientBoostingClassifier(**params)
+    if kind == "logreg":
+        return LogisticRegression(**params)
+    raise ValueError(f"nepoznata vrsta kandidata {kind}")
+
+
+def _init_worker(X_tr, y_tr, X_te, y_te):
+    _DATA.update(X_tr=X_tr, y_tr=y_tr, X_te=X_te, y_te=y_te)
+
+
+def _fit_candidate(name: str, kind: str, params: Dict[str, Any], out_dir: str, sla: float) -> Dict[str, Any]:
+    """Proces pool-a: trening, tačnost na test skupu i artefakt u formatu model.pkl."""
+    from sklearn.metrics import accuracy_score, f1_score
+    from sklearn.pipeline import Pipeline
+
+    pipe = Pipeline([("pre", make_preprocessor(dense=kind == "hgb")), ("clf", _estimator(kind, params))])
+    t0 = time.perf_counter()
+    pipe.fit(_DATA["X_tr"], _DATA["y_tr"])
+    fit_seconds = time.perf_counter() - t0
+    y_pr = pipe.predict(_DATA["X_te"])
+
+    path = os.path.join(out_dir, f"{name}.pkl")
+    dump({
+        "model": pipe,
+        "threshold_min": sla,
+        "feature_names_in": list(FEATURE_COLUMNS),
+        "class_labels": [int(c) for c in pipe.classes_],
+    }, path)
+    return {
+        "name": name,
+        "kind": kind,
+        "params": params,
+        "accuracy": float(accuracy_score(_DATA["y_te"], y_pr)),
+        "f1": float(f1_score(_DATA["y_te"], y_pr, zero_division=0)),
+        "fit_seconds": round(fit_seconds, 3),
+        "size_bytes": os.path.getsize(path),
+        "path": path,
+    }
+
+
+def _percentiles(fn, repeat: int) -> Tuple[float, float]:
+    fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return samples[len(samples) // 2] * 1e3, samples[min(len(samples) - 1, int(0.99 * len(samples)))] * 1e3
+
+
+def serving_predict(bundle: Dict[str, Any], forest_engine: str, flat_max_rows: int):
+    """predict_proba kao u MLaaS _prepare/_predict_proba (kompajlirani encoder, opciono ravna šuma)."""
+    model = bundle["model"]
+    forest = None
+    if forest_engine == "flat":
+        forest = FlatForest.from_estimator(model.steps[-1][1], flat_max_rows)
+    encoder = CompiledEncoder.from_pipeline(model, estimator=forest)
+    if encoder is not None:
+        return encoder.predict_proba
+    return lambda rows: model.predict_proba(features_frame(rows, bundle["feature_names_in"]))
+
+
+def measure_latency(result: Dict[str, Any], rows: List[Dict[str, Any]], batch: int, repeat: int,
+                    forest_engine: str, flat_max_rows: int) -> Dict[str, Any]:
+    predict = serving_predict(load(result["path"]), forest_engine, flat_max_rows)
+    rnd = random.Random(7)
+    p50_1, p99_1 = _percentiles(lambda: predict([rnd.choice(rows)]), repeat)
+    chunk = rows[:batch]
+    p50_b, p99_b = _percentiles(lambda: predict(chunk), max(5, repeat // 10))
+    return dict(result, p50_ms=p50_1, p99_ms=p99_1, batch_p50_ms=p50_b, batch_p99_ms=p99_b,
+                batch_rows_per_s=len(chunk) / (p50_b / 1e3))
+
+
+def mark_frontier(results: List[Dict[str, Any]]):
+    """Pareto front: nema kandidata sa većom (ili istom) tačnošću i manjim (ili istim) p99, a boljeg u nečemu."""
+    for r in results:
+        r["frontier"] = not any(
+            o is not r and o["accuracy"] >= r["accuracy"] and o["p99_ms"] <= r["p99_ms"]
+            and (o["accuracy"] > r["accuracy"] or o["p99_ms"] < r["p99_ms"])
+            for o in results
+        )
+
+
+def payload_rows(X) -> List[Dict[str, Any]]:
+    """Redovi test skupa kao /predict payload (area, weather, traffic, distanceKm, hour, weekday)."""
+    return [
+        {"area": a, "weather": w, "traffic": t, "distanceKm": float(d), "hour": int(h), "weekday": int(wd)}
+        for a, w, t, d, h, wd in zip(X["area"], X["weather"], X["traffic"], X["distancekm"], X["hour"], X["weekday"])
+    ]
+
+
+def print_report(results: List[Dict[str, Any]], batch: int, rows: int):
+    print(f"\n{rows} redova, test 20%; latencija u ms (1 red = /predict, {batch} redova = /predict_batch)")
+    print(f"  {'':1} {'model':<18} {'acc':>6} {'f1':>6} {'p50 1':>7} {'p99 1':>7} "
+          f"{'p50 b':>7} {'p99 b':>7} {'red/s':>8} {'KB':>8} {'fit s':>6}")
+    for r in sorted(results, key=lambda r: (-r["accuracy"], r["p99_ms"])):
+        print(f"  {'*' if r['frontier'] else ' '} {r['name']:<18} {r['accuracy']:>6.4f} {r['f1']:>6.4f} "
+              f"{r['p50_ms']:>7.2f} {r['p99_ms']:>7.2f} {r['batch_p50_ms']:>7.2f} {r['batch_p99_ms']:>7.2f} "
+              f"{r['batch_rows_per_s']:>8.0f} {r['size_bytes'] / 1e3:>8.0f} {r['fit_seconds']:>6.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Parallel model selection with serving latency report")
+    ap.add_argument("--csv", default=CSV_PATH)
+    ap.add_argument("--only", default="", help="samo kandidati čije ime počinje nekim od prefiksa (npr. rf,hgb)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="procesi za trening")
+    ap.add_argument("--batch", type=int, default=128, help="redova za batch latenciju")
+    ap.add_argument("--repeat", type=int, default=300, help="merenja latencije jednog reda po kandidatu")
+    ap.add_argument("--forest-engine", choices=("sklearn", "flat"), default=os.getenv("FOREST_ENGINE", "sklearn"))
+    ap.add_argument("--flat-max-rows", type=int, default=int(os.getenv("FLAT_FOREST_MAX_ROWS", "128")))
+    ap.add_argument("--json", help="izveštaj kao JSON")
+    ap.add_argument("--keep", help="direktorijum za artefakte kandidata (inače privremeni)")
+    args = ap.parse_args()
+
+    frame, prep = load_frame(args.csv, TRAIN_CACHE_DIR or None)
+    X, y = training_xy(frame, SLA_THRESHOLD_MIN)
+    from sklearn.model_selection import train_test_split
+    X_tr, X_te, y_tr, y_te = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    prefixes = [p for p in args.only.split(",") if p]
+    grid = [c for c in candidates() if not prefixes or any(c[0].startswith(p) for p in prefixes)]
+    out_dir = args.keep or tempfile.mkdtemp(prefix="select-model-")
+    os.makedirs(out_dir, exist_ok=True)
+    print(f"[select] {len(grid)} candidates, {args.workers} workers, {len(frame)} rows (cache {prep['cache']})")
+
+    fitted: List[Dict[str, Any]] = []
+    t0 = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=mp.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(X_tr, y_tr, X_te, y_te)) as pool:
+            futures = {pool.submit(_fit_candidate, name, kind, params, out_dir, SLA_THRESHOLD_MIN): name
+                       for name, kind, params in grid}
+            for fut in as_completed(futures):
+                try:
+                    r = fut.result()
+                except Exception as ex:
+                    print(f"[select] {futures[fut]} failed: {ex}")
+                    continue
+                fitted.append(r)
+                print(f"[select] {r['name']:<18} acc {r['accuracy']:.4f}  fit {r['fit_seconds']:.1f} s")
+        print(f"[select] training done in {time.perf_counter() - t0:.1f} s, measuring latency "
+              f"(forest engine {args.forest_engine})")
+
+        rows = payload_rows(X_te)
+        results = [measure_latency(r, rows, args.batch, args.repeat, args.forest_engine, args.flat_max_rows)
+                   for r in fitted]
+    finally:
+        if not args.keep:
+            shutil.rmtree(out_dir, ignore_errors=True)
+    if not results:
+        raise SystemExit("nijedan kandidat nije istreniran")
+    mark_frontier(results)
+    print_report(results, args.batch, len(frame))
+
+    if args.json:
+        for r in results:
+            if not args.keep:
+                r.pop("path", None)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"csv": args.csv, "rows": len(frame), "forest_engine": args.forest_engine,
+                       "batch": args.batch, "candidates": results}, f, indent=2, default=str)
+        print(f"[select] report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()